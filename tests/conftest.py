@@ -0,0 +1,12 @@
+## @file
+## @brief Test configuration: makes the toolkit, benchmark and web modules importable, as the scripts import them.
+
+import os
+import sys
+
+## @brief Path to the repository root.
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+sys.path.insert(1, os.path.join(ROOT, 'toolkit', 'assembler'))
+sys.path.insert(1, os.path.join(ROOT, 'toolkit', 'benchmark'))
+sys.path.insert(1, os.path.join(ROOT, 'web'))
@@ -0,0 +1,47 @@
+## @file
+## @brief Assembler tests.
+
+import pytest
+
+from Assembler import assemble, memory_depth
+from Util import AssemblerError
+
+## @brief Assembles a program expected to fail.
+## @return The structured errors.
+def assemble_errors(program):
+    with pytest.raises(AssemblerError) as error:
+        assemble(program)
+    return error.value.errors
+
+## @brief Registers past $31 are reported, not truncated.
+def test_register_out_of_range():
+    errors = assemble_errors('li $1, 1\nadd $40, $1\n')
+    assert [(error['type'], error['lineno'], error['column']) for error in errors] == [('Register out of range', 2, 5)]
+
+## @brief Immediates past 16 bits are reported, not truncated.
+def test_immediate_out_of_range():
+    errors = assemble_errors('li $1, 70000\n')
+    assert [(error['type'], error['lineno'], error['column']) for error in errors] == [('Immediate out of range', 1, 8)]
+
+## @brief The largest register and immediate assemble.
+def test_largest_operands():
+    assert assemble('li $31, 65535\n') == [0x01F8FFFF]
+
+## @brief Programs longer than the instruction memory are reported.
+def test_program_too_long():
+    errors = assemble_errors('noop\n' * (memory_depth + 1))
+    assert [(error['type'], error['lineno']) for error in errors] == [('Program too long', memory_depth + 1)]
+
+## @brief The prebuilt parser tables match the grammar in Parser.py, line numbers included.
+## @details Regenerate them with yacc.yacc(module=Parser, write_tables=True) after removing ParserTables.py.
+def test_parser_tables_current():
+    import ply.yacc as yacc
+    import Parser
+    import ParserTables
+    info = yacc.ParserReflect(vars(Parser))
+    info.get_all()
+    expected = set()
+    for line, module, name, doc in info.pfuncs:
+        for _, rule_line, prodname, syms in yacc.parse_grammar(doc, module, line):
+            expected.add((prodname, len(syms), name, rule_line))
+    assert {entry[1:4] + entry[5:] for entry in ParserTables._lr_productions[1:]} == expected
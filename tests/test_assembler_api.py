@@ -0,0 +1,107 @@
+## @file
+## @brief Assembler web API tests.
+
+import json
+
+import pytest
+
+from assemblerApi import app
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+## @brief Bodies that aren't a json object are rejected as requests without a program.
+@pytest.mark.parametrize('body', ['[]', '["li $1, 1"]', '"li $1, 1"', '42', 'null'])
+def test_non_object_body(client, body):
+    response = client.post('/assembler', data=body, content_type='application/json')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': True, 'output': 'Expected a program.', 'errors': [], 'assembly': ''}
+
+## @brief A valid program assembles.
+def test_program(client):
+    response = client.post('/assembler', json={'program': 'li $1, 1\n'})
+    assert response.status_code == 200
+    assert response.get_json()['error'] is False
+
+## @brief Profiled requests record the times of each phase, without tracing memory for the whole process.
+@pytest.mark.parametrize('query, body', [('', {'profile': True}), ('?profile=1', {})])
+def test_profile(client, query, body):
+    import tracemalloc
+    body['program'] = 'li $1, 1\n'
+    response = client.post('/assembler' + query, json=body).get_json()
+    assert response['error'] is False
+    phases = response['timings']['phases']
+    assert [phase['phase'] for phase in phases][-1] == 'format'
+    assert all(phase['seconds'] >= 0 and phase['peak_memory'] is None for phase in phases)
+    assert not tracemalloc.is_tracing()
+
+## @brief Programs assembled while the cache directory can't be written to are still answered.
+def test_cache_directory_unwritable(client, tmp_path, monkeypatch):
+    import assemblerApi
+    (tmp_path / 'file').write_text('')
+    monkeypatch.setattr(assemblerApi.cache, 'directory', str(tmp_path / 'file'))
+    program = 'li $1, 1\nli $2, {}\n'.format(id(tmp_path) % 65536)
+    response = client.post('/assembler', json={'program': program})
+    assert response.status_code == 200
+    assert response.get_json()['error'] is False
+    response = client.post('/assembler/batch', json={'programs': [program + 'li $3, 3\n']})
+    assert response.status_code == 200
+    assert response.get_json()[0]['error'] is False
+
+## @brief Resubmitted programs are served from the cache, as counted on /assembler/cache.
+def test_cache_stats(client):
+    before = client.get('/assembler/cache').get_json()
+    program = {'program': 'li $1, 1\nli $2, {}\n'.format(id(before) % 65536)}
+    first = client.post('/assembler', json=program).get_json()
+    second = client.post('/assembler', json=program).get_json()
+    assert first == second
+    after = client.get('/assembler/cache').get_json()
+    assert after['misses'] - before['misses'] == 1
+    assert after['hits'] - before['hits'] == 1
+    assert after['entries'] <= after['max_entries']
+
+## @brief Programs unique to a test, so they aren't served from the cache of an earlier one.
+def unique_programs(name, count):
+    return ['; {}\nli $1, {}\n'.format(name, value) for value in range(count)]
+
+## @brief Invalid items fail only their own result, valid ones assemble, in request order.
+def test_batch_mixed(client):
+    programs = unique_programs('mixed', 2)
+    response = client.post('/assembler/batch', json={'programs': [
+        programs[0],
+        {'program': 'add $1\n'},
+        42,
+        {'program': programs[1], 'data_radix': 'HEX'},
+        {'program': programs[1], 'data_radix': 'BASE64'}
+    ]})
+    assert response.status_code == 200
+    results = response.get_json()
+    assert [result['error'] for result in results] == [False, True, True, False, True]
+    assert results[0] == client.post('/assembler', json={'program': programs[0]}).get_json()
+    assert results[1]['errors']
+    assert results[2]['output'] == 'Expected a program.'
+    assert results[3] == client.post('/assembler', json={'program': programs[1], 'data_radix': 'HEX'}).get_json()
+    assert results[4]['output'].startswith('Unsupported radix')
+
+## @brief Streamed results come one per line, in request order.
+@pytest.mark.parametrize('stream', [{'query_string': {'stream': '1'}}, {'headers': {'Accept': 'application/x-ndjson'}}])
+def test_batch_stream(client, stream):
+    programs = unique_programs('stream {}'.format(sorted(stream)), 8)
+    # Failing programs between the valid ones, to tell the order apart.
+    programs[3] = 'li $1\n'
+    response = client.post('/assembler/batch', json={'programs': programs}, **stream)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = response.get_data(as_text=True).splitlines()
+    results = [json.loads(line) for line in lines]
+    assert [result['error'] for result in results] == [index == 3 for index in range(8)]
+    expected = client.post('/assembler/batch', json={'programs': programs}).get_json()
+    assert results == expected
+
+## @brief Batches need a list of programs.
+@pytest.mark.parametrize('body', [{}, {'programs': 'li $1, 1\n'}, {'programs': {'program': 'li $1, 1\n'}}, ['li $1, 1\n']])
+def test_batch_not_a_list(client, body):
+    response = client.post('/assembler/batch', json=body)
+    assert response.status_code == 400
+    assert response.get_json()['error'] is True
@@ -0,0 +1,115 @@
+## @file
+## @brief Basic block compiling simulator tests.
+## @details BlockSimulator must end on the same state as Simulator after any number of cycles.
+
+import os
+
+import pytest
+
+from Assembler import assemble
+from BlockSimulator import BlockSimulator, compile_factory, max_factories
+from Simulator import Simulator, load_program
+from program_generator import generate_program
+
+## @brief Path to the example programs.
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'doc', 'examples')
+## @brief The example programs.
+EXAMPLE_NAMES = sorted(name for name in os.listdir(EXAMPLES) if name.endswith('.qtf'))
+
+## @brief A nested counting loop, blocks looping on themselves.
+COUNTING_LOOP = (
+    'li $1, 1\n'
+    'li $2, 5\n'
+    'outer:\n'
+    'li $3, 7\n'
+    'inner:\n'
+    'add $4, $3\n'
+    'store $4, $3\n'
+    'sub $3, $1\n'
+    'jne $3, $zero, inner\n'
+    'sub $2, $1\n'
+    'jne $2, $zero, outer\n'
+    'move $hex0, $4\n'
+    'end:\n'
+    'j end\n'
+)
+
+## @brief Checks both simulators are on the same state.
+def assert_same_state(simulator, reference):
+    assert (simulator.pc, simulator.cycles) == (reference.pc, reference.cycles)
+    assert simulator.registers == reference.registers
+    assert simulator.memory == reference.memory
+
+## @brief Runs a program on both simulators, in the same chunks of cycles, comparing the state after each.
+def check_equivalent(words, chunks, switches=0):
+    simulator = BlockSimulator(words, switches)
+    reference = Simulator(words, switches)
+    for cycles in chunks:
+        simulator.run(cycles)
+        reference.run(cycles)
+        assert_same_state(simulator, reference)
+
+## @brief The examples end as on the simulator, also when runs end inside blocks and loops.
+@pytest.mark.parametrize('name', EXAMPLE_NAMES)
+def test_examples(name):
+    check_equivalent(load_program(os.path.join(EXAMPLES, name)), (1, 2, 3, 7, 50, 1000), switches=0x2A)
+
+## @brief Unrolled loops stop on the exact cycle.
+@pytest.mark.parametrize('cycles', [1, 4, 5, 9, 23, 64, 65, 200, 1000])
+def test_counting_loop(cycles):
+    check_equivalent(assemble(COUNTING_LOOP), (cycles, cycles))
+
+## @brief Generated programs, jumping through registers and calls, end as on the simulator.
+@pytest.mark.parametrize('seed', range(20))
+def test_generated_programs(seed):
+    check_equivalent(assemble(generate_program(80, seed=seed)), (13, 100, 1000), switches=seed)
+
+## @brief Patched words run instead of the compiled blocks holding them.
+## @details Each word is patched once the blocks holding it ran: the outer loop, the inner loop and the end loop.
+@pytest.mark.parametrize('address, cycles', [(2, 60), (3, 30), (13, 300)])
+def test_write_instruction(address, cycles):
+    words = assemble(COUNTING_LOOP)
+    simulator = BlockSimulator(words)
+    reference = Simulator(words)
+    simulator.run(cycles)
+    reference.run(cycles)
+    assert simulator.covering[address]
+    # The inner loop counts from 3, or adds 1 instead of the count, or the end loop jump is patched into a noop.
+    patches = {2: assemble('li $3, 3\n')[0], 3: assemble('add $4, $1\n')[0], 13: 0}
+    patched = list(words)
+    patched[address] = patches[address]
+    simulator.write_instruction(address, patched[address])
+
+    # The reference starts over from the same state on the patched program.
+    patched_reference = Simulator(patched)
+    patched_reference.registers[:] = reference.registers
+    patched_reference.memory[:] = reference.memory
+    patched_reference.pc = reference.pc
+    patched_reference.cycles = reference.cycles
+    # Whole blocks first, then a single instruction.
+    for cycles in (20, 1, 300):
+        simulator.run(cycles)
+        patched_reference.run(cycles)
+        assert_same_state(simulator, patched_reference)
+
+## @brief With delay slots, programs run as on the simulator with delay slots.
+@pytest.mark.parametrize('seed', range(5))
+def test_delay_slots(seed):
+    words = assemble(generate_program(80, seed=seed))
+    simulator = BlockSimulator(words, seed, delay_slots=True)
+    reference = Simulator(words, seed, delay_slots=True)
+    simulator.run(500)
+    reference.run(500)
+    assert_same_state(simulator, reference)
+
+## @brief Compiled blocks are shared between simulators running the same code, and the cache is bounded.
+def test_factory_cache():
+    words = assemble(COUNTING_LOOP)
+    BlockSimulator(words).run(500)
+    before = compile_factory.cache_info()
+    BlockSimulator(words).run(500)
+    after = compile_factory.cache_info()
+    assert after.misses == before.misses
+    assert after.hits > before.hits
+    assert after.maxsize == max_factories
+    assert after.currsize <= max_factories
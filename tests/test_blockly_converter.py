@@ -0,0 +1,67 @@
+## @file
+## @brief Blockly workspace converter tests.
+
+import os
+
+import pytest
+
+from Assembler import assemble
+from BlocklyConverter import convert, convert_chunks
+from Util import AssemblerError
+
+## @brief Path to the example programs.
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'doc', 'examples')
+## @brief The example workspaces, by program name.
+WORKSPACE_NAMES = sorted(name[:-len('.xml')] for name in os.listdir(EXAMPLES) if name.endswith('.xml'))
+
+## @brief Source lines of the example programs missing from their workspaces.
+## @details The MUL workspace doesn't load $0 before the loop, as MUL.qtf does.
+MISSING_LINES = {'MUL': ('li $0, 0',)}
+
+## @brief A workspace with a single instruction block.
+## @param instruction The INSTRUCTION field.
+## @param register The register argument.
+def single_register_workspace(instruction, register='$1'):
+    return ('<xml><block type="instruction_single_register"><field name="INSTRUCTION">{}</field>'
+            '<value name="REGISTER_A"><block type="type_register"><field name="NAME">{}</field></block></value>'
+            '</block></xml>').format(instruction, register)
+
+## @brief Reads an example file.
+def read_example(name):
+    with open(os.path.join(EXAMPLES, name), 'r', encoding='utf-8') as file:
+        return file.read()
+
+## @brief Converted example workspaces assemble to the same words as their programs.
+@pytest.mark.parametrize('name', WORKSPACE_NAMES)
+def test_examples(name):
+    missing = MISSING_LINES.get(name, ())
+    source = ''.join(line + '\n' for line in read_example(name + '.qtf').split('\n') if line.strip() not in missing)
+    assert assemble(convert(read_example(name + '.xml'))) == assemble(source)
+
+## @brief The missing lines are the only difference: MUL.qtf assembles to more words than its workspace.
+def test_mul_difference():
+    assert len(assemble(read_example('MUL.qtf'))) == len(assemble(convert(read_example('MUL.xml')))) + 1
+
+## @brief Workspaces split on any byte convert the same as whole.
+@pytest.mark.parametrize('name', WORKSPACE_NAMES)
+def test_chunks(name):
+    data = read_example(name + '.xml').encode('utf-8')
+    chunks = [data[index:index + 7] for index in range(0, len(data), 7)]
+    assert ''.join(line + '\n' for line in convert_chunks(chunks)) == convert(data)
+
+## @brief Single register instructions convert to their aliases.
+def test_single_register():
+    assert convert(single_register_workspace('RL')) == 'rl $1\n'
+
+## @brief Rotating right has no quanta instruction, so it's reported instead of becoming a label.
+def test_rotate_right_rejected():
+    with pytest.raises(AssemblerError) as error:
+        convert(single_register_workspace('RR'))
+    assert 'Unknown instruction: RR.' in str(error.value)
+    assert error.value.errors[0]['type'] == 'Invalid workspace'
+
+## @brief Unknown block types and invalid XML are reported.
+@pytest.mark.parametrize('data', ['<xml><block type="instruction_unknown"></block></xml>', '<xml><block type="comment">'])
+def test_invalid_workspaces(data):
+    with pytest.raises(AssemblerError):
+        convert(data)
@@ -0,0 +1,34 @@
+## @file
+## @brief Memory image tests.
+
+import pytest
+
+from MemoryImage import MemoryImage, load_binary
+from Simulator import load_program
+
+## @brief Words written as raw binary load back, in either byte order.
+@pytest.mark.parametrize('byteorder', ['little', 'big'])
+def test_binary_round_trip(tmp_path, byteorder):
+    words = [0, 1, 0x12345678, 0xFFFFFFFF]
+    path = str(tmp_path / 'program.bin')
+    with open(path, 'wb') as file:
+        MemoryImage(words).write_binary(file, byteorder)
+    assert list(load_binary(path, byteorder)) == words
+
+## @brief Empty images hold no words.
+def test_empty_binary(tmp_path):
+    path = tmp_path / 'empty.bin'
+    path.write_bytes(b'')
+    assert list(load_binary(str(path))) == []
+
+## @brief Images that aren't a whole number of words are reported, naming the file and its size.
+@pytest.mark.parametrize('size', [1, 5, 7])
+def test_truncated_binary(tmp_path, size):
+    path = tmp_path / 'truncated.bin'
+    path.write_bytes(bytes(size))
+    with pytest.raises(ValueError) as error:
+        load_binary(str(path))
+    assert str(path) in str(error.value)
+    assert '{} bytes'.format(size) in str(error.value)
+    with pytest.raises(ValueError):
+        load_program(str(path))
@@ -0,0 +1,159 @@
+## @file
+## @brief Optimizer tests.
+## @details Optimized programs are run on the pipeline model, with delay slots as on the hardware, and must leave the
+## @details same registers and data memory as the programs they came from.
+
+import os
+
+import pytest
+
+from Assembler import assemble_program, register_aliases
+from Optimizer import thread_jumps
+from Parser import parse
+from Pipeline import Pipeline
+
+## @brief Path to the example programs.
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'doc', 'examples')
+
+## @brief Registers holding addresses, which shift when optimizing.
+address_registers = (register_aliases['ra'], register_aliases['a'])
+
+## @brief Runs a program on the pipeline model.
+## @return The registers, without the address registers, and the data memory at the end of the run.
+def run(words, cycles=500):
+    pipeline = Pipeline(words)
+    pipeline.run(cycles)
+    simulator = pipeline.simulator
+    registers = [value for register, value in enumerate(simulator.registers) if register not in address_registers]
+    return registers, list(simulator.memory)
+
+## @brief Assembles a program with and without optimizing, checks both end on the same state.
+## @return The plain and the optimized programs.
+def check_equivalent(source):
+    plain = assemble_program(source)
+    optimized = assemble_program(source, optimize=True)
+    assert run(optimized.words) == run(plain.words)
+    return plain, optimized
+
+## @brief Reads an example program.
+def read_example(name):
+    with open(os.path.join(EXAMPLES, name), 'r') as file:
+        return file.read()
+
+## @brief The example programs compute the same when optimized.
+@pytest.mark.parametrize('name', sorted(name for name in os.listdir(EXAMPLES) if name.endswith('.qtf')))
+def test_examples(name):
+    check_equivalent(read_example(name))
+
+## @brief The delay slot of a jump runs on the hardware, so it's kept; only the code past it is removed.
+def test_jump_delay_slot_kept():
+    plain, optimized = check_equivalent(
+        'li $1, 1\n'
+        'j skip\n'
+        'li $2, 5\n'
+        'li $3, 7\n'
+        'skip:\n'
+        'move $hex0, $2\n'
+        'move $hex1, $3\n'
+        'end:\n'
+        'j end\n'
+        'noop\n'
+    )
+    assert run(optimized.words)[0][register_aliases['hex0']] == 5
+    assert run(optimized.words)[0][register_aliases['hex1']] == 0
+    assert optimized.words_saved == 1
+
+## @brief A noop on the delay slot of a jump is kept, the one past it is removed.
+def test_noop_delay_slot_kept():
+    plain, optimized = check_equivalent(
+        'li $1, 3\n'
+        'j skip\n'
+        'noop\n'
+        'noop\n'
+        'skip:\n'
+        'move $hex0, $1\n'
+        'end:\n'
+        'j end\n'
+        'noop\n'
+    )
+    assert optimized.words_saved == 1
+
+## @brief A label load after a label jumped to is kept: the reserved register holds the address of the jump taken to it.
+def test_load_after_jump_target_kept():
+    check_equivalent(
+        'li $1, 1\n'
+        'li $2, 2\n'
+        'jl $zero, $zero, done\n'
+        'noop\n'
+        'again:\n'
+        'je $2, $zero, done\n'
+        'noop\n'
+        'sub $2, $1\n'
+        'j again\n'
+        'noop\n'
+        'done:\n'
+        'li $hex0, 42\n'
+        'end:\n'
+        'j end\n'
+        'noop\n'
+    )
+
+## @brief A label load repeated within a block is dropped, the reserved register already holds the address.
+def test_redundant_load_dropped():
+    plain, optimized = check_equivalent(
+        'li $1, 1\n'
+        'li $2, 2\n'
+        'jl $zero, $zero, done\n'
+        'noop\n'
+        'jl $zero, $zero, done\n'
+        'noop\n'
+        'done:\n'
+        'li $hex0, 42\n'
+        'end:\n'
+        'j end\n'
+        'noop\n'
+    )
+    assert optimized.words_saved == 1
+
+## @brief Jumps to a label holding a jump go straight to its target.
+def test_jumps_threaded():
+    plain, optimized = check_equivalent(
+        'li $1, 7\n'
+        'j first\n'
+        'noop\n'
+        'first:\n'
+        'j second\n'
+        'noop\n'
+        'second:\n'
+        'move $hex0, $1\n'
+        'end:\n'
+        'j end\n'
+        'noop\n'
+    )
+    assert run(optimized.words)[0][register_aliases['hex0']] == 7
+    assert optimized.words_saved == 3
+
+## @brief Jumps are threaded past forwarding jumps, except on delay slots, where the loaded address must stay the same.
+def test_thread_jumps_skips_delay_slots():
+    source = (
+        'li $1, 1\n'
+        'j skip\n'
+        'jne $1, $zero, hop\n'
+        'noop\n'
+        'skip:\n'
+        'jne $1, $zero, hop\n'
+        'noop\n'
+        'hop:\n'
+        'j far\n'
+        'noop\n'
+        'far:\n'
+        'move $hex0, $1\n'
+        'end:\n'
+        'j end\n'
+        'noop\n'
+    )
+    threaded, changed = thread_jumps(parse(source))
+    assert changed
+    targets = {lineno: line[1][-1] for lineno, line in threaded if line[0] == 'jne'}
+    assert targets == {3: 'hop', 6: 'far'}
+    check_equivalent(source)
@@ -0,0 +1,144 @@
+## @file
+## @brief Board peripherals model tests.
+## @details Skipping idle polling loops must give the same output events and final state as running every cycle,
+## @details which must match a Simulator stepped along the same stimulus timeline.
+
+import io
+
+import pytest
+
+from Assembler import assemble
+from Peripherals import PeripheralSimulator, OutputEvent, read_timeline, output_names
+from Simulator import Simulator
+from program_generator import generate_program
+
+## @brief Waits for the switches to change, then shows their bit count on the leds.
+POLLING = (
+    'li $1, 1\n'
+    'wait:\n'
+    '    je $switches, $5, wait\n'
+    '    move $5, $switches\n'
+    '    move $2, $5\n'
+    '    li $4, 0\n'
+    'bits:\n'
+    '    move $3, $2\n'
+    '    and $3, $1\n'
+    '    add $4, $3\n'
+    '    sr $2\n'
+    '    jne $2, $zero, bits\n'
+    '    move $leds, $4\n'
+    '    j wait\n'
+)
+
+## @brief Polls storing the same value on every iteration, idle though it writes the memory.
+STORING = (
+    'li $1, 3\n'
+    'wait:\n'
+    '    store $5, $1\n'
+    '    move $hex1, $5\n'
+    '    je $switches, $5, wait\n'
+    '    move $5, $switches\n'
+    '    move $hex0, $5\n'
+    '    j wait\n'
+)
+
+## @brief Counts polls on the memory, never idle.
+COUNTING = (
+    'li $1, 1\n'
+    'wait:\n'
+    '    load $2, $zero\n'
+    '    add $2, $1\n'
+    '    store $2, $zero\n'
+    '    je $switches, $5, wait\n'
+    '    move $5, $switches\n'
+    '    move $hex0, $2\n'
+    '    j wait\n'
+)
+
+## @brief Changes of the switches, some on consecutive cycles and on the same cycle.
+TIMELINE = [(0, 1), (500, 0x2A), (501, 0x2B), (3000, 0x2B), (7777, 0xFFFF), (7777, 5), (20000, 0)]
+
+## @brief Steps a Simulator along a timeline, capturing the output changes.
+## @return The simulator and the output events.
+def reference_run(words, timeline, cycles, switches=0, delay_slots=False):
+    simulator = Simulator(words, switches, delay_slots)
+    changes = dict(timeline)
+    outputs = {register: 0 for register in output_names}
+    events = []
+    for cycle in range(cycles):
+        if cycle in changes:
+            simulator.switches = changes[cycle]
+        simulator.step()
+        for register, name in output_names.items():
+            if simulator.registers[register] != outputs[register]:
+                outputs[register] = simulator.registers[register]
+                events.append(OutputEvent(cycle, name, outputs[register]))
+    return simulator, events
+
+## @brief Runs a program skipping idle loops and running every cycle.
+## @return The skipping and the stepping simulators.
+def run_both(words, timeline, chunks, delay_slots=False):
+    skipping = PeripheralSimulator(words, timeline, delay_slots=delay_slots)
+    stepping = PeripheralSimulator(words, timeline, skip_idle=False, delay_slots=delay_slots)
+    for cycles in chunks:
+        skipping.run(cycles)
+        stepping.run(cycles)
+        assert skipping.events == stepping.events
+        assert (skipping.pc, skipping.delayed, skipping.cycles) == (stepping.pc, stepping.delayed, stepping.cycles)
+        assert skipping.registers == stepping.registers
+        assert skipping.memory == stepping.memory
+    return skipping, stepping
+
+## @brief Running every cycle captures the events of a stepped Simulator.
+@pytest.mark.parametrize('delay_slots', [False, True])
+@pytest.mark.parametrize('source', [POLLING, STORING, COUNTING])
+def test_stepping_matches_simulator(source, delay_slots):
+    words = assemble(source)
+    stepping = PeripheralSimulator(words, TIMELINE, skip_idle=False, delay_slots=delay_slots)
+    stepping.run(25000)
+    simulator, events = reference_run(words, TIMELINE, 25000, delay_slots=delay_slots)
+    assert stepping.events == events
+    assert stepping.registers == simulator.registers
+    assert stepping.memory == simulator.memory
+    assert stepping.pc == simulator.pc
+
+## @brief Idle loops are skipped, with the same events and state as running every cycle.
+@pytest.mark.parametrize('delay_slots', [False, True])
+@pytest.mark.parametrize('source', [POLLING, STORING])
+def test_idle_skipping(source, delay_slots):
+    skipping, stepping = run_both(assemble(source), TIMELINE, (1, 499, 1, 1, 2000, 30000), delay_slots)
+    assert skipping.skipped > 20000
+    assert stepping.skipped == 0
+    assert skipping.events
+
+## @brief Programs changing the memory on every poll are never skipped.
+def test_busy_polling_not_skipped():
+    skipping, _ = run_both(assemble(COUNTING), TIMELINE, (30000,))
+    assert skipping.skipped == 0
+
+## @brief Generated programs, reading the switches here and there, give the same results skipping or not.
+@pytest.mark.parametrize('seed', range(10))
+def test_generated_programs(seed):
+    timeline = [(cycle, seed * cycle) for cycle in range(0, 3000, 700)]
+    run_both(assemble(generate_program(80, seed=seed)), timeline, (100, 1000, 3000))
+
+## @brief Timelines are sorted by cycle, later lines winning on the same cycle.
+def test_read_timeline():
+    timeline = read_timeline(io.StringIO('# comment\n5000 0x2A ; later\n0 0\n\n5000 7\n10 -1\n'))
+    assert timeline == [(0, 0), (10, 0xFFFFFFFF), (5000, 0x2A), (5000, 7)]
+    with pytest.raises(ValueError):
+        read_timeline(io.StringIO('5000\n'))
+
+## @brief The command line reports the program and the timeline it can't read, each with its own message.
+@pytest.mark.parametrize('program, timeline, message', [
+    ('missing.qtf', None, 'Could not read the program.'),
+    ('program.qtf', 'missing.txt', 'Could not read the timeline.')
+])
+def test_main_unreadable(tmp_path, monkeypatch, capsys, program, timeline, message):
+    import Peripherals
+    (tmp_path / 'program.qtf').write_text(POLLING)
+    arguments = [str(tmp_path / program)] + ([str(tmp_path / timeline)] if timeline else [])
+    monkeypatch.setattr('sys.argv', ['Peripherals.py'] + arguments)
+    with pytest.raises(SystemExit):
+        Peripherals.main()
+    assert capsys.readouterr().err.startswith(message)
@@ -0,0 +1,55 @@
+## @file
+## @brief Pipeline timing model tests.
+
+import os
+
+from Assembler import assemble
+from Pipeline import Pipeline
+from Simulator import load_program
+
+## @brief Path to the example programs.
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'doc', 'examples')
+
+## @brief Runs an example program on the pipeline model.
+## @return The pipeline.
+def run_example(name, cycles=500):
+    pipeline = Pipeline(load_program(os.path.join(EXAMPLES, name)))
+    pipeline.run(cycles)
+    return pipeline
+
+## @brief Calls link the address past the delay slot, so the move on the delay slot of call runs once, before mul.
+def test_call_links_past_delay_slot():
+    pipeline = run_example('CALL.qtf')
+    assert pipeline.simulator.hex == (0, 0, 0)
+    # call is on address 4, after the li $a loading the address of mul.
+    assert pipeline.simulator.registers[30] == 6
+
+## @brief The delay slot runs once per call.
+def test_call_delay_slot_runs_once():
+    pipeline = Pipeline(load_program(os.path.join(EXAMPLES, 'CALL.qtf')), timeline=500)
+    pipeline.run(500)
+    assert sum(1 for entry in pipeline.timeline if entry.address == 5) == 1
+
+## @brief Flushes are charged to the taken jump, not to the instruction on its delay slot.
+def test_flush_causes():
+    pipeline = Pipeline(assemble('li $1, 1\nli $2, 2\nloop:\nsub $2, $1\njne $2, $zero, loop\nnoop\nend:\nj end\nnoop\n'), timeline=40)
+    pipeline.run(40)
+    # Jumps to labels load the address on $31 first: jne is on address 4, and is taken once, flushing fetch and decode.
+    assert pipeline.stalls['branch flush'] == 2
+    assert pipeline.address_stalls['branch flush'][4] == 2
+    # j on address 7 is taken on every iteration of the end loop.
+    taken = sum(1 for entry in pipeline.timeline if entry.address == 7)
+    assert pipeline.stalls['jump'] == pipeline.address_stalls['jump'][7] >= 2 * taken > 0
+
+## @brief The timeline keeps only the first instructions up to its limit, and none by default.
+def test_timeline_limit():
+    words = load_program(os.path.join(EXAMPLES, 'MUL.qtf'))
+    limited = Pipeline(words, timeline=10)
+    limited.run(300)
+    every = Pipeline(words, timeline=300)
+    every.run(300)
+    assert [vars(entry) for entry in limited.timeline] == [vars(entry) for entry in every.timeline[:10]]
+    assert len(every.timeline) > 10
+    default = Pipeline(words)
+    default.run(300)
+    assert default.timeline == []
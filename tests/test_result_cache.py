@@ -0,0 +1,114 @@
+## @file
+## @brief Assembler result cache tests.
+
+import os
+
+from resultCache import ResultCache, assembler_fingerprint
+
+## @brief An assembler result.
+def result(assembly):
+    return {'error': False, 'output': '', 'errors': [], 'assembly': assembly}
+
+## @brief Lookups count hits and misses.
+def test_hits_and_misses():
+    cache = ResultCache('1')
+    key = cache.key('li $1, 1\n', {})
+    assert cache.get(key) is None
+    cache.put(key, result('a'))
+    assert cache.get(key) == result('a')
+    assert cache.get(key) == result('a')
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (2, 1, 1)
+
+## @brief Past the cap, the least recently used result is evicted.
+def test_eviction():
+    cache = ResultCache('1', max_entries=2)
+    cache.put('a', result('a'))
+    cache.put('b', result('b'))
+    # Using a makes b the least recently used.
+    cache.get('a')
+    cache.put('c', result('c'))
+    assert cache.get('b') is None
+    assert cache.get('a') == result('a')
+    assert cache.get('c') == result('c')
+    stats = cache.stats()
+    assert (stats['evictions'], stats['entries']) == (1, 2)
+
+## @brief Keys change with the program, the options and the assembler version.
+def test_keys():
+    cache = ResultCache('1')
+    key = cache.key('li $1, 1\n', {'data_radix': 'BIN'})
+    assert key == cache.key('li $1, 1\n', {'data_radix': 'BIN'})
+    assert key != cache.key('li $1, 2\n', {'data_radix': 'BIN'})
+    assert key != cache.key('li $1, 1\n', {'data_radix': 'HEX'})
+    assert key != ResultCache('2').key('li $1, 1\n', {'data_radix': 'BIN'})
+
+## @brief Changing any assembler source changes the fingerprint, so results of the old assembler aren't served.
+def test_fingerprint_invalidates(tmp_path):
+    source = tmp_path / 'Assembler.py'
+    source.write_text('version = 1\n')
+    (tmp_path / 'notes.txt').write_text('not hashed\n')
+    old = assembler_fingerprint(str(tmp_path))
+
+    (tmp_path / 'notes.txt').write_text('changed\n')
+    assert assembler_fingerprint(str(tmp_path)) == old
+
+    source.write_text('version = 2\n')
+    new = assembler_fingerprint(str(tmp_path))
+    assert new != old
+
+    key = ResultCache(old).key('li $1, 1\n', {})
+    cache = ResultCache(new)
+    cache.put(ResultCache(new).key('li $1, 1\n', {}), result('new'))
+    assert cache.get(key) is None
+
+## @brief Results on disk survive restarts.
+def test_disk(tmp_path):
+    cache = ResultCache('1', directory=str(tmp_path))
+    cache.put('a', result('a'))
+
+    restarted = ResultCache('1', directory=str(tmp_path))
+    assert restarted.get('a') == result('a')
+    assert restarted.stats()['disk_entries'] == 1
+
+## @brief The directory holds at most the cap, deleting the least recently used files.
+def test_disk_eviction(tmp_path):
+    cache = ResultCache('1', max_entries=2, directory=str(tmp_path))
+    cache.put('a', result('a'))
+    cache.put('b', result('b'))
+    cache.load('a')
+    cache.put('c', result('c'))
+    assert sorted(os.listdir(str(tmp_path))) == ['a.json', 'c.json']
+    stats = cache.stats()
+    assert (stats['disk_evictions'], stats['disk_entries']) == (1, 2)
+
+## @brief A smaller cap on restart prunes the directory, keeping the most recently used files.
+def test_disk_pruned_on_restart(tmp_path):
+    cache = ResultCache('1', max_entries=3, directory=str(tmp_path))
+    for index, key in enumerate('abc'):
+        cache.put(key, result(key))
+        os.utime(cache.path(key), (index, index))
+
+    restarted = ResultCache('1', max_entries=1, directory=str(tmp_path))
+    assert os.listdir(str(tmp_path)) == ['c.json']
+    assert restarted.stats()['disk_evictions'] == 2
+
+## @brief Results that can't be written to disk are kept in memory, without leaving temporary files behind.
+def test_disk_write_failure(tmp_path, monkeypatch):
+    cache = ResultCache('1', directory=str(tmp_path))
+    def full_disk(source, destination):
+        raise OSError(28, 'No space left on device')
+    monkeypatch.setattr(os, 'replace', full_disk)
+    cache.put('a', result('a'))
+    assert os.listdir(str(tmp_path)) == []
+    assert cache.get('a') == result('a')
+    assert cache.stats()['disk_entries'] == 0
+
+## @brief A directory that can't be written to only keeps results in memory.
+def test_disk_unwritable(tmp_path):
+    cache = ResultCache('1', directory=str(tmp_path))
+    (tmp_path / 'file').write_text('')
+    cache.directory = str(tmp_path / 'file')
+    cache.put('a', result('a'))
+    assert cache.get('a') == result('a')
+    assert cache.stats()['disk_entries'] == 0
@@ -0,0 +1,76 @@
+## @file
+## @brief Scheduler tests.
+
+import os
+
+import pytest
+
+from Assembler import assemble_program
+from Pipeline import Pipeline
+from Simulator import disassemble
+
+## @brief Path to the example programs.
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'doc', 'examples')
+
+## @brief Assembles a program with and without scheduling.
+## @return The plain and the scheduled words.
+def assemble_both(source):
+    return assemble_program(source).words, assemble_program(source, schedule=True).words
+
+## @brief Runs a program on the pipeline model.
+## @return The pipeline.
+def run(words, cycles=500):
+    pipeline = Pipeline(words)
+    pipeline.run(cycles)
+    return pipeline
+
+## @brief A load and its use are split by an independent instruction, removing the stall.
+def test_load_use_separated():
+    plain, scheduled = assemble_both('li $1, 5\nstore $1, $zero\nload $2, $zero\nadd $2, $2\nli $3, 7\nend:\nj end\nnoop\n')
+    assert [disassemble(word) for word in scheduled[:5]] == ['li $1, 5', 'store $1, $0', 'load $2, $0', 'li $3, 7', 'add $2, $2']
+    assert run(plain).stalls['load-use'] == 1
+    assert run(scheduled).stalls['load-use'] == 0
+
+## @brief Dependent instructions keep their order: the only candidate writes the register the use reads.
+def test_dependencies_kept():
+    plain, scheduled = assemble_both('load $2, $zero\nadd $3, $2\nli $2, 7\n')
+    assert scheduled == plain
+
+## @brief Stores aren't moved across loads, nor instructions using the IO registers across each other.
+def test_memory_and_io_order_kept():
+    # The second load only depends on the store, through the memory.
+    plain, scheduled = assemble_both('load $2, $zero\nadd $2, $2\nstore $2, $4\nload $5, $4\n')
+    assert scheduled == plain
+    # The move to hex1 only depends on the move to hex0, through the IO.
+    plain, scheduled = assemble_both('load $2, $zero\nmove $hex0, $2\nmove $hex1, $3\n')
+    assert scheduled == plain
+
+## @brief Instructions aren't moved across labels, jumps or delay slots.
+@pytest.mark.parametrize('source', [
+    # The independent instruction is past a label.
+    'load $2, $zero\nadd $2, $2\nnext:\nli $3, 7\n',
+    # The independent instruction is past a jump, on its delay slot.
+    'load $2, $zero\nadd $2, $2\nj next\nli $3, 7\nnext:\nmove $hex0, $2\n',
+    # The load is on the delay slot of a branch.
+    'jne $1, $zero, next\nload $2, $zero\nadd $2, $2\nli $3, 7\nnext:\nmove $hex0, $2\n',
+    # The use of the load is right after a call.
+    'load $30, $zero\ncall $ra, next\nadd $1, $1\nli $3, 7\nnext:\nmove $hex0, $1\n',
+])
+def test_blocks_kept(source):
+    plain, scheduled = assemble_both(source)
+    assert scheduled == plain
+
+## @brief Scheduled programs end on the same state, in fewer cycles when they stalled on loads.
+@pytest.mark.parametrize('source', [
+    'li $1, 5\nli $4, 2\nstore $1, $4\nload $2, $4\nadd $2, $2\nli $3, 7\nmove $hex0, $2\nend:\nj end\nnoop\n',
+    'li $1, 3\nli $4, 1\nloop:\nstore $1, $1\nload $2, $1\nadd $5, $2\nsub $1, $4\nmove $hex0, $5\njne $1, $zero, loop\nnoop\nend:\nj end\nnoop\n',
+] + [os.path.join(EXAMPLES, name) for name in sorted(os.listdir(EXAMPLES)) if name.endswith('.qtf')])
+def test_state_unchanged(source):
+    if source.endswith('.qtf'):
+        with open(source, 'r') as file:
+            source = file.read()
+    plain, scheduled = assemble_both(source)
+    plain_run, scheduled_run = run(plain), run(scheduled)
+    assert scheduled_run.simulator.registers == plain_run.simulator.registers
+    assert scheduled_run.simulator.memory == plain_run.simulator.memory
+    assert scheduled_run.stalls['load-use'] <= plain_run.stalls['load-use']
@@ -0,0 +1,117 @@
+## @file
+## @brief Instruction set simulator tests.
+## @details The pipeline model follows the hardware, so it's the reference: with delay slots the simulator must execute
+## @details the same instructions in the same order, and end on the same state.
+
+import os
+
+import pytest
+
+from Assembler import assemble, register_aliases
+from Pipeline import Pipeline, Bubble
+from Simulator import Simulator, load_program
+from program_generator import generate_program
+
+## @brief Path to the example programs.
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'doc', 'examples')
+## @brief The example programs.
+EXAMPLE_NAMES = sorted(name for name in os.listdir(EXAMPLES) if name.endswith('.qtf'))
+
+## @brief Examples with an instruction other than a noop after a taken jump, which the architectural model skips.
+DELAY_SLOT_EXAMPLES = ('CALL.qtf',)
+
+## @brief Runs a program on the pipeline model.
+## @return The pipeline, and the number of instructions it executed.
+def run_pipeline(words, cycles, switches=0):
+    pipeline = Pipeline(words, switches, timeline=cycles)
+    pipeline.run(cycles)
+    # Instructions are executed as they enter the execute stage.
+    in_flight = (pipeline.execute_slot, pipeline.memory_slot, pipeline.write_back_slot)
+    return pipeline, len(pipeline.timeline) + sum(1 for entry in in_flight if not isinstance(entry, Bubble))
+
+## @brief Runs a program on the simulator, one instruction at a time.
+## @return The simulator and the address of each instruction executed.
+def run_simulator(words, cycles, switches=0, delay_slots=True):
+    simulator = Simulator(words, switches, delay_slots)
+    addresses = []
+    for _ in range(cycles):
+        addresses.append(simulator.pc)
+        simulator.step()
+    return simulator, addresses
+
+## @brief Checks the simulator with delay slots runs as the pipeline.
+def check_pipeline(words, cycles=400, switches=0):
+    pipeline, executed = run_pipeline(words, cycles, switches)
+    simulator, addresses = run_simulator(words, executed, switches)
+    assert addresses[:len(pipeline.timeline)] == [entry.address for entry in pipeline.timeline]
+    assert simulator.registers == pipeline.simulator.registers
+    assert simulator.memory == pipeline.simulator.memory
+
+## @brief With delay slots, every example runs as on the pipeline.
+@pytest.mark.parametrize('name', EXAMPLE_NAMES)
+@pytest.mark.parametrize('switches', [0, 0x2A])
+def test_examples_delay_slots(name, switches):
+    check_pipeline(load_program(os.path.join(EXAMPLES, name)), switches=switches)
+
+## @brief Without delay slots, examples with nothing but noops after taken jumps end as on the pipeline.
+@pytest.mark.parametrize('name', [name for name in EXAMPLE_NAMES if name not in DELAY_SLOT_EXAMPLES])
+def test_examples_architectural(name):
+    words = load_program(os.path.join(EXAMPLES, name))
+    pipeline, _ = run_pipeline(words, 500, 0x2A)
+    simulator = Simulator(words, 0x2A)
+    simulator.run(500)
+    assert simulator.hex == pipeline.simulator.hex
+    assert simulator.leds == pipeline.simulator.leds
+
+## @brief The move after call runs on its delay slot on the hardware, before mul, and not after returning.
+def test_call_example():
+    words = load_program(os.path.join(EXAMPLES, 'CALL.qtf'))
+    architectural = Simulator(words)
+    architectural.run(500)
+    assert architectural.hex[0] == 0xC
+    delayed = Simulator(words, delay_slots=True)
+    delayed.run(500)
+    assert delayed.hex[0] == 0
+    assert delayed.registers[register_aliases['ra']] == 6
+
+## @brief Jumps on delay slots, untaken branches, and calls and jumps to the next addresses run as on the pipeline.
+@pytest.mark.parametrize('source', [
+    # A jump on the delay slot of a jump is followed at once.
+    'li $1, 9\nli $2, 12\nj $1\nj $2\nli $3, 1\nli $4, 1\nli $5, 1\nli $6, 1\nli $7, 1\nli $8, 1\nli $9, 1\nli $10, 1\nli $11, 1\nend:\nj end\nnoop\n',
+    # An untaken branch on the delay slot of a jump.
+    'li $1, 1\nj skip\njne $zero, $zero, $1\nli $2, 2\nskip:\nli $3, 3\nend:\nj end\nnoop\n',
+    # A call on the delay slot of a branch, and a call to the next address.
+    'li $1, 1\nli $2, 7\nli $3, 5\njne $1, $zero, $2\ncall $ra, $3\nli $4, 4\nli $5, 5\ncall $6, $zero\nli $7, 7\n',
+    # A call linking $zero is a jump.
+    'li $1, 4\ncall $zero, $1\nli $2, 2\nli $3, 3\nli $4, 4\nend:\nj end\nnoop\n',
+    # A jump to the address after its delay slot.
+    'li $1, 3\nj $1\nli $2, 2\nli $3, 3\nend:\nj end\nnoop\n',
+])
+def test_delay_slot_cases(source):
+    check_pipeline(assemble(source))
+
+## @brief Generated programs, with many jumps, branches and calls, run as on the pipeline.
+@pytest.mark.parametrize('seed', range(20))
+def test_generated_programs(seed):
+    check_pipeline(assemble(generate_program(80, seed=seed)), cycles=600, switches=seed)
+
+## @brief Runs are resumable: a run split in many gives the same state.
+@pytest.mark.parametrize('delay_slots', [False, True])
+def test_split_runs(delay_slots):
+    words = assemble(generate_program(80, seed=3))
+    whole = Simulator(words, 5, delay_slots)
+    whole.run(700)
+    split = Simulator(words, 5, delay_slots)
+    for cycles in (1, 2, 3, 5, 89, 600):
+        split.run(cycles)
+    assert (split.pc, split.delayed, split.cycles) == (whole.pc, whole.delayed, whole.cycles)
+    assert split.registers == whole.registers
+    assert split.memory == whole.memory
+
+## @brief Writes to $zero and $switches are ignored.
+def test_read_only_registers():
+    simulator = Simulator(assemble('li $zero, 5\nli $switches, 5\nmove $1, $switches\n'), switches=3)
+    simulator.run(3)
+    assert simulator.registers[0] == 0
+    assert simulator.switches == 3
+    assert simulator.registers[1] == 3
@@ -0,0 +1,54 @@
+## @file
+## @brief Hot spot profiler tests.
+
+import os
+
+from Assembler import assemble_program
+from Pipeline import Pipeline
+from SourceProfiler import SourceProfile, count_instructions
+
+## @brief Path to the example programs.
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'doc', 'examples')
+
+## @brief Profiles an example program on the pipeline model.
+## @return The source, the pipeline and the SourceProfile.
+def profile_pipeline(name, cycles=60):
+    with open(os.path.join(EXAMPLES, name), 'r') as file:
+        source = file.read()
+    program = assemble_program(source)
+    pipeline = Pipeline(program.words)
+    pipeline.run(cycles)
+    return source, pipeline, SourceProfile(source, program.source_map, program.symbols, pipeline.retired, pipeline.address_stalls)
+
+## @brief Returns the number of the first source line holding some text.
+def find_line(source, text):
+    return next(lineno for lineno, line in enumerate(source.split('\n'), 1) if text in line)
+
+## @brief Branch flushes of a loop are charged to the line and label of its branch, jump flushes to the jump.
+def test_flushes_charged_to_branch_line():
+    source, _, profile = profile_pipeline('MUL.qtf')
+    causes = profile.causes
+    branch = find_line(source, 'jne')
+    jump = find_line(source, 'j end')
+
+    # The loop runs three times, its branch is taken twice and flushes two cycles each time.
+    assert profile.lines[branch][1][causes.index('branch flush')] == 4
+    assert profile.labels['soma'][1][causes.index('branch flush')] == 4
+    assert sum(lost[causes.index('branch flush')] for _, lost in profile.lines.values()) == 4
+    assert profile.lines[branch][1][causes.index('jump')] == 0
+    assert profile.lines[jump][1][causes.index('jump')] > 0
+
+## @brief Every retired instruction and lost cycle of the run is charged somewhere.
+def test_cycles_charged():
+    _, pipeline, profile = profile_pipeline('MUL.qtf')
+    assert profile.cycles == pipeline.instructions + sum(pipeline.stalls.values())
+
+## @brief On the simulator, each executed instruction is a cycle on its line.
+def test_simulator_counts():
+    with open(os.path.join(EXAMPLES, 'OP.qtf'), 'r') as file:
+        source = file.read()
+    program = assemble_program(source)
+    executed = count_instructions(program.words, 0, len(program.words))
+    profile = SourceProfile(source, program.source_map, program.symbols, executed)
+    assert profile.causes == ()
+    assert all(profile.lines[lineno] == (1, ()) for lineno in program.source_map)
@@ -0,0 +1,107 @@
+## @file
+## @brief Execution trace recorder tests.
+## @details TraceSimulator must run as Simulator, and moving to any earlier cycle must give the state Simulator had on it.
+
+import os
+
+import pytest
+
+from Assembler import assemble
+from Simulator import Simulator, load_program
+from TraceSimulator import TraceSimulator, save_trace, load_trace, no_register
+from program_generator import generate_program
+
+## @brief Path to the example programs.
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'doc', 'examples')
+
+## @brief Runs a program on the simulator up to a cycle.
+## @return The simulator.
+def reference_at(words, cycle, switches=0, delay_slots=False):
+    simulator = Simulator(words, switches, delay_slots)
+    simulator.run(cycle)
+    return simulator
+
+## @brief Checks the trace simulator is on the same state as the simulator.
+def assert_same_state(simulator, reference):
+    assert (simulator.pc, simulator.cycles, simulator.delayed) == (reference.pc, reference.cycles, reference.delayed)
+    assert simulator.registers == reference.registers
+    assert simulator.memory == reference.memory
+
+## @brief A generated program, with stores, register jumps and calls.
+def program_words(seed):
+    return assemble(generate_program(80, seed=seed))
+
+## @brief Runs match the simulator, traced or not.
+@pytest.mark.parametrize('delay_slots', [False, True])
+@pytest.mark.parametrize('seed', range(5))
+def test_runs(seed, delay_slots):
+    words = program_words(seed)
+    simulator = TraceSimulator(words, seed, delay_slots, capacity=50, checkpoint_interval=16)
+    for cycles in (1, 10, 49, 200):
+        simulator.run(cycles)
+        assert_same_state(simulator, reference_at(words, simulator.cycles, seed, delay_slots))
+
+## @brief The records are the instructions the simulator ran, with the values they wrote.
+@pytest.mark.parametrize('delay_slots', [False, True])
+def test_records(delay_slots):
+    words = program_words(1)
+    simulator = TraceSimulator(words, 1, delay_slots, capacity=64)
+    simulator.run(300)
+    records = list(simulator.trace)
+    assert [record.cycle for record in records] == list(range(300 - 64, 300))
+
+    reference = reference_at(words, 300 - 64, 1, delay_slots)
+    for record in records:
+        assert record.pc == reference.pc
+        before = list(reference.registers)
+        reference.step()
+        if record.register != no_register:
+            assert (record.old, record.new) == (before[record.register], reference.registers[record.register])
+
+## @brief Stepping back one cycle at a time, through the records and then the checkpoints, gives each earlier state.
+@pytest.mark.parametrize('delay_slots', [False, True])
+def test_step_back(delay_slots):
+    words = program_words(2)
+    # The trace holds less than the run, so stepping back crosses from the records to the checkpoints.
+    simulator = TraceSimulator(words, 2, delay_slots, capacity=40, checkpoint_interval=16)
+    simulator.run(120)
+    for cycle in range(119, -1, -1):
+        simulator.step_back()
+        assert_same_state(simulator, reference_at(words, cycle, 2, delay_slots))
+
+## @brief Seeking backwards and forwards across checkpoint boundaries lands on the same states as running there.
+@pytest.mark.parametrize('delay_slots', [False, True])
+@pytest.mark.parametrize('seed', range(3))
+def test_seek_round_trips(seed, delay_slots):
+    words = program_words(seed)
+    simulator = TraceSimulator(words, seed, delay_slots, capacity=40, checkpoint_interval=16)
+    simulator.run(300)
+    # Within the trace, on checkpoints, just before and after them, and past the trace.
+    for cycle in (299, 280, 265, 256, 255, 257, 300, 100, 97, 128, 15, 16, 17, 0, 1, 250, 33):
+        simulator.seek(cycle)
+        assert_same_state(simulator, reference_at(words, cycle, seed, delay_slots))
+    # Forwards again, on to new cycles.
+    simulator.run(150)
+    assert_same_state(simulator, reference_at(words, 183, seed, delay_slots))
+
+## @brief Replays start after switches changes, with the value the switches had.
+def test_switches_change():
+    words = load_program(os.path.join(EXAMPLES, 'IO.qtf'))
+    simulator = TraceSimulator(words, 1, capacity=4, checkpoint_interval=16)
+    simulator.run(3)
+    simulator.switches = 7
+    simulator.run(40)
+    simulator.seek(2)
+    assert simulator.switches == 1
+    assert_same_state(simulator, reference_at(words, 2, 1))
+
+## @brief Saved traces load back with the program and the records.
+def test_save_and_load(tmp_path):
+    words = program_words(4)
+    simulator = TraceSimulator(words, 4, capacity=30)
+    simulator.run(100)
+    path = str(tmp_path / 'run.qtr')
+    save_trace(path, simulator.words, simulator.trace)
+    loaded_words, records = load_trace(path)
+    assert loaded_words == simulator.words
+    assert records == list(simulator.trace)
@@ -0,0 +1,147 @@
+## @file
+## @brief Vectorized simulator tests.
+## @details Each lane must end on the same state as a Simulator running its program and switches.
+
+import os
+
+import pytest
+
+numpy = pytest.importorskip('numpy')
+
+from Assembler import assemble
+from Simulator import Simulator, load_program
+from VectorSimulator import VectorSimulator
+from program_generator import generate_program
+
+## @brief Path to the example programs.
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'doc', 'examples')
+## @brief The example programs.
+EXAMPLE_NAMES = sorted(name for name in os.listdir(EXAMPLES) if name.endswith('.qtf'))
+
+## @brief Counts down from the switches, so lanes leave the loop and halt on different cycles.
+COUNTDOWN = (
+    'li $1, 1\n'
+    'move $2, $switches\n'
+    'loop:\n'
+    'je $2, $zero, done\n'
+    'add $3, $2\n'
+    'store $3, $2\n'
+    'sub $2, $1\n'
+    'j loop\n'
+    'done:\n'
+    'move $hex0, $3\n'
+    'end:\n'
+    'j end\n'
+)
+
+## @brief Checks each lane is on the same state as its simulator.
+def assert_lanes(vector, simulators):
+    for lane, simulator in enumerate(simulators):
+        assert vector.pc[lane] == simulator.pc
+        assert list(vector.registers[:, lane]) == simulator.registers
+        assert list(vector.memory[:, lane]) == simulator.memory
+
+## @brief Runs the lanes and a simulator per lane in the same chunks of cycles, comparing the state after each.
+## @return The vectorized simulator.
+def check_lanes(programs, switches, chunks, delay_slots=False):
+    vector = VectorSimulator(programs, switches, delay_slots)
+    simulators = [Simulator(program, value, delay_slots) for program, value in zip(programs, switches)]
+    for cycles in chunks:
+        vector.run(cycles)
+        for simulator in simulators:
+            simulator.run(cycles)
+        assert vector.cycles == simulators[0].cycles
+        assert_lanes(vector, simulators)
+    return vector
+
+## @brief Lanes diverging on the switches loop for different counts and halt on different cycles.
+def test_countdown():
+    switches = [0, 1, 2, 5, 17, 3, 40]
+    words = assemble(COUNTDOWN)
+    vector = check_lanes([words] * len(switches), switches, (1, 7, 30, 100, 400))
+    assert vector.halted.all()
+    assert list(vector.hex[0]) == [value * (value + 1) // 2 for value in switches]
+
+## @brief Lanes halt on different cycles: some halted while others still run.
+def test_halting_on_different_cycles():
+    words = assemble(COUNTDOWN)
+    vector = VectorSimulator(words, [0, 50])
+    vector.run(30)
+    assert list(vector.halted) == [True, False]
+    simulator = Simulator(words, 50)
+    simulator.run(30)
+    assert vector.pc[1] == simulator.pc
+    vector.run(500)
+    assert vector.halted.all()
+
+## @brief A single program is shared by every switch value.
+def test_single_program():
+    words = assemble(COUNTDOWN)
+    vector = VectorSimulator(words, [4, 9])
+    vector.run(200)
+    assert list(vector.hex[0]) == [10, 45]
+
+## @brief Lanes running different programs, the examples, end as their simulators.
+def test_examples():
+    programs = [load_program(os.path.join(EXAMPLES, name)) for name in EXAMPLE_NAMES]
+    check_lanes(programs, [0x2A] * len(programs), (1, 3, 20, 500))
+
+## @brief Generated programs, jumping through registers and calls, diverge on their switches as their simulators.
+@pytest.mark.parametrize('seed', range(10))
+def test_generated_programs(seed):
+    words = assemble(generate_program(80, seed=seed))
+    switches = [0, 1, seed, 0x7FFFFFFF, 0xFFFFFFFF]
+    check_lanes([words] * len(switches), switches, (5, 60, 400))
+
+## @brief Lanes of different generated programs, sharing the words they have in common.
+def test_different_generated_programs():
+    programs = [assemble(generate_program(60, seed=seed)) for seed in range(6)]
+    check_lanes(programs, list(range(6)), (9, 90, 300))
+
+## @brief With delay slots, lanes running the examples end as their simulators do, as on the hardware.
+## @details CALL links past the delay slot, MUL and IO branch on their switches.
+@pytest.mark.parametrize('name', EXAMPLE_NAMES)
+def test_examples_delay_slots(name):
+    words = load_program(os.path.join(EXAMPLES, name))
+    switches = [0, 1, 3, 0x2A, 0xFFFF]
+    check_lanes([words] * len(switches), switches, (1, 2, 9, 40, 500), delay_slots=True)
+
+## @brief CALL shows the delay slots: the architectural model leaves 12 on hex0, the hardware 0.
+def test_call_delay_slots():
+    words = load_program(os.path.join(EXAMPLES, 'CALL.qtf'))
+    architectural = VectorSimulator(words, [0, 5])
+    architectural.run(200)
+    hardware = VectorSimulator(words, [0, 5], delay_slots=True)
+    hardware.run(200)
+    assert list(architectural.hex[0]) == [12, 12]
+    assert list(hardware.hex[0]) == [0, 0]
+    assert hardware.halted.all()
+
+## @brief Lanes diverging on branches with delay slots loop, halt and end as their simulators.
+def test_countdown_delay_slots():
+    switches = [0, 1, 2, 5, 17]
+    vector = check_lanes([assemble(COUNTDOWN)] * len(switches), switches, (1, 7, 30, 100, 400), delay_slots=True)
+    assert vector.halted.all()
+
+## @brief A halt loop reached as a delay slot doesn't halt: the lane goes on to the jump target.
+def test_halt_loop_on_delay_slot():
+    # The jump at 2 has the halt loop at 3 as its delay slot, $31 already holding its address, and goes on to 6.
+    words = assemble('li $2, 6\nli $31, 3\nj $2\nli $31, 3\nj $31\nnoop\nli $hex0, 7\nstop:\nj stop\n')
+    vector = check_lanes([words], [0], (3, 1, 20), delay_slots=True)
+    assert vector.halted.all()
+    assert vector.hex[0, 0] == 7
+
+## @brief Generated programs, with taken jumps on delay slots, end as their simulators with delay slots.
+@pytest.mark.parametrize('seed', range(10))
+def test_generated_programs_delay_slots(seed):
+    words = assemble(generate_program(80, seed=seed))
+    switches = [0, 1, seed, 0x7FFFFFFF, 0xFFFFFFFF]
+    check_lanes([words] * len(switches), switches, (5, 60, 400), delay_slots=True)
+    programs = [assemble(generate_program(60, seed=seed * 6 + lane)) for lane in range(6)]
+    check_lanes(programs, list(range(6)), (9, 90, 300), delay_slots=True)
+
+## @brief Program and switch counts must match, or be one.
+def test_lane_count_mismatch():
+    words = assemble(COUNTDOWN)
+    with pytest.raises(ValueError):
+        VectorSimulator([words, words], [1, 2, 3])
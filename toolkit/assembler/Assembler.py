@@ -1,12 +1,47 @@
 ## @file
 ## @brief quanta assembler.
 
-import argparse
 import sys
 
-from Parser import parse
-from Util import to_fixed_length_bin, format_error, format_column_marker
+from Profiler import Profiler, disabled_profiler
+from Util import format_error_log, structure_error_log, AssemblerError, LineIndex
 from MIF import *
+from MemoryImage import MemoryImage
+
+## @brief The number of words on the instruction memory.
+memory_depth = 2**8
+
+## @brief Output formats supported by the command line.
+output_formats = ('mif', 'bin', 'hex', 'memh')
+
+## @brief Bit offset of the OPCODE on an instruction word.
+opcode_offset = 24
+
+## @brief Width of a register address field.
+reg_length = 5
+## @brief Width of an immediate field.
+immediate_length = 16
+
+## @brief Instruction word field layout for each instruction type.
+## @details Lists the (offset, width) of the field for each argument, in argument order.
+## @details Bits not covered by a field (padding and fill) are zero.
+type_layouts = {
+    'NOOP':       (),
+    'IMMEDIATE':  ((19, reg_length), (0, immediate_length)),
+    'SINGLE_REG': ((19, reg_length),),
+    'DOUBLE_REG': ((19, reg_length), (14, reg_length)),
+    'MEMORY':     ((19, reg_length), (14, reg_length)),
+    'JUMP':       ((9, reg_length),),
+    'BRANCH':     ((19, reg_length), (14, reg_length), (9, reg_length)),
+    'CALL':       ((19, reg_length), (9, reg_length))
+}
+
+## @brief Index of the argument that may be a label, for each instruction type that accepts one.
+label_arguments = {
+    'JUMP':   0,
+    'BRANCH': 2,
+    'CALL':   1
+}
 
 ## @brief Holds information about an instruction
 ## @details Used for defining instruction information for the assembler
@@ -18,6 +53,12 @@ class Instruction:
         self.type = type
         ## @brief The instruction OPCODE for the Assembler.
         self.opcode = opcode
+        ## @brief The (offset, width) of the word field for each argument.
+        self.layout = type_layouts[type]
+        ## @brief The OPCODE already shifted to its place on the word.
+        self.base_word = opcode << opcode_offset
+        ## @brief The (offset, mask) of the word field for each argument, precomputed for encoding.
+        self.fields = tuple((offset, (1 << width) - 1) for offset, width in self.layout)
 
         ## @brief The instruction alias for the lexer.
         self.alias = alias
@@ -74,207 +115,320 @@ register_aliases = {
     'a': 31
 }
 
-## @brief Checks if an instruction is using a label as argument.
-## @details Label instructions translate to more then one instruction.
-## @details Querying the type is needed when counting instructions.
-## @param line The entire parsed line.
-## @return Wether or not the instruction uses a label argument.
-def is_label_instruction(line):
-    instruction = instruction_aliases[line[0]]
-
-    # NOOP needs a special case as it has no args.
-    if instruction.type == 'NOOP':
-        return False
-
-    args = line[1]
-    result = False
-    result |= instruction.type == 'JUMP'   and isinstance(args[0], str)
-    result |= instruction.type == 'BRANCH' and isinstance(args[2], str)
-    result |= instruction.type == 'CALL'   and isinstance(args[1], str)
-
-    return result
-
-## @brief Creates a map of label identifiers to the corresponding instructions.
-## @param lines The output of the parser.
-## @return A map of labels and their corresponding instruction.
-def parse_labels(lines):
-    labels = {}
-    
-    index = 0
-    for _, line in lines:
-        is_label = instruction_aliases.get(line[0], 'LABEL_ID') == 'LABEL_ID'
-        if is_label:
-            # If a lable identifier is found, map it to the corresponding instruction.
-            labels[line[0]] = index
-        else:
-            index += 2 if is_label_instruction(line) else 1
-    
-    return labels
+## @brief Encodes an instruction into a word.
+## @param instruction The instruction class.
+## @param args The numeric instruction arguments.
+## @return The instruction word as an integer.
+def encode(instruction, args):
+    word = instruction.base_word
+    for (offset, mask), arg in zip(instruction.fields, args):
+        word |= (arg & mask) << offset
+    return word
+
+## @brief An assembled program.
+class Program:
+    def __init__(self, words, symbols, source_map=None):
+        ## @brief The 32 bit instruction words, as integers.
+        self.words = words
+        ## @brief The symbol table, maps each label to the address of its instruction.
+        self.symbols = symbols
+        ## @brief The source line number of each word, label address loads belong to the line using the label.
+        self.source_map = source_map
+        ## @brief The number of words removed by the optimizer.
+        self.words_saved = 0
+        ## @brief The estimated cycles before and after scheduling, None when not scheduled.
+        self.cycles_before = None
+        self.cycles_after = None
+
+## @brief Assembler error titles, singular and plural, in the order they are listed on messages.
+error_titles = {
+    'Invalid register alias': ('Invalid register alias:', 'Invalid register aliases:'),
+    'Register out of range': ('Register out of range, registers go from $0 to ${}:'.format(2**reg_length - 1),
+                              'Registers out of range, registers go from $0 to ${}:'.format(2**reg_length - 1)),
+    'Immediate out of range': ('Immediate out of range, immediates go up to {}:'.format(2**immediate_length - 1),
+                               'Immediates out of range, immediates go up to {}:'.format(2**immediate_length - 1)),
+    'Unknown label': ('Unknown label:', 'Unknown labels:')
+}
 
-## @brief Assembles a parsed program into binary words.
+## @brief Finds the column of a number on a source line, as written, with any leading zeros.
+## @param text The source line.
+## @param number The number value.
+## @param prefix The text before the number, as $ for registers.
+## @param start The position to search from.
+## @return The column, starting at 1.
+def find_number(text, number, prefix='', start=0):
+    # Only imported when reporting errors.
+    import re
+    match = re.compile(r'{}(?<!\d)0*{}(?!\d)'.format(re.escape(prefix), number)).search(text, start)
+    return match.start() + 1 if match else start + 1
+
+## @brief Assembles parsed lines.
+## @details The program is assembled in a single pass over the parsed lines.
+## @details Label arguments load a placeholder to the reserved register, patched once every label address is known.
+## @details Raises AssemblerError when the program is invalid, listing every invalid register alias, out of range register
+## @details or immediate, and unknown label.
 ## @param lines The output of the parser.
-## @return A list of the binary words corresponding to the input program.
-def assemble(data):
-    lines = parse(data)
-
-    word_length = 32
-    opcode_length = 8
-    reg_length = 5
+## @param line_index The line index of the source, for error messages.
+## @param profiler Records the encode and resolve phases, see Profiler.
+## @return The assembled Program, with its words, symbol table and source map.
+def assemble_lines(lines, line_index, profiler=disabled_profiler):
+    reserved_reg = register_aliases['a']
+    instruction_li = instruction_aliases['li']
 
-    reserved_reg = 31
-    instruction_li = [i for i in instructions if i.alias == 'li'][0]
+    # Errors found on each line, for each error type.
+    error_logs = {type: [] for type in error_titles}
 
     # Translates register aliases to the actual value.
-    def translate_named_regs(lineno, line):
+    # Returns None if any alias has no corresponding register, or any register or immediate is out of range.
+    def translate_named_regs(lineno, line, instruction):
         translated_regs = []
-        for reg in line[1]:
+        for index, reg in enumerate(line[1]):
+            if instruction.type == 'IMMEDIATE' and index == 1:
+                # Immediates are the last argument.
+                if reg >= 2**immediate_length:
+                    error_column = find_number(line_index.line(lineno), reg, start=line_index.line(lineno).rfind(','))
+                    error_logs['Immediate out of range'].append({'lineno': lineno, 'column': error_column})
+                    reg = None
+                translated_regs.append(reg)
+            elif isinstance(reg, int):
+                if reg >= 2**reg_length:
+                    error = {'lineno': lineno, 'column': find_number(line_index.line(lineno), reg, '$')}
+                    if error not in error_logs['Register out of range']:
+                        error_logs['Register out of range'].append(error)
+                    reg = None
+                translated_regs.append(reg)
             # Register aliases are parsed as tuples
-            if isinstance(reg, tuple):
+            elif isinstance(reg, tuple):
                 # Report if alias has no corresponding register
                 if reg[0] not in register_aliases:
-                    # Find error line on input string
-                    input_line = data.split('\n')[lineno - 1]
-                    # Find index of label on input string
-                    error_column = input_line.find(reg[0])
-
-                    # Construct the error message
-                    title = 'Assembler failed.\nInvalid register alias:'
-                    error_pointer = 'line {}> '.format(lineno)
-                    description = format_column_marker(input_line, error_column, error_pointer)
-                    
-                    sys.stderr.write(format_error(title, description))
-                    exit(-1)
-                translated_regs.append(register_aliases[reg[0]])
+                    # Find the alias on the input line, each alias is reported once per line.
+                    error_column = line_index.line(lineno).find('$' + reg[0]) + 1
+                    error = {'lineno': lineno, 'column': error_column}
+                    if error not in error_logs['Invalid register alias']:
+                        error_logs['Invalid register alias'].append(error)
+                    translated_regs.append(None)
+                else:
+                    translated_regs.append(register_aliases[reg[0]])
             else:
                 translated_regs.append(reg)
-        return tuple(translated_regs)
-
-    # Utility for loading an address to the reserved register.
-    # Useful when jumping to labels.
-    def load_reserved_reg(label):
-        if label not in labels:
-            # Find error line on input string
-            input_line = data.split('\n')[lineno - 1]
-            # Find index of label on input string
-            error_column = input_line.find(label)
-
-            # Construct the error message
-            title = 'Assembler failed.\nUnknown label:'
-            error_pointer = 'line {}> '.format(lineno)
-            description = format_column_marker(input_line, error_column, error_pointer)
-
-            sys.stderr.write(format_error(title, description))
-            exit(-1)
-
-        address = labels[label]
-        word  = to_fixed_length_bin(instruction_li.opcode, opcode_length) # OPCODE
-        word += to_fixed_length_bin(reserved_reg, reg_length)             # REGISTER
-        word += to_fixed_length_bin(0, 3)                                 # PADDING
-        word += to_fixed_length_bin(address, 16)                          # IMMEDIATE
-        return word    
-
-    labels = parse_labels(lines)
-    words = []
+        return None if None in translated_regs else tuple(translated_regs)
 
-    index = 0
-    for lineno, line in lines:
-        is_label = line != 'noop' and instruction_aliases.get(line[0], 'LABEL') == 'LABEL'
-        if not is_label:
+    words = []
+    symbols = {}
+    source_map = []
+    # The (word index, label, lineno) of each label argument, patched at the end.
+    # Every reference is patched, so a redefined label resolves to its last definition.
+    fixups = []
+
+    with profiler.phase('encode') as phase:
+        for lineno, line in lines:
             # Get the instruction class corresponding to the given alias.
-            instruction = instruction_aliases[line[0]]
-            
-            # Construct instruction word
-            if instruction.type == 'NOOP':
-                word  = to_fixed_length_bin(instruction.opcode, opcode_length) # OPCODE
-                word += to_fixed_length_bin(0, 24)                             # FILL
-                words.append(word)
+            # Label identifiers have none.
+            instruction = instruction_aliases.get(line[0])
+            if instruction is None:
+                # Labels point to the next instruction.
+                symbols[line[0]] = len(words)
+                continue
+
+            # NOOP has no arguments to translate.
+            args = () if instruction.type == 'NOOP' else translate_named_regs(lineno, line, instruction)
+            if args is None:
+                continue
+
+            label_argument = label_arguments.get(instruction.type)
+            # Checks for a label argument.
+            if label_argument is not None and isinstance(args[label_argument], str):
+                # Load the address to the reserved register, then use it as the argument.
+                fixups.append((len(words), args[label_argument], lineno))
+                words.append(None)
+                source_map.append(lineno)
+                args = args[:label_argument] + (reserved_reg,) + args[label_argument + 1:]
+
+            words.append(encode(instruction, args))
+            source_map.append(lineno)
+        phase.counts['words'] = len(words)
+
+    with profiler.phase('resolve') as phase:
+        for index, label, lineno in fixups:
+            if label in symbols:
+                words[index] = encode(instruction_li, (reserved_reg, symbols[label]))
             else:
-                # Translate register aliases after using them as arguments.
-                args = translate_named_regs(lineno, line)
-                if instruction.type == 'IMMEDIATE':
-                    word  = to_fixed_length_bin(instruction.opcode, opcode_length) # OPCODE
-                    word += to_fixed_length_bin(args[0], reg_length)               # REGISTER
-                    word += to_fixed_length_bin(0, 3)                              # PADDING
-                    word += to_fixed_length_bin(args[1], 16)                       # IMMEDIATE
-                    words.append(word)
-
-                elif instruction.type == 'SINGLE_REG':
-                    word  = to_fixed_length_bin(instruction.opcode, opcode_length) # OPCODE
-                    word += to_fixed_length_bin(args[0], reg_length)               # REGISTER
-                    word += to_fixed_length_bin(0, 19)                             # FILL
-                    words.append(word)
-
-                elif instruction.type == 'DOUBLE_REG' or instruction.type == 'MEMORY':
-                    word  = to_fixed_length_bin(instruction.opcode, opcode_length) # OPCODE
-                    word += to_fixed_length_bin(args[0], reg_length)               # REGISTER
-                    word += to_fixed_length_bin(args[1], reg_length)               # REGISTER
-                    word += to_fixed_length_bin(0, 14)                             # FILL
-                    words.append(word)
-
-                elif instruction.type == 'JUMP':
-                    is_label_jump = isinstance(args[0], str)
-                    # Checks for a jump to label instruction.
-                    if is_label_jump:
-                        # Load the address to the reserved register.
-                        word = load_reserved_reg(args[0])
-                        words.append(word)
-                    
-                    # When jumping to a label, the address is loaded to the reserved register.
-                    destination = reserved_reg if is_label_jump else args[0]
-                    word  = to_fixed_length_bin(instruction.opcode, opcode_length) # OPCODE
-                    word += to_fixed_length_bin(0, 10)                             # PADDING
-                    word += to_fixed_length_bin(destination, reg_length)           # REGISTER
-                    word += to_fixed_length_bin(0, 9)                              # FILL
-                    words.append(word)
-                elif instruction.type == 'BRANCH':
-                    is_label_branch = isinstance(args[2], str)
-                    # Checks for a branch to label instruction.
-                    if is_label_branch:
-                        # Load the address to the reserved register.
-                        word = load_reserved_reg(args[2])
-                        words.append(word)
-                    
-                    # When branching to a label, the address is loaded to the reserved register.
-                    destination = reserved_reg if is_label_branch else args[2]
-                    word  = to_fixed_length_bin(instruction.opcode, opcode_length) # OPCODE
-                    word += to_fixed_length_bin(args[0], reg_length)               # REGISTER
-                    word += to_fixed_length_bin(args[1], reg_length)               # REGISTER
-                    word += to_fixed_length_bin(destination, reg_length)           # REGISTER
-                    word += to_fixed_length_bin(0, 9)                              # FILL
-                    words.append(word)
-
-                elif instruction.type == 'CALL':
-                    is_label_call = isinstance(args[1], str)
-                    # Checks for a call instruction.
-                    if is_label_call:
-                        # Load the address to the reserved register.
-                        word = load_reserved_reg(args[1])
-                        words.append(word)
-
-                    # When calling a label, the address is loaded to the reserved register.
-                    destination = reserved_reg if is_label_call else args[1]
-                    word  = to_fixed_length_bin(instruction.opcode, opcode_length) # OPCODE
-                    word += to_fixed_length_bin(args[0], reg_length)               # REGISTER
-                    word += to_fixed_length_bin(0, 5)                              # PADDING
-                    word += to_fixed_length_bin(destination, reg_length)           # REGISTER
-                    word += to_fixed_length_bin(0, 9)                              # FILL
-                    words.append(word)
-            
-            index += 2 if is_label_instruction(line) else 1
-            
+                # Labels are always the last argument.
+                error_column = line_index.line(lineno).rfind(label) + 1
+                error_logs['Unknown label'].append({'lineno': lineno, 'column': error_column})
+        phase.counts['labels'] = len(symbols)
+        phase.counts['fixups'] = len(fixups)
+
+        # Report every error at once, grouped by type.
+        sections = []
+        errors = []
+        for type, (singular, plural) in error_titles.items():
+            if error_logs[type]:
+                sections.append(format_error_log(line_index, singular if len(error_logs[type]) == 1 else plural, error_logs[type]))
+                errors += structure_error_log(line_index, type, error_logs[type])
+        if errors:
+            raise AssemblerError('Assembler failed.\n' + '\n'.join(sections), errors)
+
+    return Program(words, symbols, source_map)
+
+## @brief Assembles a program.
+## @details Raises AssemblerError when the program is invalid, or doesn't fit on the instruction memory.
+## @details Optimized programs are checked for errors before optimizing, so errors on removed code are still reported.
+## @param data The program source.
+## @param optimize Whether to optimize the program, see Optimizer.
+## @param schedule Whether to reorder instructions to avoid pipeline stalls, see Scheduler.
+## @param profiler Records the phases of assembling, see Profiler.
+## @param depth The number of words the program must fit on, None to not check.
+## @return The assembled Program, with its words and symbol table.
+def assemble_program(data, optimize=False, schedule=False, profiler=disabled_profiler, depth=memory_depth):
+    # Imported on the first program, PLY is the slowest import of the assembler.
+    from Parser import parse
+
+    line_index = LineIndex(data)
+    lines = parse(data, line_index, profiler)
+    program = assemble_lines(lines, line_index, profiler)
+
+    if optimize:
+        # Only imported when optimizing, the optimizer depends on this module.
+        from Optimizer import optimize as optimize_lines
+        with profiler.phase('optimize') as phase:
+            lines = optimize_lines(lines)
+            phase.counts['lines'] = len(lines)
+        optimized = assemble_lines(lines, line_index, profiler)
+        optimized.words_saved = len(program.words) - len(optimized.words)
+        program = optimized
+
+    if schedule:
+        # Only imported when scheduling, the scheduler depends on this module.
+        from Scheduler import schedule as schedule_lines, estimate_cycles
+        with profiler.phase('schedule') as phase:
+            lines = schedule_lines(lines)
+            phase.counts['lines'] = len(lines)
+        scheduled = assemble_lines(lines, line_index, profiler)
+        scheduled.words_saved = program.words_saved
+        scheduled.cycles_before = estimate_cycles(program.words)
+        scheduled.cycles_after = estimate_cycles(scheduled.words)
+        program = scheduled
+
+    if depth is not None and len(program.words) > depth:
+        # Points at the instruction of the first word past the memory depth.
+        lineno = program.source_map[depth]
+        error = {'lineno': lineno, 'column': len(line_index.line(lineno)) - len(line_index.line(lineno).lstrip()) + 1}
+        title = 'Program too long, {} words for a memory depth of {}, first word past it on:'.format(len(program.words), depth)
+        raise AssemblerError('Assembler failed.\n' + format_error_log(line_index, title, [error]),
+                             structure_error_log(line_index, 'Program too long', [error]))
+
+    return program
+
+## @brief Assembles a program into words.
+## @details Raises AssemblerError when the program is invalid.
+## @param data The program source.
+## @param profiler Records the phases of assembling, see Profiler.
+## @return A list of the 32 bit words, as integers, corresponding to the input program.
+def assemble(data, profiler=disabled_profiler):
+    return assemble_program(data, profiler=profiler).words
+
+## @brief Assembles a program into a Memory Initialization File.
+## @param data The program source.
+## @param address_radix The radix of the addresses on the file.
+## @param data_radix The radix of the words on the file.
+## @param profiler Records the phases of assembling, see Profiler.
+## @return The MIF.
+def assemble_to_mif(data, address_radix='BIN', data_radix='BIN', profiler=disabled_profiler):
+    return MIF(32, memory_depth, address_radix, data_radix, assemble(data, profiler))
+
+## @brief Assembles a program into a Memory Initialization File.
+## @param data The program source.
+## @param address_radix The radix of the addresses on the file.
+## @param data_radix The radix of the words on the file.
+## @param profiler Records the phases of assembling and the format phase, see Profiler.
+## @return The MIF file as a string.
+def assemble_mif(data, address_radix='BIN', data_radix='BIN', profiler=disabled_profiler):
+    mif = assemble_to_mif(data, address_radix, data_radix, profiler)
+    with profiler.phase('format') as phase:
+        text = mif.as_file()
+        phase.counts['bytes'] = len(text)
+    return text
+
+## @brief Writes assembled words to a memory image file.
+## @details Files are streamed, they're never held in memory as a whole.
+## @param words The assembled words.
+## @param path The path to save the file.
+## @param format The file format, one of output_formats.
+## @param address_radix The radix of the addresses on MIF files.
+## @param data_radix The radix of the words on MIF files.
+## @param byteorder The byte order of each word on raw binary files.
+def write_output(words, path, format='mif', address_radix='BIN', data_radix='BIN', byteorder='little'):
+    if format == 'mif':
+        with open(path, 'w') as file:
+            MIF(32, memory_depth, address_radix, data_radix, words).write(file)
+        return
+
+    # Other formats hold the whole memory, unused addresses are set to zero.
+    image = MemoryImage(words, memory_depth)
+    if format == 'bin':
+        with open(path, 'wb') as file:
+            image.write_binary(file, byteorder)
+    elif format == 'hex':
+        with open(path, 'w') as file:
+            image.write_intel_hex(file)
+    elif format == 'memh':
+        with open(path, 'w') as file:
+            image.write_readmemh(file)
+
+## @brief Command line entry point.
+## @details Assembles the program file given as argument into a memory image file.
+def main():
+    # Only imported by the command line, so importing the assembler stays fast.
+    import argparse
+    import json
+    import os
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('program', help='The path to the file to assemble.', type=str)
+    parser.add_argument('output', help='The path to save the assembled file.', type=str)
+    parser.add_argument('--format', help='The output file format: MIF, raw binary, Intel HEX or $readmemh text.', choices=output_formats, default='mif')
+    parser.add_argument('--address-radix', help='The radix of the addresses on the MIF file.', choices=radix_formats, default='BIN')
+    parser.add_argument('--data-radix', help='The radix of the words on the MIF file.', choices=radix_formats, default='BIN')
+    parser.add_argument('--byteorder', help='The byte order of each word on raw binary files.', choices=('little', 'big'), default='little')
+    parser.add_argument('--symbols', help='The path to save the symbol table, as json mapping labels to addresses.', type=str)
+    parser.add_argument('--source-map', help='The path to save the source map, as json with the source line of each word, read by SourceProfiler.py.', type=str)
+    parser.add_argument('-O', '--optimize', help='Remove noops, unreachable code, jumps to jumps and redundant label address loads.', action='store_true')
+    parser.add_argument('--schedule', help='Reorder instructions to avoid load-use stalls.', action='store_true')
+    parser.add_argument('--profile', help='Print the time, peak memory and item counts of each assembler phase.', action='store_true')
+    args = parser.parse_args()
+
+    with open(args.program, 'r') as file:
+        data = file.read()
+
+    profiler = Profiler() if args.profile else disabled_profiler
+    try:
+        program = assemble_program(data, args.optimize, args.schedule, profiler)
+    except AssemblerError as error:
+        sys.stderr.write(str(error))
+        if args.profile:
+            sys.stderr.write('\n\n')
+            sys.stderr.writelines(profiler.report_lines())
+        exit(-1)
+
+    if args.optimize:
+        sys.stdout.write('Optimizer saved {} words, {} left.\n'.format(program.words_saved, len(program.words)))
+    if args.schedule:
+        sys.stdout.write('Scheduler estimate: {} cycles before, {} after.\n'.format(program.cycles_before, program.cycles_after))
+
+    with profiler.phase('format') as phase:
+        write_output(program.words, args.output, args.format, args.address_radix, args.data_radix, args.byteorder)
+        phase.counts['words'] = len(program.words)
+    if args.symbols is not None:
+        with open(args.symbols, 'w') as file:
+            json.dump(program.symbols, file, indent=4)
+    if args.source_map is not None:
+        with open(args.source_map, 'w') as file:
+            json.dump({'source': os.path.abspath(args.program), 'lines': program.source_map, 'symbols': program.symbols}, file, indent=4)
+
+    if args.profile:
+        sys.stdout.writelines(profiler.report_lines())
     sys.stdout.write('Assembler successful.')
-    return words
-
-
-parser = argparse.ArgumentParser()
-parser.add_argument('program', help='The path to the file to assemble.', type=str)
-parser.add_argument('mif', help='The path to save the assembled file.', type=str)
-args = parser.parse_args()
-
-with open(args.program, 'r') as file:
-    data = file.read()
-bits = assemble(data)
 
-mif = MIF(32, 2**8, 'BIN', 'BIN', bits)
-with open(args.mif, 'w') as file:
-    file.write(mif.as_file())
+if __name__ == '__main__':
+    main()
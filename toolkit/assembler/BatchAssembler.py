@@ -0,0 +1,153 @@
+## @file
+## @brief quanta batch assembler.
+## @details Assembles whole directories or glob patterns of programs across a pool of worker processes.
+## @details Each worker imports the assembler and builds the parser tables once, then assembles many files.
+## @details Prints one JSON object per program, in input order, and exits with an error if any program failed.
+
+import argparse
+import glob
+import json
+import os
+import sys
+
+from concurrent.futures import ProcessPoolExecutor
+
+from Assembler import assemble, assemble_mif, write_output, output_formats
+from BlocklyConverter import convert
+from MIF import radix_formats
+from Parser import build_parser
+from Profiler import disabled_profiler
+from Util import AssemblerError
+
+## @brief File extension of quanta programs.
+program_extension = '.qtf'
+
+## @brief File extension of each output format.
+output_extensions = {
+    'mif': '.mif',
+    'bin': '.bin',
+    'hex': '.hex',
+    'memh': '.memh'
+}
+
+## @brief Expands the command line inputs into a list of programs.
+## @details Directories are searched recursively for programs, other inputs are treated as glob patterns.
+## @param inputs The files, directories and glob patterns.
+## @return A list of (program path, path relative to the output directory).
+def find_programs(inputs):
+    programs = []
+    for input in inputs:
+        if os.path.isdir(input):
+            for path in sorted(glob.glob(os.path.join(input, '**', '*' + program_extension), recursive=True)):
+                programs.append((path, os.path.relpath(path, input)))
+        else:
+            for path in sorted(glob.glob(input, recursive=True)) or [input]:
+                programs.append((path, os.path.basename(path)))
+    return programs
+
+## @brief Assembles a single program file.
+## @details Runs on the worker processes. Errors are reported, never raised.
+## @param job A tuple of (program path, output path, format, address radix, data radix, byteorder).
+## @return A dictionary describing the result.
+def assemble_file(job):
+    path, output, format, address_radix, data_radix, byteorder = job
+    result = {'program': path, 'output': output, 'error': False, 'message': 'Assembler successful.', 'errors': [], 'words': 0}
+
+    try:
+        with open(path, 'r') as file:
+            words = assemble(file.read())
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        write_output(words, output, format, address_radix, data_radix, byteorder)
+        result['words'] = len(words)
+    except (AssemblerError, OSError, UnicodeDecodeError) as error:
+        result['error'] = True
+        result['output'] = None
+        result['message'] = str(error)
+        result['errors'] = getattr(error, 'errors', [])
+
+    return result
+
+## @brief Assembles a program source into a MIF.
+## @details Runs on the worker processes. Errors are reported, never raised.
+## @param job A tuple of (program source, address radix, data radix).
+## @param profiler Records the phases of assembling, see Profiler.
+## @return A dictionary of {"error", "output", "errors", "assembly"}, as answered by the web API.
+def assemble_source(job, profiler=disabled_profiler):
+    program, address_radix, data_radix = job
+    result = {'error': False, 'output': 'Assembler successful.', 'errors': [], 'assembly': ''}
+
+    try:
+        result['assembly'] = assemble_mif(program, address_radix, data_radix, profiler)
+    except AssemblerError as error:
+        result['error'] = True
+        result['output'] = str(error)
+        result['errors'] = error.errors
+
+    return result
+
+## @brief Converts a Blockly workspace into a program, then assembles it into a MIF.
+## @details Runs on the worker processes. Errors are reported, never raised.
+## @param job A tuple of (workspace XML, address radix, data radix).
+## @param profiler Records the convert phase and the phases of assembling, see Profiler.
+## @return A dictionary as returned by assemble_source, with the converted "program" source.
+def assemble_blockly(job, profiler=disabled_profiler):
+    workspace, address_radix, data_radix = job
+
+    try:
+        with profiler.phase('convert') as phase:
+            program = convert(workspace)
+            phase.counts['bytes'] = len(program)
+    except AssemblerError as error:
+        return {'error': True, 'output': str(error), 'errors': error.errors, 'assembly': '', 'program': ''}
+
+    result = assemble_source((program, address_radix, data_radix), profiler)
+    result['program'] = program
+    return result
+
+## @brief Assembles many programs.
+## @param jobs The jobs, as taken by assemble_file.
+## @param workers The number of worker processes. A single worker assembles on the calling process.
+## @return A generator of results, in job order.
+def assemble_files(jobs, workers=None):
+    if workers == 1:
+        yield from map(assemble_file, jobs)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    # Batch jobs so each worker gets several files per round trip.
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=build_parser) as pool:
+        yield from pool.map(assemble_file, jobs, chunksize=chunksize)
+
+## @brief Command line entry point.
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('inputs', help='The programs to assemble: files, directories or glob patterns.', type=str, nargs='+')
+    parser.add_argument('-o', '--output-dir', help='The directory to save the assembled files. Defaults to next to each program.', type=str)
+    parser.add_argument('-j', '--jobs', help='The number of worker processes. Defaults to the number of cores.', type=int)
+    parser.add_argument('--format', help='The output file format: MIF, raw binary, Intel HEX or $readmemh text.', choices=output_formats, default='mif')
+    parser.add_argument('--address-radix', help='The radix of the addresses on MIF files.', choices=radix_formats, default='BIN')
+    parser.add_argument('--data-radix', help='The radix of the words on MIF files.', choices=radix_formats, default='BIN')
+    parser.add_argument('--byteorder', help='The byte order of each word on raw binary files.', choices=('little', 'big'), default='little')
+    args = parser.parse_args()
+
+    extension = output_extensions[args.format]
+    jobs = []
+    for path, relative_path in find_programs(args.inputs):
+        if args.output_dir is None:
+            output = os.path.splitext(path)[0] + extension
+        else:
+            output = os.path.join(args.output_dir, os.path.splitext(relative_path)[0] + extension)
+        jobs.append((path, output, args.format, args.address_radix, args.data_radix, args.byteorder))
+
+    failed = 0
+    for result in assemble_files(jobs, args.jobs):
+        failed += result['error']
+        sys.stdout.write(json.dumps(result) + '\n')
+
+    sys.stderr.write('{} programs, {} failed.\n'.format(len(jobs), failed))
+    if failed:
+        exit(-1)
+
+if __name__ == '__main__':
+    main()
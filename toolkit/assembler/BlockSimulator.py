@@ -0,0 +1,235 @@
+## @file
+## @brief quanta basic block compiling simulator.
+## @details Runs the same programs as Simulator, compiling straight line runs of instructions into Python functions.
+## @details A block starts at the address it's entered from and ends on its first jump, branch or call.
+## @details Registers are kept on local variables while a block runs, and blocks branching back to their own entry
+## @details with a constant target, as label loops do, loop inside the function.
+## @details Blocks are compiled on first entry and cached by entry address; writes to the instruction memory invalidate them.
+## @details Cycle counts are exact: blocks that don't fit on the remaining cycles are run one instruction at a time.
+## @details Blocks follow the architectural model; with delay_slots, programs run on the Simulator loop instead.
+
+from functools import lru_cache
+from itertools import repeat
+
+from Assembler import instruction_aliases, memory_depth
+from Simulator import Simulator, decode, read_only_registers, non_writing_instructions, word_mask, sign_bit, address_mask
+
+## @brief The maximum number of instructions on a block.
+max_block_length = 64
+## @brief The maximum number of copies of the body of a block looping on itself.
+max_unroll = 8
+
+## @brief Opcode of each instruction alias.
+opcodes = {alias: instruction.opcode for alias, instruction in instruction_aliases.items()}
+## @brief Instruction alias of each opcode, unknown opcodes run as noop.
+aliases = {opcode: alias for alias, opcode in opcodes.items()}
+
+## @brief Instructions ending a block.
+control_instructions = ('j', 'je', 'jne', 'jl', 'jg', 'call')
+
+## @brief Expression of each instruction writing to its first register, from the a and b operand expressions.
+expressions = {
+    'move': '{b}',
+    'add': '({a} + {b}) & 0x{mask:X}',
+    'sub': '({a} - {b}) & 0x{mask:X}',
+    'and': '{a} & {b}',
+    'or': '{a} | {b}',
+    'xor': '{a} ^ {b}',
+    'xnor': '~({a} ^ {b}) & 0x{mask:X}',
+    'not': '~{a} & 0x{mask:X}',
+    'sl': '({a} << 1) & 0x{mask:X}',
+    'sr': '{a} >> 1',
+    'asr': '({a} >> 1) | ({a} & 0x{sign:X})',
+    'rl': '(({a} << 1) & 0x{mask:X}) | ({a} >> 31)'
+}
+
+## @brief Taken condition of each branch, from the a and b operand expressions.
+conditions = {
+    'je': '{a} == {b}',
+    'jne': '{a} != {b}',
+    'jl': '({a} - {b}) & 0x{sign:X}',
+    'jg': 'not ({a} - {b}) & 0x{sign:X}'
+}
+
+## @brief The maximum number of compiled block factories kept, shared between simulators.
+## @details Least recently used ones are dropped, so processes loading many programs don't grow without bound.
+max_factories = 4096
+
+## @brief Compiles the source of a block.
+## @details Cached by source, so simulators running the same code share its compiled factory.
+## @param source The source of a make function, as generate_block.
+## @return The make function.
+@lru_cache(maxsize=max_factories)
+def compile_factory(source):
+    namespace = {}
+    exec(compile(source, '<block>', 'exec'), namespace)
+    return namespace['make']
+
+## @brief Generates the source of a block.
+## @param decoded The decoded (opcode, a, b, c, immediate) of the instruction memory.
+## @param entry The address the block starts at.
+## @return The source of a make(R, M) function returning the block, and the number of instructions on the block.
+def generate_block(decoded, entry):
+    # Register values known while generating, from load immediates on the block. $zero always reads zero.
+    constants = {0: 0}
+    read = set()
+    written = set()
+    # Registers read while not holding a known value, and loads, which may read values stored on a previous iteration.
+    variables = set()
+    # The (register written or None, line) of each statement.
+    body = []
+
+    def operand(register):
+        if register in constants:
+            return str(constants[register])
+        variables.add(register)
+        if register not in written:
+            read.add(register)
+        return 'r{}'.format(register)
+
+    def write(register, expression, constant=None):
+        written.add(register)
+        body.append((register, 'r{} = {}'.format(register, expression)))
+        if constant is None:
+            constants.pop(register, None)
+        else:
+            constants[register] = constant
+
+    address = entry
+    ending = None
+    for length in range(1, max_block_length + 1):
+        opcode, a, b, c, immediate = decoded[address]
+        alias = aliases.get(opcode, 'noop')
+        next = (address + 1) & address_mask
+
+        # Writes to read only registers are dropped, as when binding handlers.
+        if a in read_only_registers and alias not in non_writing_instructions:
+            alias = 'j' if alias == 'call' else 'noop'
+
+        if alias == 'li':
+            write(a, str(immediate), immediate)
+        elif alias == 'load':
+            write(a, 'M[{} & {}]'.format(operand(b), address_mask))
+            variables.add('M')
+        elif alias == 'store':
+            body.append((None, 'M[{} & {}] = {}'.format(operand(b), address_mask, operand(a))))
+        elif alias in expressions:
+            expression = expressions[alias]
+            # Only the operands used are read, move doesn't read a and single operand instructions don't read b.
+            write(a, expression.format(a=operand(a) if '{a}' in expression else None, b=operand(b) if '{b}' in expression else None,
+                                       mask=word_mask, sign=sign_bit))
+        elif alias in control_instructions:
+            target = constants.get(c)
+            target = str(target & address_mask) if target is not None else '{} & {}'.format(operand(c), address_mask)
+            if alias == 'call':
+                # The target is read before the return address is written, a and c may be the same register.
+                if c == a and not target.isdigit():
+                    body.append((None, 'target = {}'.format(target)))
+                    target = 'target'
+                write(a, str(next), next)
+                ending = (None, target, next)
+            elif alias == 'j':
+                ending = (None, target, next)
+            else:
+                ending = (conditions[alias].format(a=operand(a), b=operand(b), sign=sign_bit), target, next)
+            break
+
+        address = next
+
+    lines = ['def make(R, M):', '    def block(limit):']
+    lines += ['        r{0} = R[{0}]'.format(register) for register in sorted(read)]
+    # Registers ending the block with a known value, and never read otherwise, are written back only as that value.
+    known = {register for register in written if register in constants and register not in variables}
+    body = [line for register, line in body if register not in known] or ['pass']
+    write_back = ['R[{0}] = {1}'.format(register, constants[register] if register in known else 'r{}'.format(register)) for register in sorted(written)]
+
+    condition, target, next = ending if ending is not None else (None, str(next), next)
+    if target == str(entry) and condition is None and not variables:
+        # Jumps to itself computing only known values, as the end: j end idiom: every iteration does the same, so the
+        # block runs once and the remaining iterations are skipped.
+        lines += ['        ' + line for line in body + write_back]
+        lines.append('        return {}, limit - limit % {}'.format(entry, length))
+    elif target == str(entry):
+        # Loops on itself while taken and the next iteration fits on the limit, the caller runs at least one.
+        # Short loops are unrolled, then finished an iteration at a time.
+        unroll = max(1, min(max_unroll, max_block_length // length))
+        lines.append('        executed = 0')
+        for copies, start in ((unroll, '{}'.format(length * unroll)), (1, 'executed + {}'.format(length))):
+            lines.append('        for executed in range({}, limit + 1, {}):'.format(start, length * copies))
+            for copy in range(copies):
+                lines += ['            ' + line for line in body]
+                if condition is not None:
+                    lines.append('            if not ({}):'.format(condition))
+                    lines += ['                ' + line for line in write_back]
+                    lines.append('                return {}, executed - {}'.format(next, length * (copies - copy - 1)))
+        lines += ['        ' + line for line in write_back]
+        lines.append('        return {}, executed'.format(entry))
+    else:
+        lines += ['        ' + line for line in body + write_back]
+        if condition is None:
+            lines.append('        return {}, {}'.format(target, length))
+        else:
+            lines.append('        return ({} if {} else {}), {}'.format(target, condition, next, length))
+
+    lines.append('    return block')
+    return '\n'.join(lines) + '\n', length
+
+## @brief Simulates a quanta processor, compiling basic blocks.
+## @details Same interface and results as Simulator.
+class BlockSimulator(Simulator):
+    ## @brief Loads a program into the instruction memory and resets the processor.
+    ## @details Drops every compiled block.
+    def load(self, words):
+        super().load(words)
+        ## @brief The compiled (function, length) of the block at each entry address, or None.
+        self.blocks = [None] * memory_depth
+        ## @brief The entry addresses of the compiled blocks covering each address.
+        self.covering = [set() for _ in range(memory_depth)]
+
+    ## @brief Compiles the block starting at an address.
+    ## @return The (function, length) of the block.
+    def compile_block(self, entry):
+        source, length = generate_block(self.decoded, entry)
+        block = (compile_factory(source)(self.registers, self.memory), length)
+        self.blocks[entry] = block
+        for offset in range(length):
+            self.covering[(entry + offset) & address_mask].add(entry)
+        return block
+
+    ## @brief Writes a word to the instruction memory.
+    ## @details Invalidates the compiled blocks holding the address.
+    ## @param address The instruction address.
+    ## @param word The instruction word.
+    def write_instruction(self, address, word):
+        self.words[address] = word
+        self.decoded[address] = decode(word)
+        self.program[address] = self.bind(address, self.decoded[address])
+        for entry in self.covering[address]:
+            self.blocks[entry] = None
+        self.covering[address] = set()
+
+    ## @brief Runs the program.
+    ## @param max_cycles The number of instructions to execute.
+    ## @return The number of cycles executed.
+    def run(self, max_cycles):
+        if self.delay_slots:
+            return super().run(max_cycles)
+
+        blocks = self.blocks
+        pc = self.pc
+        remaining = max_cycles
+        while remaining:
+            function, length = blocks[pc] or self.compile_block(pc)
+            if length > remaining:
+                break
+            pc, executed = function(remaining)
+            remaining -= executed
+
+        # The last instructions, not filling a block.
+        program = self.program
+        for _ in repeat(None, remaining):
+            pc = program[pc]()
+
+        self.pc = pc
+        self.cycles += max_cycles
+        return max_cycles
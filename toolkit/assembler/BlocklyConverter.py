@@ -0,0 +1,230 @@
+## @file
+## @brief Converts Blockly workspaces to quanta programs.
+## @details Generates the same code as the Blockly quanta generator on toolkit/blockly, on the server side.
+## @details Workspaces are read with a streaming XML parser, one event at a time: no document tree is built,
+## @details and the nesting of <next> chains is tracked on a list, so long programs never hit the recursion limit.
+
+import argparse
+import sys
+
+from xml.parsers import expat
+
+from Util import AssemblerError
+
+## @brief Instruction aliases for each INSTRUCTION field value, as on the Blockly generator.
+## @details The editor also offers RR, which quanta has no instruction for: it's reported as an unknown instruction
+## @details instead of generating a line the assembler would read as a label.
+instruction_aliases = {
+    'NOOP': 'noop',
+
+    'LOAD_IMMEDIATE': 'li',
+
+    'NOT': 'not',
+    'SL': 'sl',
+    'SR': 'sr',
+    'RL': 'rl',
+    'JUMP': 'j',
+
+    'MOVE': 'move',
+    'LOAD': 'load',
+    'STORE': 'store',
+    'ADD': 'add',
+    'SUBTRACT': 'sub',
+    'AND': 'and',
+    'OR': 'or',
+    'XOR': 'xor',
+    'XNOR': 'xnor',
+    'CALL': 'call',
+
+    'JE': 'je',
+    'JNE': 'jne',
+    'JL': 'jl',
+    'JG': 'jg'
+}
+
+## @brief The field holding the code of each value block type.
+value_fields = {
+    'type_register': 'NAME',
+    'type_label': 'NAME',
+    'math_number': 'NUM'
+}
+
+## @brief The value inputs of each instruction block type, in argument order.
+instruction_inputs = {
+    'instruction_immediate': ('REGISTER_A', 'IMMEDIATE'),
+    'instruction_single_register': ('REGISTER_A',),
+    'instruction_double_register': ('REGISTER_A', 'REGISTER_B'),
+    'instruction_triple_register': ('REGISTER_A', 'REGISTER_B', 'REGISTER_C')
+}
+
+## @brief Indentation of the statements of a label group, as on the Blockly generator.
+indent = ' ' * 6
+
+## @brief Size of the chunks read from files.
+chunk_size = 1 << 16
+
+## @brief A block being read.
+class Block:
+    def __init__(self, type, depth):
+        ## @brief The block type.
+        self.type = type
+        ## @brief The number of label groups the block is nested in.
+        self.depth = depth
+        ## @brief The field values, by name.
+        self.fields = {}
+        ## @brief The code of the value inputs, by name.
+        self.values = {}
+        ## @brief Whether the code of the block was generated.
+        self.generated = False
+
+## @brief Streaming Blockly workspace converter.
+## @details Fed XML chunks, collects the lines of code generated as blocks are read.
+class Converter:
+    def __init__(self):
+        ## @brief The lines generated and not yet taken.
+        self.lines = []
+        ## @brief The blocks being read, innermost last.
+        self.blocks = []
+        ## @brief The value input of each block being read, None outside of inputs. Innermost last.
+        self.inputs = []
+        ## @brief The number of label group statements being read.
+        self.depth = 0
+        ## @brief The field being read, as (name, text parts), or None.
+        self.field = None
+
+        self.parser = expat.ParserCreate()
+        self.parser.StartElementHandler = self.start
+        self.parser.EndElementHandler = self.end
+        self.parser.CharacterDataHandler = self.text
+
+    ## @brief Parses a chunk of the workspace.
+    ## @param data The chunk, as str or bytes.
+    ## @param final Whether it's the last chunk.
+    ## @return The lines generated by the chunk.
+    def feed(self, data, final=False):
+        try:
+            self.parser.Parse(data, final)
+        except expat.ExpatError as error:
+            raise workspace_error('Invalid workspace XML: {}.'.format(expat.ErrorString(error.code)), error.lineno, error.offset + 1)
+
+        lines = self.lines
+        self.lines = []
+        return lines
+
+    def start(self, name, attributes):
+        if name == 'block':
+            self.blocks.append(Block(attributes.get('type'), self.depth))
+            self.inputs.append(None)
+        elif name == 'field':
+            self.field = (attributes.get('name'), [])
+        elif name == 'value' and self.blocks:
+            self.inputs[-1] = attributes.get('name')
+        elif name in ('next', 'statement') and self.blocks:
+            # Fields and values come before the next and statement elements, the block is complete.
+            self.generate(self.blocks[-1])
+            if name == 'statement':
+                self.depth += 1
+
+    def end(self, name):
+        if name == 'block':
+            block = self.blocks.pop()
+            self.inputs.pop()
+            if block.type in value_fields:
+                if self.blocks and self.inputs[-1] is not None:
+                    self.blocks[-1].values[self.inputs[-1]] = block.fields.get(value_fields[block.type], '')
+            else:
+                self.generate(block)
+        elif name == 'field' and self.field is not None:
+            field_name, parts = self.field
+            if self.blocks:
+                self.blocks[-1].fields[field_name] = ''.join(parts)
+            self.field = None
+        elif name == 'value' and self.blocks:
+            self.inputs[-1] = None
+        elif name == 'statement' and self.blocks:
+            self.depth -= 1
+            # The group code ends with an empty line.
+            self.lines.append(indent * self.depth)
+
+    def text(self, data):
+        if self.field is not None:
+            self.field[1].append(data)
+
+    ## @brief Generates the code of a statement block, once.
+    def generate(self, block):
+        if block.generated:
+            return
+        block.generated = True
+
+        prefix = indent * block.depth
+        if block.type == 'comment':
+            self.lines.append(prefix + '; ' + block.fields.get('COMMENT', ''))
+        elif block.type == 'label_group':
+            self.lines.append(prefix + block.fields.get('LABEL', '') + ':')
+        elif block.type == 'instruction_noop':
+            self.lines.append(prefix + 'noop')
+        elif block.type in instruction_inputs:
+            instruction = block.fields.get('INSTRUCTION')
+            if instruction not in instruction_aliases:
+                raise workspace_error('Unknown instruction: {}.'.format(instruction), self.parser.CurrentLineNumber, self.parser.CurrentColumnNumber + 1)
+            args = ', '.join(block.values.get(input, '') for input in instruction_inputs[block.type])
+            self.lines.append(prefix + instruction_aliases[instruction] + ' ' + args)
+        else:
+            raise workspace_error('Unknown block type: {}.'.format(block.type), self.parser.CurrentLineNumber, self.parser.CurrentColumnNumber + 1)
+
+## @brief Builds the error raised for invalid workspaces.
+## @param message The error description.
+## @param lineno The line of the workspace XML.
+## @param column The column of the workspace XML.
+def workspace_error(message, lineno, column):
+    return AssemblerError('Blockly conversion failed.\n' + message, [{'type': 'Invalid workspace', 'lineno': lineno, 'column': column, 'line': None}])
+
+## @brief Converts a workspace, as it's read.
+## @details Raises AssemblerError when the workspace is invalid.
+## @param chunks An iterable of XML chunks, as str or bytes.
+## @return A generator of program lines, without line breaks.
+def convert_chunks(chunks):
+    converter = Converter()
+    for chunk in chunks:
+        yield from converter.feed(chunk)
+    yield from converter.feed(b'', True)
+
+## @brief Reads a file in chunks.
+def read_chunks(file):
+    return iter(lambda: file.read(chunk_size), b'')
+
+## @brief Converts a workspace to a program.
+## @details Raises AssemblerError when the workspace is invalid.
+## @param data The workspace XML.
+## @return The program source.
+def convert(data):
+    return ''.join(line + '\n' for line in convert_chunks((data,)))
+
+## @brief Converts a workspace file to a program.
+## @details The file is streamed, it's never held in memory as a whole.
+## @param path The path to the workspace XML.
+## @return A generator of program lines, without line breaks.
+def convert_file(path):
+    with open(path, 'rb') as file:
+        yield from convert_chunks(read_chunks(file))
+
+## @brief Command line entry point.
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('workspace', help='The path to the Blockly workspace XML.', type=str)
+    parser.add_argument('output', help='The path to save the program. Defaults to the standard output.', type=str, nargs='?')
+    args = parser.parse_args()
+
+    output = sys.stdout if args.output is None else open(args.output, 'w')
+    try:
+        for line in convert_file(args.workspace):
+            output.write(line + '\n')
+    except AssemblerError as error:
+        sys.stderr.write(str(error))
+        exit(-1)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+if __name__ == '__main__':
+    main()
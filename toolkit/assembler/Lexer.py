@@ -1,10 +1,6 @@
 ## @file
 ## @brief Assembler lexer.
 
-import os
-import sys
-
-sys.path.insert(1, os.path.join(sys.path[0], '../../external/ply/'))
 import ply.lex as lex
 
 import Util
@@ -47,6 +43,7 @@ reserved = {
 
 ## @brief Token list.
 ## @brief The common  tokens and the unique values for the instruction types.
+## @details The instruction types are sorted, the parser table signature depends on the token order.
 tokens = (
     'COMMA',
     'DOLLAR_SIGN',
@@ -54,7 +51,7 @@ tokens = (
 
     'IDENTIFIER',
     'NUMBER'
-) + tuple(set(reserved.values()))
+) + tuple(sorted(set(reserved.values())))
 
 t_COMMA = r'\,'
 t_DOLLAR_SIGN = r'\$'
@@ -90,10 +87,18 @@ def t_error(t):
     # Discard the char that triggered the error to continue parsing.
     t.lexer.skip(1)
 
+## @brief The lexer built from the token rules.
+## @details Built once per process, lexers handed out by build_lexer are clones sharing its compiled rules.
+master_lexer = None
+
 ## @brief Builds the lexer.
 ## @return The constructed lexer.
 def build_lexer():
-    lexer = lex.lex()
+    global master_lexer
+    if master_lexer is None:
+        master_lexer = lex.lex()
+
+    lexer = master_lexer.clone()
     lexer.error_log = []
 
     return lexer
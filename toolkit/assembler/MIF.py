@@ -1,9 +1,27 @@
 ## @file
 ## @brief Memory Initialization File Handling.
 
-import math
-
-from Util import to_fixed_length_bin
+import re
+
+## @brief Radixes supported by the MIF format.
+## @details Maps each radix to a function building the format spec for a given bit width.
+## @details Values are zero padded to the width, except in the decimal radixes.
+radix_formats = {
+    'BIN': lambda width: '0{}b'.format(width),
+    'OCT': lambda width: '0{}o'.format((width + 2) // 3),
+    'HEX': lambda width: '0{}X'.format((width + 3) // 4),
+    'DEC': lambda width: 'd',
+    'UNS': lambda width: 'd'
+}
+
+## @brief The base of the digits on each radix, for reading files.
+radix_bases = {
+    'BIN': 2,
+    'OCT': 8,
+    'HEX': 16,
+    'DEC': 10,
+    'UNS': 10
+}
 
 ## @brief Represents a Memory Initialization File.
 class MIF:
@@ -11,72 +29,128 @@ class MIF:
     header += '-- Refer to gitlab.com/tan90/quanta for details.\n'
 
     def __init__(self, width, depth, address_radix, data_radix, data):
+        if address_radix not in radix_formats or data_radix not in radix_formats:
+            raise ValueError('Unsupported radix, expected one of: {}.'.format(', '.join(radix_formats)))
+
         ## @brief The number of bits per data word.
         self.width = width
         ## @brief The number of data words.
         self.depth = depth
         ## @brief The address width for the specified radix calculeated by the world count.
-        self.address_width = int(math.log(depth, 2))
+        self.address_width = max(1, (depth - 1).bit_length())
 
         ## @brief The address radix to be used when exporting to a file.
-        ## @details At the moment only binary radix is supported, so this is ignored.
         self.address_radix = address_radix
-        ## @brief The address radix to be used when exporting to a file.
-        ## @details At the moment only binary radix is supported, so this is ignored.
+        ## @brief The data radix to be used when exporting to a file.
+        ## @details DEC exports words as signed values, UNS as unsigned ones.
         self.data_radix = data_radix
 
-        ## @brief The ordered data for each address
+        ## @brief The ordered data for each address.
+        ## @details Words are integers, converted to text only when exporting.
         self.data = data
 
-    ## @brief Formats the file data as a string.
-    ## @return The data as a string composed of address:data pairs.
-    def format_data(self):
-        data_str = ''
-        line = 0
+    ## @brief Formats an address on the address radix.
+    def format_address(self, address):
+        return format(address, radix_formats[self.address_radix](self.address_width))
+
+    ## @brief Formats a word on the data radix.
+    def format_word(self, word):
+        if self.data_radix == 'DEC' and word >> (self.width - 1):
+            # Signed decimal, words with the sign bit set are negative.
+            word -= 1 << self.width
+        return format(word, radix_formats[self.data_radix](self.width))
+
+    ## @brief Generates the file data.
+    ## @details Yields one address:data pair per line, formatted with precomputed format strings.
+    ## @return A generator of lines.
+    def data_lines(self):
+        # The format of every address:data pair is fixed, so it's built once.
+        data_line = '    {{:{}}}:{{:{}}};\n'.format(radix_formats[self.address_radix](self.address_width), radix_formats[self.data_radix](self.width))
+        # Signed decimal words need converting before formatting.
+        is_signed = self.data_radix == 'DEC'
+        sign_bit = 1 << (self.width - 1)
+        modulus = 1 << self.width
 
+        line = 0
         for word in self.data:
-            # Generate an address:data pair for the current word.
-            data_line = '    {}:{};\n'
-            address = to_fixed_length_bin(line, self.address_width)
-            
-            data_str += data_line.format(address, word)
-            
+            if line == self.depth:
+                raise ValueError('The number of words exceeded the memory depth of {}.'.format(self.depth))
+
+            if is_signed and word & sign_bit:
+                word -= modulus
+            yield data_line.format(line, word)
             line += 1
-            if line > self.depth:
-                print('Could not generate Memory Initialization File.')
-                print('The number of words exceeded the memory depth.')
 
         if line == self.depth - 1:
-            data_line = '    {}:{};\n'
-            last_address = to_fixed_length_bin(self.depth - 1, self.address_width)
-            default_value = to_fixed_length_bin(0, self.width)
-
-            data_str += data_line.format(last_address, default_value)
-        elif line < self.depth - 1: 
-            #Initialize any unused addresses to a default value.
-            data_line = '    [{}..{}]:{};\n'
-            address = to_fixed_length_bin(line, self.address_width)
-            last_address = to_fixed_length_bin(self.depth - 1, self.address_width)
-            default_value = to_fixed_length_bin(0, self.width)
-            
-            data_str += data_line.format(address, last_address, default_value)
-
-        return data_str
+            yield '    {}:{};\n'.format(self.format_address(self.depth - 1), self.format_word(0))
+        elif line < self.depth - 1:
+            # Initialize any unused addresses to a default value.
+            yield '    [{}..{}]:{};\n'.format(self.format_address(line), self.format_address(self.depth - 1), self.format_word(0))
 
-    ## @brief Turns the class into an acutal MIF file.
-    ## @return The MIF file as a string
-    def as_file(self):
-        data  = self.header
+    ## @brief Formats the file data as a string.
+    ## @return The data as a string composed of address:data pairs.
+    def format_data(self):
+        return ''.join(self.data_lines())
 
-        data += 'WIDTH={};\n'.format(str(self.width))
-        data += 'DEPTH={};\n'.format(str(self.depth))
+    ## @brief Generates the file, in chunks.
+    ## @return A generator of the MIF file chunks.
+    def lines(self):
+        yield self.header
 
-        data += 'ADDRESS_RADIX={};\n'.format(self.address_radix)
-        data += 'DATA_RADIX={};\n'.format(self.data_radix)
-        data += 'CONTENT BEGIN\n'
+        yield 'WIDTH={};\n'.format(self.width)
+        yield 'DEPTH={};\n'.format(self.depth)
 
-        data += self.format_data()
+        yield 'ADDRESS_RADIX={};\n'.format(self.address_radix)
+        yield 'DATA_RADIX={};\n'.format(self.data_radix)
+        yield 'CONTENT BEGIN\n'
 
-        data += 'END;\n'
+        yield from self.data_lines()
 
-        return data
+        yield 'END;\n'
+
+    ## @brief Streams the file to a file object.
+    ## @param file A text file object.
+    def write(self, file):
+        file.writelines(self.lines())
+
+    ## @brief Turns the class into an acutal MIF file.
+    ## @return The MIF file as a string
+    def as_file(self):
+        return ''.join(self.lines())
+
+## @brief Reads the words of a Memory Initialization File.
+## @details Supports single addresses, [first..last] ranges and multiple words per address, on any radix.
+## @details Addresses not initialized by the file are set to zero.
+## @param file A text file object.
+## @return The list of words, one per address.
+def read_mif(file):
+    # Drop the comments, both -- and % styles.
+    text = re.sub(r'--[^\n]*|%[^%]*%', '', file.read())
+    header, _, content = re.split(r'\b(CONTENT\s+BEGIN)\b', text, maxsplit=1, flags=re.IGNORECASE)
+    content = re.split(r'\bEND\s*;', content, maxsplit=1, flags=re.IGNORECASE)[0]
+
+    settings = {key.upper(): value.upper() for key, value in re.findall(r'(\w+)\s*=\s*(\w+)\s*;', header)}
+    width = int(settings['WIDTH'])
+    depth = int(settings['DEPTH'])
+    address_base = radix_bases[settings.get('ADDRESS_RADIX', 'HEX')]
+    data_base = radix_bases[settings.get('DATA_RADIX', 'HEX')]
+    mask = (1 << width) - 1
+
+    words = [0] * depth
+    for entry in content.split(';'):
+        if not entry.strip():
+            continue
+        address, values = entry.split(':')
+        # Negative decimal words wrap around to the word width.
+        values = [int(value, data_base) & mask for value in values.split()]
+
+        address = address.strip()
+        if address.startswith('['):
+            first, last = (int(bound, address_base) for bound in address.strip('[]').split('..'))
+            for offset in range(last - first + 1):
+                words[first + offset] = values[offset % len(values)]
+        else:
+            first = int(address, address_base)
+            words[first:first + len(values)] = values
+
+    return words
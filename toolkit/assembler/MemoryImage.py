@@ -0,0 +1,113 @@
+## @file
+## @brief Memory image formats other than MIF.
+## @details Raw binary, Intel HEX and $readmemh text, all written from the same word array.
+
+import array
+import mmap
+import sys
+
+## @brief Array typecode for unsigned 32 bit words.
+word_typecode = 'I' if array.array('I').itemsize == 4 else 'L'
+
+## @brief Represents the contents of a 32 bit word memory.
+## @details Holds the words in a single array, shared by every export format.
+class MemoryImage:
+    def __init__(self, words, depth=None):
+        ## @brief The ordered words for each address.
+        self.words = array.array(word_typecode, words)
+
+        # Initialize any unused addresses to zero, as the MIF does.
+        if depth is not None and len(self.words) < depth:
+            self.words.frombytes(bytes(self.words.itemsize * (depth - len(self.words))))
+
+    ## @brief Returns the image as raw bytes.
+    ## @param byteorder The byte order of each word, 'little' or 'big'.
+    def to_bytes(self, byteorder='little'):
+        if byteorder == sys.byteorder:
+            return self.words.tobytes()
+
+        swapped = array.array(word_typecode, self.words)
+        swapped.byteswap()
+        return swapped.tobytes()
+
+    ## @brief Writes the image as raw binary.
+    ## @param file A binary file object.
+    ## @param byteorder The byte order of each word, 'little' or 'big'.
+    def write_binary(self, file, byteorder='little'):
+        file.write(self.to_bytes(byteorder))
+
+    ## @brief Generates the image as Intel HEX records.
+    ## @details By default follows the Quartus convention: one big endian word per record, addressed by word.
+    ## @details With byte addressing, records hold 16 bytes and are addressed by byte.
+    ## @details Extended linear address records are emitted when addresses exceed 16 bits.
+    ## @param byte_addressing Whether to address bytes instead of words.
+    ## @return A generator of lines.
+    def intel_hex_lines(self, byte_addressing=False):
+        data = self.to_bytes('big')
+        record_length = 16 if byte_addressing else 4
+
+        upper_address = 0
+        for offset in range(0, len(data), record_length):
+            address = offset if byte_addressing else offset // 4
+            if address >> 16 != upper_address:
+                upper_address = address >> 16
+                yield intel_hex_record(0, 0x04, upper_address.to_bytes(2, 'big'))
+            yield intel_hex_record(address & 0xFFFF, 0x00, data[offset:offset + record_length])
+
+        # End of file record.
+        yield intel_hex_record(0, 0x01, b'')
+
+    ## @brief Writes the image as Intel HEX.
+    ## @param file A text file object.
+    ## @param byte_addressing Whether to address bytes instead of words.
+    def write_intel_hex(self, file, byte_addressing=False):
+        file.writelines(self.intel_hex_lines(byte_addressing))
+
+    ## @brief Generates the image as $readmemh text.
+    ## @details One word per line, as read by Verilog $readmemh or VHDL hread loops.
+    ## @return A generator of lines.
+    def readmemh_lines(self):
+        yield '// File generated by the quanta assembler.\n'
+        yield '@0\n'
+        for word in self.words:
+            yield '{:08X}\n'.format(word)
+
+    ## @brief Writes the image as $readmemh text.
+    ## @param file A text file object.
+    def write_readmemh(self, file):
+        file.writelines(self.readmemh_lines())
+
+## @brief Formats a single Intel HEX record.
+## @param address The 16 bit record address.
+## @param type The record type.
+## @param data The record data bytes.
+## @return The record line.
+def intel_hex_record(address, type, data):
+    record = bytes([len(data), address >> 8, address & 0xFF, type]) + data
+    checksum = -sum(record) & 0xFF
+    return ':{}{:02X}\n'.format(record.hex().upper(), checksum)
+
+## @brief Loads a raw binary image.
+## @details The file is memory mapped. Images in the native byte order are returned as a zero copy memoryview of words.
+## @details Images in the other byte order are copied into a byte swapped array.
+## @param path The path to the raw binary image.
+## @param byteorder The byte order of each word, 'little' or 'big'.
+## @return A sequence of the image words.
+## @details Raises ValueError when the image isn't a whole number of words, as a truncated file.
+def load_binary(path, byteorder='little'):
+    with open(path, 'rb') as file:
+        size = file.seek(0, 2)
+        if size % 4 != 0:
+            raise ValueError('{} has {} bytes, raw binary images hold 4 byte words.'.format(path, size))
+        # Empty files can't be mapped.
+        if size == 0:
+            return array.array(word_typecode)
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    words = memoryview(mapped).cast(word_typecode)
+    if byteorder == sys.byteorder:
+        return words
+
+    swapped = array.array(word_typecode, words)
+    swapped.byteswap()
+    return swapped
@@ -0,0 +1,188 @@
+## @file
+## @brief quanta program optimizer.
+## @details Rewrites parsed programs so they assemble to fewer words, computing the same results on the pipelined hardware.
+## @details Removes noops and unreachable code, threads jumps to jumps and drops redundant reserved register loads.
+## @details The instruction following a jump, branch or call is executed by the hardware even when it's taken, as a delay slot,
+## @details so it's never removed or changed; only code from the second instruction after an unconditional jump is unreachable.
+## @details Addresses shift, so register jumps are assumed to only target labels or return addresses.
+## @details noops are removed too, so programs relying on them for timing should not be optimized.
+
+from Assembler import instruction_aliases, register_aliases, label_arguments
+
+## @brief The register loaded with the address of label arguments.
+reserved_reg = register_aliases['a']
+
+## @brief Instruction types writing to their first register argument.
+## @details Loads write to it too, stores don't.
+writing_types = ('IMMEDIATE', 'SINGLE_REG', 'DOUBLE_REG', 'CALL')
+
+## @brief Instructions followed by a delay slot.
+control_aliases = ('j', 'je', 'jne', 'jl', 'jg', 'call')
+
+## @brief Checks if a parsed line is a label identifier.
+def is_label(line):
+    return line[0] not in instruction_aliases
+
+## @brief Finds the delay slots of a program.
+## @details The delay slot of a control instruction is the next instruction line, labeled or not.
+## @param lines The parsed program.
+## @return A list telling if each line is on a delay slot.
+def delay_slots(lines):
+    slots = []
+    following_control = False
+    for _, line in lines:
+        if is_label(line):
+            slots.append(False)
+        else:
+            slots.append(following_control)
+            following_control = line[0] in control_aliases
+    return slots
+
+## @brief Returns the label argument of an instruction line, or None if it has none.
+def label_target(line):
+    instruction = instruction_aliases[line[0]]
+    if instruction.type == 'NOOP' or instruction.type not in label_arguments:
+        return None
+
+    argument = line[1][label_arguments[instruction.type]]
+    return argument if isinstance(argument, str) else None
+
+## @brief Replaces the label argument of an instruction line.
+## @param line The instruction line.
+## @param argument The new argument, a label or a register.
+## @return The new line.
+def replace_target(line, argument):
+    index = label_arguments[instruction_aliases[line[0]].type]
+    return (line[0], line[1][:index] + (argument,) + line[1][index + 1:])
+
+## @brief Checks if an instruction line writes to the reserved register.
+def writes_reserved_reg(line):
+    instruction = instruction_aliases[line[0]]
+    if instruction.type not in writing_types and line[0] != 'load':
+        return False
+
+    register = line[1][0]
+    return register == reserved_reg or register == ('a',)
+
+## @brief Finds the instruction each label points to.
+## @details A redefined label points to its last definition, as when assembling.
+## @param lines The parsed program.
+## @return A map of labels to the index of their instruction, len(lines) for labels at the end.
+def label_positions(lines):
+    positions = {}
+    pending = []
+    for index, (_, line) in enumerate(lines):
+        if is_label(line):
+            pending.append(line[0])
+        else:
+            for label in pending:
+                positions[label] = index
+            pending = []
+
+    for label in pending:
+        positions[label] = len(lines)
+    return positions
+
+## @brief Removes noop instructions, except on delay slots.
+## @return The new lines and whether any was removed.
+def remove_noops(lines):
+    kept = [(lineno, line) for (lineno, line), slot in zip(lines, delay_slots(lines)) if line[0] != 'noop' or slot]
+    return kept, len(kept) != len(lines)
+
+## @brief Redirects label arguments pointing to an unconditional label jump to that jump's target.
+## @details Following the chain of jumps leaves the reserved register with the same address.
+## @details Only jumps followed by a noop are skipped, their delay slot would run otherwise.
+## @details Lines on delay slots are kept, so the slot leaves the same address on the reserved register.
+## @return The new lines and whether any was redirected.
+def thread_jumps(lines):
+    positions = label_positions(lines)
+    instructions = [index for index, (_, line) in enumerate(lines) if not is_label(line)]
+    # The index of the instruction following each instruction.
+    following = dict(zip(instructions, instructions[1:]))
+
+    # The label jumped to by the instruction at each label, if it's an unconditional label jump followed by a noop.
+    forwards = {}
+    for label, index in positions.items():
+        if index in following and lines[index][1][0] == 'j' and lines[following[index]][1][0] == 'noop':
+            target = label_target(lines[index][1])
+            if target is not None:
+                forwards[label] = target
+
+    def resolve(label):
+        visited = {label}
+        while label in forwards and forwards[label] not in visited:
+            label = forwards[label]
+            visited.add(label)
+        return label
+
+    changed = False
+    threaded = []
+    for (lineno, line), slot in zip(lines, delay_slots(lines)):
+        if not is_label(line) and not slot:
+            target = label_target(line)
+            if target is not None and resolve(target) != target:
+                line = replace_target(line, resolve(target))
+                changed = True
+        threaded.append((lineno, line))
+
+    return threaded, changed
+
+## @brief Removes the instructions following the delay slot of an unconditional jump, up to the next referenced label.
+## @details Label identifiers are kept, so the symbol table still lists them.
+## @return The new lines and whether any was removed.
+def remove_unreachable(lines):
+    referenced = {label_target(line) for _, line in lines if not is_label(line)}
+
+    reachable = True
+    # Whether the next instruction is the delay slot of a reachable jump.
+    slot = False
+    kept = []
+    for lineno, line in lines:
+        if is_label(line):
+            reachable = reachable or line[0] in referenced
+            kept.append((lineno, line))
+        elif reachable or slot:
+            kept.append((lineno, line))
+            reachable, slot = (line[0] != 'j', line[0] == 'j') if reachable else (False, False)
+
+    return kept, len(kept) != len(lines)
+
+## @brief Drops reserved register loads when it already holds the label address.
+## @details Tracked within basic blocks: the address is forgotten on labels, calls and writes to the reserved register.
+## @details Label arguments whose load is dropped are replaced by the reserved register.
+## @details Loads on delay slots are kept, so the slot holds the same word.
+## @return The new lines.
+def remove_redundant_loads(lines):
+    positions = label_positions(lines)
+
+    # The address held by the reserved register, as the index of the labeled instruction.
+    held = None
+    optimized = []
+    for (lineno, line), slot in zip(lines, delay_slots(lines)):
+        if is_label(line):
+            held = None
+        else:
+            target = label_target(line)
+            if target is not None:
+                if positions[target] == held and not slot:
+                    line = replace_target(line, ('a',))
+                held = positions[target]
+
+            if line[0] in ('call', 'j') or writes_reserved_reg(line):
+                held = None
+        optimized.append((lineno, line))
+
+    return optimized
+
+## @brief Optimizes a parsed program.
+## @param lines The output of the parser.
+## @return The optimized lines.
+def optimize(lines):
+    changed = True
+    while changed:
+        lines, removed = remove_noops(lines)
+        lines, threaded = thread_jumps(lines)
+        lines, unreachable = remove_unreachable(lines)
+        changed = removed or threaded or unreachable
+
+    return remove_redundant_loads(lines)
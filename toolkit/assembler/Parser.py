@@ -1,19 +1,26 @@
 ## @file
 ## @brief Assembler parser.
 
+import copy
 import os
-import sys
+import threading
 
-sys.path.insert(1, os.path.join(sys.path[0], '../../external/ply/'))
 import ply.yacc as yacc
 
 from Lexer import build_lexer, tokens
+from Profiler import TimedCalls, disabled_profiler
 import Util
 
-# @brief holds the error log for the past parser run.
-# @details While ply recomends globals in this situation, a parser class would look better.
-# @TODO Turn lexer and parser into classes
-error_log = None
+## @brief Serializes parser table construction.
+table_lock = threading.Lock()
+
+## @brief The module holding the prebuilt parser tables, next to this one.
+## @details Regenerated by running this module. Tables not matching the grammar are ignored and built again.
+table_module = 'ParserTables'
+
+## @brief The parser built from the grammar.
+## @details Built once per process, parsers handed out by build_parser are copies sharing its tables.
+master_parser = None
 
 # A separate production for named registers allows delegating register naming to the Assembler.
 def p_named_reg(p):
@@ -99,68 +106,80 @@ def p_empty(p):
     pass
 
 def p_error(p):
-    global error_log
     # For some errors, ply reports the next production.
     # This is a problem if the cause is EOF.
     # If the file ends, the next production is None, so that corresponds to an unexpected EOF.
     # Better logs would require error productions, something the assembler does not have (and that is not planned).
     if p is None:
-        sys.stderr.write('Assembler failed.\nUnexpected EOF.')
-        exit(-1)
-    # Save error information on the parser's error log.
-    error_log.append({
+        raise Util.AssemblerError('Assembler failed.\nUnexpected EOF.', [{'type': 'Unexpected EOF', 'lineno': None, 'column': None, 'line': None}])
+    # Save error information on the lexer's syntax error log.
+    # The log lives on the lexer so concurrent parses don't share it.
+    p.lexer.syntax_error_log.append({
         'lineno': p.lineno,
         'column': Util.find_column(p)
     })
     
-def parse(data):
-    global error_log
-
-    # Create an error checker lexer.
-    # This is not optimal, but allows prettier error logs.
-    # A better way might be hiding in ply's huge docs.
-    lex_checker = build_lexer()
-    lex_checker.input(data)
-    while lex_checker.token():
-        pass
-    log = lex_checker.error_log
-
-    if len(log) > 0:
-        title = 'Assembler failed.\nUnexpected token{}:'
-        title = title.format('' if len(log) == 1 else 's')
-
-        # List to hold all error messages.
-        description = []
-        for error in log:
-            # Create error message.
-            error_pointer = 'line {}> '.format(error['lineno'])
-            line = data.split('\n')[error['lineno'] - 1]
-            message = Util.format_column_marker(line, error['column'], error_pointer)
-            description.append(message)
-
-        sys.stderr.write(Util.format_error(title, '\n'.join(description)))
-        exit(-1)
-
-    parser = yacc.yacc(start='program')
+## @brief Builds the parser.
+## @details Loads the prebuilt tables. Never writes table files, so parsing does not depend on the working directory.
+## @return The constructed parser.
+def build_parser():
+    global master_parser
+    with table_lock:
+        if master_parser is None:
+            master_parser = yacc.yacc(start='program', debug=False, write_tables=False, tabmodule=table_module)
+
+    parser = copy.copy(master_parser)
     parser.lines = []
-    error_log = []
-    
-    parser.parse(data, lexer=build_lexer(), tracking=True)
-
-    if len(error_log) > 0:
-        title = 'Assembler failed.\nSyntax error{}:'
-        title = title.format('' if len(error_log) == 1 else 's')
-
-        # List to hold all error messages.
-        description = []
-        for error in error_log:
-            # Create error message.
-            error_pointer = 'line {}> '.format(error['lineno'])
-            line = data.split('\n')[error['lineno'] - 1]
-            message = Util.format_column_marker(line, error['column'], error_pointer)
-            description.append(message)
-
-        sys.stderr.write(Util.format_error(title, '\n'.join(description)))
-        exit(-1)
-        
+
+    return parser
+
+## @brief Parses a program.
+## @details The program is lexed a single time, lexer errors are collected while parsing.
+## @details Raises AssemblerError with every lexer error, or every syntax error if the program lexed cleanly.
+## @param data The program source.
+## @param line_index The line index of the source, built when not given.
+## @param profiler Records the tables, lex and parse phases, see Profiler.
+## @return A list of (lineno, line) tuples.
+def parse(data, line_index=None, profiler=disabled_profiler):
+    with profiler.phase('tables'):
+        parser = build_parser()
+        lexer = build_lexer()
+    lexer.syntax_error_log = []
+    lexer.line_index = line_index or Util.LineIndex(data)
+
+    # Lexing is interleaved with parsing, tokens are only timed when profiling.
+    tokens = TimedCalls(lexer.token) if profiler.enabled else None
+
+    with profiler.phase('parse') as phase:
+        try:
+            parser.parse(data, lexer=lexer, tracking=True, tokenfunc=tokens)
+        except Util.AssemblerError:
+            # An unexpected EOF aborts parsing.
+            # Lexer errors take precedence, as they are often the cause.
+            if len(lexer.error_log) == 0:
+                raise
+        finally:
+            if tokens is not None:
+                phase.excluded = tokens.seconds
+                profiler.record('lex', tokens.seconds, None, tokens=tokens.calls)
+            phase.counts['lines'] = len(parser.lines)
+
+    if len(lexer.error_log) > 0:
+        raise Util.AssemblerError(
+            Util.format_error_log(lexer.line_index, 'Assembler failed.\nUnexpected token{}:', lexer.error_log),
+            Util.structure_error_log(lexer.line_index, 'Unexpected token', lexer.error_log))
+
+    if len(lexer.syntax_error_log) > 0:
+        raise Util.AssemblerError(
+            Util.format_error_log(lexer.line_index, 'Assembler failed.\nSyntax error{}:', lexer.syntax_error_log),
+            Util.structure_error_log(lexer.line_index, 'Syntax error', lexer.syntax_error_log))
+
     return parser.lines
+
+## @brief Writes the prebuilt parser tables.
+## @details Must be run after changing the grammar, so the tables are not built on every start.
+def write_tables():
+    yacc.yacc(start='program', debug=False, tabmodule=table_module, outputdir=os.path.dirname(os.path.abspath(__file__)))
+
+if __name__ == '__main__':
+    write_tables()
@@ -0,0 +1,60 @@
+
+# ParserTables.py
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = '3.10'
+
+_lr_method = 'LALR'
+
+_lr_signature = 'programBRANCH CALL COLON COMMA DOLLAR_SIGN DOUBLE_REG IDENTIFIER IMMEDIATE JUMP MEMORY NOOP NUMBER SINGLE_REGnamed_reg : DOLLAR_SIGN IDENTIFIERnumber_reg : DOLLAR_SIGN NUMBERreg : named_reg\n           | number_reglabel_id : IDENTIFIER COLONlabel : IDENTIFIERinstr_noop : NOOPinstr_immediate : IMMEDIATE reg COMMA NUMBERinstr_single_reg : SINGLE_REG reginstr_double_reg : DOUBLE_REG reg COMMA reginstr_jump : JUMP reg\n                  | JUMP labelinstr_branch : BRANCH reg COMMA reg COMMA reg\n                    | BRANCH reg COMMA reg COMMA labelinstr_call : CALL reg COMMA reg\n                  | CALL reg COMMA labelinstr_memory : MEMORY reg COMMA reginstr : instr_noop\n             | instr_immediate\n             | instr_single_reg\n             | instr_double_reg\n             | instr_jump\n             | instr_branch\n             | instr_call\n             | instr_memoryline : instr\n            | label_idprogram : program line\n               | emptyempty :'
+    
+_lr_action_items = {'IDENTIFIER':([0,1,2,3,4,5,6,7,8,9,10,11,12,13,15,19,23,25,26,27,28,30,31,32,37,38,41,43,44,46,47,48,49,50,51,],[-30,14,-29,-28,-26,-27,-18,-19,-20,-21,-22,-23,-24,-25,-7,32,-5,-3,-4,37,-9,-11,-12,-6,-1,-2,32,-8,-10,-15,-16,-17,32,-13,-14,]),'NOOP':([0,1,2,3,4,5,6,7,8,9,10,11,12,13,15,23,25,26,28,30,31,32,37,38,43,44,46,47,48,50,51,],[-30,15,-29,-28,-26,-27,-18,-19,-20,-21,-22,-23,-24,-25,-7,-5,-3,-4,-9,-11,-12,-6,-1,-2,-8,-10,-15,-16,-17,-13,-14,]),'IMMEDIATE':([0,1,2,3,4,5,6,7,8,9,10,11,12,13,15,23,25,26,28,30,31,32,37,38,43,44,46,47,48,50,51,],[-30,16,-29,-28,-26,-27,-18,-19,-20,-21,-22,-23,-24,-25,-7,-5,-3,-4,-9,-11,-12,-6,-1,-2,-8,-10,-15,-16,-17,-13,-14,]),'SINGLE_REG':([0,1,2,3,4,5,6,7,8,9,10,11,12,13,15,23,25,26,28,30,31,32,37,38,43,44,46,47,48,50,51,],[-30,17,-29,-28,-26,-27,-18,-19,-20,-21,-22,-23,-24,-25,-7,-5,-3,-4,-9,-11,-12,-6,-1,-2,-8,-10,-15,-16,-17,-13,-14,]),'DOUBLE_REG':([0,1,2,3,4,5,6,7,8,9,10,11,12,13,15,23,25,26,28,30,31,32,37,38,43,44,46,47,48,50,51,],[-30,18,-29,-28,-26,-27,-18,-19,-20,-21,-22,-23,-24,-25,-7,-5,-3,-4,-9,-11,-12,-6,-1,-2,-8,-10,-15,-16,-17,-13,-14,]),'JUMP':([0,1,2,3,4,5,6,7,8,9,10,11,12,13,15,23,25,26,28,30,31,32,37,38,43,44,46,47,48,50,51,],[-30,19,-29,-28,-26,-27,-18,-19,-20,-21,-22,-23,-24,-25,-7,-5,-3,-4,-9,-11,-12,-6,-1,-2,-8,-10,-15,-16,-17,-13,-14,]),'BRANCH':([0,1,2,3,4,5,6,7,8,9,10,11,12,13,15,23,25,26,28,30,31,32,37,38,43,44,46,47,48,50,51,],[-30,20,-29,-28,-26,-27,-18,-19,-20,-21,-22,-23,-24,-25,-7,-5,-3,-4,-9,-11,-12,-6,-1,-2,-8,-10,-15,-16,-17,-13,-14,]),'CALL':([0,1,2,3,4,5,6,7,8,9,10,11,12,13,15,23,25,26,28,30,31,32,37,38,43,44,46,47,48,50,51,],[-30,21,-29,-28,-26,-27,-18,-19,-20,-21,-22,-23,-24,-25,-7,-5,-3,-4,-9,-11,-12,-6,-1,-2,-8,-10,-15,-16,-17,-13,-14,]),'MEMORY':([0,1,2,3,4,5,6,7,8,9,10,11,12,13,15,23,25,26,28,30,31,32,37,38,43,44,46,47,48,50,51,],[-30,22,-29,-28,-26,-27,-18,-19,-20,-21,-22,-23,-24,-25,-7,-5,-3,-4,-9,-11,-12,-6,-1,-2,-8,-10,-15,-16,-17,-13,-14,]),'$end':([0,1,2,3,4,5,6,7,8,9,10,11,12,13,15,23,25,26,28,30,31,32,37,38,43,44,46,47,48,50,51,],[-30,0,-29,-28,-26,-27,-18,-19,-20,-21,-22,-23,-24,-25,-7,-5,-3,-4,-9,-11,-12,-6,-1,-2,-8,-10,-15,-16,-17,-13,-14,]),'COLON':([14,],[23,]),'DOLLAR_SIGN':([16,17,18,19,20,21,22,39,40,41,42,49,],[27,27,27,27,27,27,27,27,27,27,27,27,]),'COMMA':([24,25,26,29,33,34,35,37,38,45,],[36,-3,-4,39,40,41,42,-1,-2,49,]),'NUMBER':([27,36,],[38,43,]),}
+
+_lr_action = {}
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = {}
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'program':([0,],[1,]),'empty':([0,],[2,]),'line':([1,],[3,]),'instr':([1,],[4,]),'label_id':([1,],[5,]),'instr_noop':([1,],[6,]),'instr_immediate':([1,],[7,]),'instr_single_reg':([1,],[8,]),'instr_double_reg':([1,],[9,]),'instr_jump':([1,],[10,]),'instr_branch':([1,],[11,]),'instr_call':([1,],[12,]),'instr_memory':([1,],[13,]),'reg':([16,17,18,19,20,21,22,39,40,41,42,49,],[24,28,29,30,33,34,35,44,45,46,48,50,]),'named_reg':([16,17,18,19,20,21,22,39,40,41,42,49,],[25,25,25,25,25,25,25,25,25,25,25,25,]),'number_reg':([16,17,18,19,20,21,22,39,40,41,42,49,],[26,26,26,26,26,26,26,26,26,26,26,26,]),'label':([19,41,49,],[31,47,51,]),}
+
+_lr_goto = {}
+for _k, _v in _lr_goto_items.items():
+   for _x, _y in zip(_v[0], _v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = {}
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> program","S'",1,None,None,None),
+  ('named_reg -> DOLLAR_SIGN IDENTIFIER','named_reg',2,'p_named_reg','Parser.py',27),
+  ('number_reg -> DOLLAR_SIGN NUMBER','number_reg',2,'p_number_reg','Parser.py',31),
+  ('reg -> named_reg','reg',1,'p_reg','Parser.py',35),
+  ('reg -> number_reg','reg',1,'p_reg','Parser.py',36),
+  ('label_id -> IDENTIFIER COLON','label_id',2,'p_label_id','Parser.py',40),
+  ('label -> IDENTIFIER','label',1,'p_label','Parser.py',44),
+  ('instr_noop -> NOOP','instr_noop',1,'p_instr_noop','Parser.py',48),
+  ('instr_immediate -> IMMEDIATE reg COMMA NUMBER','instr_immediate',4,'p_instr_immediate','Parser.py',52),
+  ('instr_single_reg -> SINGLE_REG reg','instr_single_reg',2,'p_instr_single_reg','Parser.py',56),
+  ('instr_double_reg -> DOUBLE_REG reg COMMA reg','instr_double_reg',4,'p_instr_double_reg','Parser.py',60),
+  ('instr_jump -> JUMP reg','instr_jump',2,'p_instr_jump','Parser.py',64),
+  ('instr_jump -> JUMP label','instr_jump',2,'p_instr_jump','Parser.py',65),
+  ('instr_branch -> BRANCH reg COMMA reg COMMA reg','instr_branch',6,'p_instr_branch','Parser.py',69),
+  ('instr_branch -> BRANCH reg COMMA reg COMMA label','instr_branch',6,'p_instr_branch','Parser.py',70),
+  ('instr_call -> CALL reg COMMA reg','instr_call',4,'p_instr_call','Parser.py',74),
+  ('instr_call -> CALL reg COMMA label','instr_call',4,'p_instr_call','Parser.py',75),
+  ('instr_memory -> MEMORY reg COMMA reg','instr_memory',4,'p_instr_memory','Parser.py',79),
+  ('instr -> instr_noop','instr',1,'p_instr','Parser.py',83),
+  ('instr -> instr_immediate','instr',1,'p_instr','Parser.py',84),
+  ('instr -> instr_single_reg','instr',1,'p_instr','Parser.py',85),
+  ('instr -> instr_double_reg','instr',1,'p_instr','Parser.py',86),
+  ('instr -> instr_jump','instr',1,'p_instr','Parser.py',87),
+  ('instr -> instr_branch','instr',1,'p_instr','Parser.py',88),
+  ('instr -> instr_call','instr',1,'p_instr','Parser.py',89),
+  ('instr -> instr_memory','instr',1,'p_instr','Parser.py',90),
+  ('line -> instr','line',1,'p_line','Parser.py',94),
+  ('line -> label_id','line',1,'p_line','Parser.py',95),
+  ('program -> program line','program',2,'p_program','Parser.py',99),
+  ('program -> empty','program',1,'p_program','Parser.py',100),
+  ('empty -> <empty>','empty',0,'p_empty','Parser.py',105),
+]
@@ -0,0 +1,252 @@
+## @file
+## @brief quanta board peripherals model.
+## @details Runs programs against scripted switches: a stimulus timeline sets the switches on given cycles,
+## @details and writes changing the leds and hex displays are captured as output events, with the cycle they happened on.
+## @details Programs waiting on the switches are skipped ahead: when a program reading the switches gets back to the same
+## @details pc, registers and data memory, with no events in between, it's looping without effect until the switches change,
+## @details so the whole iterations up to the next stimulus are skipped, as they would leave everything as it is.
+## @details The data memory isn't copied on each poll: stores changing a word count a memory generation instead, so the
+## @details memory is unchanged while the generation is. States are only recorded once a poll repeats at the same pc with
+## @details no stores nor events since, so programs busy polling between stores don't pay for them.
+## @details With delay_slots, the instruction after each taken jump, branch and call runs as a delay slot, as on the board.
+## @details Timeline files hold a cycle and a switches value on each line, comments start with # or ;:
+## @details     0     0x00
+## @details     5000  0x2A   ; the switches change before the instruction on cycle 5000 runs
+
+import argparse
+import json
+import sys
+from collections import namedtuple
+
+from Assembler import instruction_aliases, register_aliases
+from Simulator import Simulator, load_program, word_mask, address_mask
+from Util import AssemblerError
+
+## @brief Output registers, by name.
+output_registers = {name: register_aliases[name] for name in ('leds', 'hex0', 'hex1', 'hex2')}
+## @brief Name of each output register.
+output_names = {register: name for name, register in output_registers.items()}
+
+## @brief A change on an output: the cycle of the instruction writing it, the output name and the new value.
+OutputEvent = namedtuple('OutputEvent', ('cycle', 'output', 'value'))
+
+## @brief Flags of the instructions watched while running.
+reads_switches = 1
+writes_output = 2
+writes_memory = 4
+
+## @brief Opcode of the store instruction, the only one writing the data memory.
+store_opcode = instruction_aliases['store'].opcode
+
+## @brief The maximum number of states kept to detect idle loops, forgotten all at once when full.
+max_snapshots = 4096
+
+## @brief Reads a stimulus timeline.
+## @param file The timeline file.
+## @return The (cycle, switches value) of each change, sorted by cycle.
+def read_timeline(file):
+    timeline = []
+    for lineno, line in enumerate(file, 1):
+        line = line.split('#')[0].split(';')[0].strip()
+        if not line:
+            continue
+        try:
+            cycle, value = line.split()
+            timeline.append((int(cycle, 0), int(value, 0) & word_mask))
+        except ValueError:
+            raise ValueError('Invalid timeline line {}: expected a cycle and a switches value.'.format(lineno))
+        if timeline[-1][0] < 0:
+            raise ValueError('Invalid timeline line {}: negative cycle.'.format(lineno))
+    # Stable, so a later line for the same cycle wins.
+    timeline.sort(key=lambda change: change[0])
+    return timeline
+
+## @brief Simulates a quanta processor on a board with scripted switches.
+## @details Same results as Simulator, with the switches set along the timeline.
+class PeripheralSimulator(Simulator):
+    ## @param words The instruction words.
+    ## @param timeline The (cycle, switches value) of each change, sorted by cycle.
+    ## @param switches The value on the switches before the first change.
+    ## @param skip_idle Whether to skip idle polling loops.
+    ## @param delay_slots Whether to run the instruction after each taken jump, branch and call, as the hardware does.
+    def __init__(self, words, timeline=(), switches=0, skip_idle=True, delay_slots=False):
+        ## @brief The (cycle, switches value) of each change.
+        self.timeline = list(timeline)
+        ## @brief Whether to skip idle polling loops.
+        self.skip_idle = skip_idle
+        super().__init__(words, switches, delay_slots)
+
+    ## @brief Loads a program into the instruction memory and resets the processor.
+    def load(self, words):
+        super().load(words)
+        switches = register_aliases['switches']
+        ## @brief The watched flags of each instruction: reads_switches, writes_output and writes_memory.
+        self.watched = [(reads_switches if switches in fields[1:4] else 0) |
+                        (writes_output if fields[1] in output_names and fields[0] in self.writing_opcodes else 0) |
+                        (writes_memory if fields[0] == store_opcode else 0)
+                        for fields in self.decoded]
+
+    ## @brief Clears the registers, the data memory, the program counter and the output events.
+    ## @details The timeline starts over.
+    def reset(self):
+        super().reset()
+        ## @brief The output changes, in order.
+        self.events = []
+        ## @brief The number of cycles skipped on idle loops.
+        self.skipped = 0
+        ## @brief The index of the next change on the timeline.
+        self.next_change = 0
+        ## @brief The last value of each output register, to capture changes.
+        self.outputs = {register: 0 for register in output_names}
+        ## @brief The number of stores that changed the data memory.
+        self.memory_generation = 0
+        ## @brief The (cycle, output event count) each state was seen on, by (pc, delayed, registers, memory generation),
+        ## @brief since the last change.
+        self.snapshots = {}
+        ## @brief The (memory generation, output event count) of the last poll at each pc, since the last change.
+        self.polls = {}
+
+    ## @brief Sets the switches changing on or before the current cycle.
+    def apply_changes(self):
+        timeline = self.timeline
+        while self.next_change < len(timeline) and timeline[self.next_change][0] <= self.cycles:
+            self.switches = timeline[self.next_change][1]
+            self.next_change += 1
+            # States seen before the change don't repeat the same way after it.
+            self.snapshots.clear()
+            self.polls.clear()
+
+    ## @brief Runs the program.
+    ## @param max_cycles The number of instructions to execute, including the skipped ones.
+    ## @return The number of cycles executed.
+    def run(self, max_cycles):
+        end = self.cycles + max_cycles
+        # The memory may have been written between runs, without counting a generation.
+        self.snapshots.clear()
+        self.polls.clear()
+        self.apply_changes()
+        while self.cycles < end:
+            stop = end
+            if self.next_change < len(self.timeline):
+                stop = min(stop, self.timeline[self.next_change][0])
+            self.run_until(stop)
+            self.apply_changes()
+        return max_cycles
+
+    ## @brief Runs up to a cycle, with no switches changes before it.
+    ## @param stop The cycle to stop at.
+    def run_until(self, stop):
+        program = self.program
+        watched = self.watched
+        decoded = self.decoded
+        registers = self.registers
+        memory = self.memory
+        outputs = self.outputs
+        events = self.events
+        snapshots = self.snapshots
+        polls = self.polls
+        generation = self.memory_generation
+        pc = self.pc
+        delayed = self.delayed
+        cycle = self.cycles
+
+        while cycle < stop:
+            flags = watched[pc]
+            if not flags:
+                address = pc
+                pc = program[pc]()
+                # Taken jumps are negative with delay slots, see Simulator.run_delayed.
+                if delayed is not None:
+                    pc, delayed = ~pc if pc < 0 else delayed, None
+                elif pc < 0:
+                    pc, delayed = (address + 1) & address_mask, ~pc
+                cycle += 1
+                continue
+
+            if flags & reads_switches and self.skip_idle:
+                mark = (generation, len(events))
+                if polls.get(pc) == mark:
+                    state = (pc, delayed, tuple(registers), generation)
+                    seen = snapshots.get(state)
+                    if seen is not None and seen[1] == len(events):
+                        # Back to the same state with no outputs changed: every following iteration does the same.
+                        period = cycle - seen[0]
+                        skip = (stop - cycle) // period * period
+                        cycle += skip
+                        self.skipped += skip
+                        if cycle == stop:
+                            break
+                    if len(snapshots) >= max_snapshots:
+                        snapshots.clear()
+                    snapshots[state] = (cycle, len(events))
+                else:
+                    polls[pc] = mark
+
+            if flags & writes_memory:
+                _, a, b, _, _ = decoded[pc]
+                if memory[registers[b] & address_mask] != registers[a]:
+                    generation += 1
+
+            address = pc
+            pc = program[pc]()
+            if delayed is not None:
+                pc, delayed = ~pc if pc < 0 else delayed, None
+            elif pc < 0:
+                pc, delayed = (address + 1) & address_mask, ~pc
+            if flags & writes_output:
+                register = decoded[address][1]
+                if registers[register] != outputs[register]:
+                    outputs[register] = registers[register]
+                    events.append(OutputEvent(cycle, output_names[register], registers[register]))
+            cycle += 1
+
+        self.pc = pc
+        self.delayed = delayed
+        self.cycles = cycle
+        self.memory_generation = generation
+
+## @brief Command line entry point.
+## @details Runs a program along a stimulus timeline and prints the output events.
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('program', help='The program to run: quanta source, MIF or raw binary image.', type=str)
+    parser.add_argument('timeline', help='The stimulus timeline: a cycle and a switches value on each line.', type=str, nargs='?')
+    parser.add_argument('-n', '--cycles', help='The number of cycles to run.', type=int, default=1000)
+    parser.add_argument('--switches', help='The value on the switches before the first change.', type=lambda value: int(value, 0), default=0)
+    parser.add_argument('--no-skip', help='Run idle polling loops instead of skipping them.', action='store_true')
+    parser.add_argument('--delay-slots', help='Run the instruction after each taken jump, branch and call, as the hardware does.', action='store_true')
+    parser.add_argument('-o', '--output', help='The path to save the output events, as json.', type=str)
+    args = parser.parse_args()
+
+    try:
+        words = load_program(args.program)
+    except AssemblerError as error:
+        sys.stderr.write(str(error))
+        exit(-1)
+    except (OSError, ValueError) as error:
+        sys.stderr.write('Could not read the program.\n{}\n'.format(error))
+        exit(-1)
+
+    try:
+        timeline = []
+        if args.timeline is not None:
+            with open(args.timeline, 'r') as file:
+                timeline = read_timeline(file)
+    except (OSError, ValueError) as error:
+        sys.stderr.write('Could not read the timeline.\n{}\n'.format(error))
+        exit(-1)
+
+    simulator = PeripheralSimulator(words, timeline, args.switches, skip_idle=not args.no_skip, delay_slots=args.delay_slots)
+    simulator.run(args.cycles)
+
+    for event in simulator.events:
+        print('{:>10}  {:<5} 0x{:08X}'.format(event.cycle, event.output, event.value))
+    print('cycles:  {}'.format(simulator.cycles))
+    print('skipped: {}'.format(simulator.skipped))
+
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump([event._asdict() for event in simulator.events], file, indent=4)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+## @file
+## @brief quanta pipeline timing model.
+## @details Follows hardware/vhdl/pipeline cycle by cycle: fetch, decode, execute, memory access and write back.
+## @details Instructions take effect as they enter the execute stage, with the Simulator handlers.
+## @details Forwarding from the memory access and write back stages means every instruction sees the results of the older ones,
+## @details except for loads, which stall the instruction using them for a cycle (hazard_detection).
+## @details Jumps are resolved on the memory access stage (jump_controller), flushing fetch and decode.
+## @details The instruction on the execute stage is not flushed, so it is executed after any taken jump, as a delay slot.
+## @details Calls link the pc field carried by the instruction, which with the synchronous instruction RAM is the address
+## @details after the delay slot, so returning doesn't execute the delay slot again.
+## @details On the hardware the stalled instruction also enters execute with its writes disabled; it is modeled as a plain bubble.
+
+import argparse
+import sys
+
+from Assembler import instruction_aliases, memory_depth
+from Simulator import Simulator, load_program, disassemble, read_only_registers, address_mask
+from Util import AssemblerError
+
+## @brief Opcode of the load instruction, the only one reading from the data memory.
+load_opcode = instruction_aliases['load'].opcode
+## @brief Opcode of the call instruction.
+call_opcode = instruction_aliases['call'].opcode
+## @brief Opcodes of the conditional jumps.
+branch_opcodes = tuple(instruction_aliases[alias].opcode for alias in ('je', 'jne', 'jl', 'jg'))
+## @brief Opcodes of the unconditional jumps.
+jump_opcodes = (instruction_aliases['j'].opcode, call_opcode)
+
+## @brief Causes of lost cycles, as reported.
+stall_causes = ('load-use', 'branch flush', 'jump')
+
+## @brief An instruction going through the pipeline.
+## @details Records the cycle it entered each stage.
+class TimelineEntry:
+    def __init__(self, address, word, fields, fetch):
+        ## @brief The instruction address.
+        self.address = address
+        ## @brief The instruction word.
+        self.word = word
+        ## @brief The decoded (opcode, a, b, c, immediate).
+        self.fields = fields
+        ## @brief The cycle the instruction was fetched.
+        self.fetch = fetch
+        ## @brief The cycle the instruction entered decode.
+        self.decode = None
+        ## @brief The cycle the instruction entered execute.
+        self.execute = None
+        ## @brief The jump address, when the instruction is a taken jump.
+        self.target = None
+        ## @brief Whether the instruction was executed in the slot after a taken jump.
+        self.delay_slot = False
+
+    ## @brief The cycle the instruction entered memory access.
+    @property
+    def memory(self):
+        return self.execute + 1
+
+    ## @brief The cycle the instruction entered write back.
+    @property
+    def write_back(self):
+        return self.execute + 2
+
+    ## @brief The number of cycles the instruction was stalled on decode.
+    @property
+    def stalls(self):
+        return self.execute - self.decode - 1
+
+## @brief An empty pipeline slot.
+## @details Holds the cause of the lost cycle. Its word is zero, as the cleared instruction RAM output.
+class Bubble:
+    fields = (0, 0, 0, 0, 0)
+    target = None
+
+    def __init__(self, cause, address=None):
+        ## @brief The cause of the bubble, one of stall_causes, or None for the pipeline fill.
+        self.cause = cause
+        ## @brief The address of the instruction the lost cycle is charged to: the stalled instruction or the jump.
+        self.address = address
+
+## @brief Models the timing of a quanta processor.
+class Pipeline:
+    ## @param words The instruction words.
+    ## @param switches The value on the switches input.
+    ## @param timeline The number of retired instructions to keep on the timeline, from the first one.
+    def __init__(self, words, switches=0, timeline=0):
+        ## @brief The simulator holding the processor state.
+        self.simulator = Simulator(words, switches)
+        ## @brief The maximum number of entries on the timeline.
+        self.timeline_limit = timeline
+        self.reset()
+
+    ## @brief Empties the pipeline and resets the processor.
+    def reset(self):
+        self.simulator.reset()
+
+        ## @brief The address on the program counter.
+        self.pc = 0
+        ## @brief The contents of each stage, after fetch.
+        self.decode_slot = Bubble(None)
+        self.execute_slot = Bubble(None)
+        self.memory_slot = Bubble(None)
+        self.write_back_slot = Bubble(None)
+
+        ## @brief The number of cycles executed since the last reset.
+        self.cycles = 0
+        ## @brief The number of instructions that left the write back stage.
+        self.instructions = 0
+        ## @brief Lost cycles for each cause.
+        self.stalls = {cause: 0 for cause in stall_causes}
+        ## @brief Lost cycles charged to each instruction address, for each cause.
+        self.address_stalls = {cause: [0] * memory_depth for cause in stall_causes}
+        ## @brief The number of times the instruction at each address was retired.
+        self.retired = [0] * memory_depth
+        ## @brief The number of instructions executed in the slot after a taken jump.
+        self.delay_slots = 0
+        ## @brief The first retired instructions, in order, up to the timeline limit.
+        self.timeline = []
+
+    ## @brief Cycles per instruction.
+    @property
+    def cpi(self):
+        return self.cycles / self.instructions if self.instructions else 0
+
+    ## @brief Executes an instruction entering the execute stage.
+    ## @param entry The timeline entry of the instruction.
+    def execute(self, entry):
+        simulator = self.simulator
+        opcode, a, b, c, immediate = entry.fields
+
+        if opcode in branch_opcodes:
+            # Handlers return the next address given when the jump is not taken.
+            entry.target = simulator.dispatch[opcode](a, b, c, immediate, None)
+        elif opcode == call_opcode and a not in read_only_registers:
+            # The call handler links the next address given, here the one past the delay slot.
+            entry.target = simulator.dispatch[opcode](a, b, c, immediate, (entry.address + 2) & address_mask)
+        elif opcode in jump_opcodes:
+            # Calls linking a read only register are bound as plain jumps.
+            entry.target = simulator.program[entry.address]()
+        else:
+            simulator.program[entry.address]()
+
+    ## @brief Runs the program.
+    ## @param max_cycles The number of clock cycles to run.
+    ## @return The number of cycles executed.
+    def run(self, max_cycles):
+        simulator = self.simulator
+
+        for _ in range(max_cycles):
+            cycle = self.cycles
+
+            # Signals computed from the pipeline registers on this cycle.
+            jumping = self.memory_slot.target is not None
+            executing = self.execute_slot
+            stall = not isinstance(executing, Bubble) and executing.fields[0] == load_opcode and executing.fields[1] in self.decode_slot.fields[1:4]
+
+            # Write back.
+            retired = self.write_back_slot
+            if not isinstance(retired, Bubble):
+                self.instructions += 1
+                self.retired[retired.address] += 1
+                if len(self.timeline) < self.timeline_limit:
+                    self.timeline.append(retired)
+
+            self.write_back_slot = self.memory_slot
+            self.memory_slot = self.execute_slot
+
+            if jumping:
+                # The jump controller resets the decode/execute register and the instruction RAM output.
+                # The jump has moved on to write back, the instruction now on memory access is its delay slot.
+                jumped = self.write_back_slot
+                cause = 'branch flush' if jumped.fields[0] in branch_opcodes else 'jump'
+                if not isinstance(self.memory_slot, Bubble):
+                    self.memory_slot.delay_slot = True
+                    self.delay_slots += 1
+                self.execute_slot = Bubble(cause, jumped.address)
+                self.decode_slot = Bubble(cause, jumped.address)
+                self.pc = jumped.target
+            elif stall:
+                # The program counter and instruction RAM hold, the decoded instruction waits for the load.
+                self.execute_slot = Bubble('load-use', self.decode_slot.address)
+            else:
+                self.execute_slot = self.decode_slot
+                if not isinstance(self.execute_slot, Bubble):
+                    self.execute_slot.execute = cycle + 1
+                    self.execute(self.execute_slot)
+
+                word = simulator.words[self.pc]
+                self.decode_slot = TimelineEntry(self.pc, word, simulator.decoded[self.pc], cycle)
+                self.decode_slot.decode = cycle + 1
+                self.pc = (self.pc + 1) % len(simulator.words)
+
+            if isinstance(self.execute_slot, Bubble) and self.execute_slot.cause is not None:
+                self.stalls[self.execute_slot.cause] += 1
+                self.address_stalls[self.execute_slot.cause][self.execute_slot.address] += 1
+
+            self.cycles += 1
+
+        return max_cycles
+
+    ## @brief Formats the timing summary.
+    ## @return A generator of lines.
+    def report_lines(self):
+        yield 'cycles:       {}\n'.format(self.cycles)
+        yield 'instructions: {}\n'.format(self.instructions)
+        yield 'CPI:          {:.3f}\n'.format(self.cpi)
+        for cause in stall_causes:
+            yield '{:13} {} cycles\n'.format(cause + ':', self.stalls[cause])
+        yield 'delay slots:  {}\n'.format(self.delay_slots)
+
+    ## @brief Formats the timeline of the retired instructions.
+    ## @details Lists the cycle each instruction entered each stage.
+    ## @param limit The maximum number of instructions to list.
+    ## @return A generator of lines.
+    def timeline_lines(self, limit=None):
+        row = '{:>4}  {:<20} {:>6} {:>6} {:>6} {:>6} {:>6}  {}\n'
+        yield row.format('addr', 'instruction', 'IF', 'ID', 'EX', 'MEM', 'WB', 'notes')
+        for entry in self.timeline[:limit]:
+            notes = []
+            if entry.stalls:
+                notes.append('stalled {}'.format(entry.stalls))
+            if entry.target is not None:
+                notes.append('taken to {}'.format(entry.target))
+            if entry.delay_slot:
+                notes.append('delay slot')
+            yield row.format(entry.address, disassemble(entry.word), entry.fetch, entry.decode, entry.execute, entry.memory, entry.write_back, ', '.join(notes))
+
+## @brief Command line entry point.
+## @details Runs a program for a number of cycles and prints its timing.
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('program', help='The program to run: quanta source, MIF or raw binary image.', type=str)
+    parser.add_argument('-n', '--cycles', help='The number of clock cycles to run.', type=int, default=1000)
+    parser.add_argument('--switches', help='The value on the switches input.', type=lambda value: int(value, 0), default=0)
+    parser.add_argument('--timeline', help='Print the stage timeline of the first N instructions.', type=int, metavar='N', default=0)
+    args = parser.parse_args()
+
+    try:
+        words = load_program(args.program)
+    except AssemblerError as error:
+        sys.stderr.write(str(error))
+        exit(-1)
+    except (OSError, ValueError) as error:
+        sys.stderr.write('Could not read the program.\n{}\n'.format(error))
+        exit(-1)
+
+    pipeline = Pipeline(words, args.switches, timeline=args.timeline)
+    pipeline.run(args.cycles)
+
+    sys.stdout.writelines(pipeline.report_lines())
+    if args.timeline:
+        sys.stdout.write('\n')
+        sys.stdout.writelines(pipeline.timeline_lines(args.timeline))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+## @file
+## @brief Assembler profiling hooks.
+## @details Records the wall time, peak memory and item counts of each phase of assembling a program:
+## @details parser table setup, lexing, parsing, encoding, label resolution and output formatting.
+## @details Functions taking a profiler default to disabled_profiler, whose phases record nothing.
+## @details Peak memory is traced with tracemalloc, which slows the phases down; it can be disabled.
+## @details tracemalloc traces the whole process, every thread included: servers should profile with memory=False.
+## @details tracemalloc.reset_peak is only available from Python 3.9. Before it, a phase raising the peak since tracing
+## @details started reports that peak, and other phases report the memory they left allocated, a lower bound.
+
+import time
+
+## @brief A phase being timed.
+## @details Used as a context manager, the phase is recorded on exit, even when an error is raised.
+class Phase:
+    def __init__(self, profiler, name):
+        ## @brief The profiler recording the phase.
+        self.profiler = profiler
+        ## @brief The phase name.
+        self.name = name
+        ## @brief Item counts, by name, set while the phase runs.
+        self.counts = {}
+        ## @brief Seconds spent on other recorded phases while this one ran, not counted on this one.
+        self.excluded = 0
+        ## @brief Whether tracemalloc was started by this phase.
+        self.started_tracing = False
+
+    def __enter__(self):
+        if self.profiler.memory:
+            # Only imported when tracing, it's slow to import.
+            import tracemalloc
+            self.tracemalloc = tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracing = True
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            self.base_memory, self.base_peak = tracemalloc.get_traced_memory()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception):
+        seconds = time.perf_counter() - self.start - self.excluded
+        peak_memory = None
+        if self.profiler.memory:
+            memory, peak = self.tracemalloc.get_traced_memory()
+            if peak > self.base_peak or hasattr(self.tracemalloc, 'reset_peak'):
+                peak_memory = peak - self.base_memory
+            else:
+                peak_memory = max(memory - self.base_memory, 0)
+            if self.started_tracing:
+                self.tracemalloc.stop()
+        self.profiler.record(self.name, seconds, peak_memory, **self.counts)
+        return False
+
+## @brief Collects the phases of assembling programs.
+class Profiler:
+    ## @brief Whether phases are recorded.
+    enabled = True
+
+    def __init__(self, callback=None, memory=True):
+        ## @brief Called with each phase record, as it's recorded.
+        self.callback = callback
+        ## @brief Whether to trace the peak memory of each phase.
+        self.memory = memory
+        ## @brief The phase records, in order.
+        ## @details Each is a dictionary of {"phase", "seconds", "peak_memory"} and the phase counts.
+        self.phases = []
+
+    ## @brief Starts a phase.
+    ## @param name The phase name.
+    ## @return The Phase, to be used as a context manager.
+    def phase(self, name):
+        return Phase(self, name)
+
+    ## @brief Records a phase.
+    ## @param name The phase name.
+    ## @param seconds The wall time of the phase.
+    ## @param peak_memory The peak memory allocated on the phase, in bytes, or None when not traced.
+    ## @param counts Item counts, by name.
+    def record(self, name, seconds, peak_memory=None, **counts):
+        record = {'phase': name, 'seconds': seconds, 'peak_memory': peak_memory}
+        record.update(counts)
+        self.phases.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    ## @brief The total wall time of the recorded phases.
+    @property
+    def seconds(self):
+        return sum(record['seconds'] for record in self.phases)
+
+    ## @brief The recorded phases, as a json serializable dictionary.
+    def as_dict(self):
+        return {'seconds': self.seconds, 'phases': self.phases}
+
+    ## @brief Formats the recorded phases as a table.
+    ## @return A generator of lines.
+    def report_lines(self):
+        row = '{:<10} {:>10} {:>12}  {}\n'
+        yield row.format('phase', 'time (ms)', 'peak (KiB)', 'counts')
+        for record in self.phases:
+            counts = ', '.join('{} {}'.format(value, name) for name, value in record.items() if name not in ('phase', 'seconds', 'peak_memory'))
+            peak = '-' if record['peak_memory'] is None else '{:.1f}'.format(record['peak_memory'] / 1024)
+            yield row.format(record['phase'], '{:.3f}'.format(record['seconds'] * 1e3), peak, counts)
+        yield row.format('total', '{:.3f}'.format(self.seconds * 1e3), '', '')
+
+## @brief Times the calls to a function, for phases interleaved with others.
+## @details Used to time the lexer, called by the parser for each token.
+class TimedCalls:
+    def __init__(self, function):
+        ## @brief The timed function.
+        self.function = function
+        ## @brief The total wall time of the calls.
+        self.seconds = 0
+        ## @brief The number of calls returning a value other than None.
+        self.calls = 0
+
+    def __call__(self):
+        start = time.perf_counter()
+        result = self.function()
+        self.seconds += time.perf_counter() - start
+        if result is not None:
+            self.calls += 1
+        return result
+
+## @brief A phase recording nothing.
+class NullPhase:
+    def __init__(self):
+        self.counts = {}
+        self.excluded = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        return False
+
+## @brief A profiler recording nothing, the default of functions taking a profiler.
+class NullProfiler:
+    enabled = False
+
+    def phase(self, name):
+        return NullPhase()
+
+    def record(self, name, seconds, peak_memory=None, **counts):
+        pass
+
+## @brief The disabled profiler.
+disabled_profiler = NullProfiler()
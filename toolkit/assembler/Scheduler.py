@@ -0,0 +1,167 @@
+## @file
+## @brief quanta pipeline aware instruction scheduler.
+## @details Reorders independent instructions within basic blocks so results of loads are not used by the next instruction.
+## @details hazard_detection stalls decode for a cycle when the a, b or c field of the decoded word names the register a load on execute writes.
+## @details Register, memory and IO dependencies are kept: stores are never reordered with loads or other stores,
+## @details and instructions using the IO registers keep their relative order.
+## @details Only load-use stalls are reduced. The two cycles flushed by each taken jump, branch or call are left as they are:
+## @details jumps and calls aren't moved, and neither is the instruction following them, which the hardware executes
+## @details even when they're taken, as a delay slot.
+
+from Assembler import instruction_aliases, register_aliases, label_arguments, encode, opcode_offset
+
+## @brief The register loaded with the address of label arguments.
+reserved_reg = register_aliases['a']
+
+## @brief The memory mapped IO registers.
+io_registers = {register_aliases[name] for name in ('leds', 'hex0', 'hex1', 'hex2', 'switches')}
+
+## @brief Instruction types ending a basic block.
+control_types = ('JUMP', 'BRANCH', 'CALL')
+
+## @brief Opcode of the load instruction.
+load_opcode = instruction_aliases['load'].opcode
+
+## @brief Bit offsets of the register fields compared by hazard_detection.
+field_offsets = (19, 14, 9)
+
+## @brief A parsed instruction line, with what it reads and writes.
+class Node:
+    def __init__(self, index, lineno, line):
+        ## @brief The position of the line on the block.
+        self.index = index
+        ## @brief The source line number.
+        self.lineno = lineno
+        ## @brief The parsed line.
+        self.line = line
+
+        instruction = instruction_aliases[line[0]]
+        args = [] if instruction.type == 'NOOP' else [translate(arg) for arg in line[1]]
+
+        # Label arguments are loaded to the reserved register before use.
+        if instruction.type in label_arguments and isinstance(args[label_arguments[instruction.type]], str):
+            args[label_arguments[instruction.type]] = reserved_reg
+
+        ## @brief The instruction word, as encoded by the assembler.
+        self.word = encode(instruction, args)
+        ## @brief The register fields of the word, as compared by hazard_detection.
+        self.fields = register_fields(self.word)
+
+        ## @brief The registers read.
+        self.reads = set()
+        ## @brief The registers written.
+        self.writes = set()
+        if line[0] == 'li':
+            self.writes.add(args[0])
+        elif line[0] in ('move', 'load'):
+            self.writes.add(args[0])
+            self.reads.add(args[1])
+        elif line[0] == 'store':
+            self.reads.update(args)
+        elif instruction.type in ('DOUBLE_REG', 'SINGLE_REG'):
+            self.writes.add(args[0])
+            self.reads.update(args)
+
+        ## @brief Whether the instruction reads the data memory.
+        self.loads = line[0] == 'load'
+        ## @brief Whether the instruction writes the data memory.
+        self.stores = line[0] == 'store'
+        ## @brief Whether the instruction uses an IO register.
+        self.io = bool((self.reads | self.writes) & io_registers)
+
+        ## @brief The nodes that must come before this one.
+        self.predecessors = set()
+
+    ## @brief Checks if this node must stay after an earlier one.
+    def depends_on(self, earlier):
+        return bool(
+            earlier.writes & (self.reads | self.writes) or
+            earlier.reads & self.writes or
+            (earlier.stores and (self.loads or self.stores)) or
+            (earlier.loads and self.stores) or
+            (earlier.io and self.io))
+
+    ## @brief Checks if this node stalls when issued right after another.
+    def stalls_after(self, previous):
+        return previous is not None and previous.loads and previous.fields[0] in self.fields
+
+## @brief The a, b and c register fields of an instruction word.
+def register_fields(word):
+    return tuple(word >> offset & 0x1F for offset in field_offsets)
+
+## @brief Translates a parsed register argument to its number.
+## @details Labels are returned as they are.
+def translate(arg):
+    return register_aliases[arg[0]] if isinstance(arg, tuple) else arg
+
+## @brief Reorders the instructions of a run with no labels or control instructions.
+## @details List scheduling: the earliest ready instruction that doesn't stall is issued next.
+## @param lines The (lineno, line) tuples of the run.
+## @param previous The node issued before the run, if known.
+## @return The reordered lines.
+def schedule_run(lines, previous):
+    nodes = [Node(index, lineno, line) for index, (lineno, line) in enumerate(lines)]
+    for node in nodes:
+        node.predecessors = {earlier for earlier in nodes[:node.index] if node.depends_on(earlier)}
+
+    scheduled = []
+    issued = set()
+    while len(scheduled) < len(nodes):
+        ready = [node for node in nodes if node not in issued and node.predecessors <= issued]
+        # Nodes are listed in source order, so the first one keeps the original order when nothing stalls.
+        node = next((node for node in ready if not node.stalls_after(previous)), ready[0])
+        scheduled.append(node)
+        issued.add(node)
+        previous = node
+
+    return [(node.lineno, node.line) for node in scheduled]
+
+## @brief Schedules a parsed program.
+## @details Each run of instructions between labels and control instructions is scheduled on its own.
+## @param lines The output of the parser.
+## @return The scheduled lines.
+def schedule(lines):
+    scheduled = []
+    run = []
+    previous = None
+    delay_slot = False
+
+    def flush_run():
+        nonlocal previous
+        if run:
+            scheduled.extend(schedule_run(run, previous))
+            lineno, line = scheduled[-1]
+            previous = Node(0, lineno, line)
+            run.clear()
+
+    for lineno, line in lines:
+        instruction = instruction_aliases.get(line[0])
+        if instruction is not None and instruction.type not in control_types and not delay_slot:
+            run.append((lineno, line))
+            continue
+
+        flush_run()
+        scheduled.append((lineno, line))
+        # Labels can be reached from elsewhere, control instructions are followed by their targets.
+        previous = None
+        delay_slot = instruction is not None and instruction.type in control_types
+
+    flush_run()
+    return scheduled
+
+## @brief Estimates the cycles taken to run through a program once, in order.
+## @details Counts the pipeline fill, one cycle per word, a cycle per load-use stall between consecutive words,
+## @details and the two cycles flushed by each unconditional jump. Conditional branches are assumed not taken.
+## @param words The instruction words.
+## @return The estimated number of cycles.
+def estimate_cycles(words):
+    jump_opcodes = (instruction_aliases['j'].opcode, instruction_aliases['call'].opcode)
+
+    cycles = len(words) + 4 if words else 0
+    for previous, word in zip(words, words[1:]):
+        if previous >> opcode_offset == load_opcode and register_fields(previous)[0] in register_fields(word):
+            cycles += 1
+    for word in words:
+        if word >> opcode_offset in jump_opcodes:
+            cycles += 2
+    return cycles
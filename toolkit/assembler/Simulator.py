@@ -0,0 +1,407 @@
+## @file
+## @brief quanta instruction set simulator.
+## @details Runs assembled programs without an FPGA, one instruction per cycle.
+## @details By default this is the architectural model, without the pipeline: taken jumps don't execute the following
+## @details instruction, and call links the address after it. The hardware runs the instruction after every taken jump,
+## @details branch and call as a delay slot, and call links the address past it; Pipeline follows the hardware, and its
+## @details results are the ones to expect on the FPGA. Both agree on programs with noops after every jump, branch and call.
+## @details With delay_slots, the simulator runs delay slots as the hardware does, and ends on the same state as Pipeline.
+## @details A taken jump on a delay slot is followed at once, without a delay slot of its own, as on the pipeline.
+## @details Words are predecoded once into their opcode and operands, then bound to a handler from a dispatch table.
+## @details Follows the documented register file: writes to $zero and $switches are ignored.
+
+import argparse
+import os
+import sys
+
+from functools import partial
+from itertools import repeat
+
+from Assembler import assemble, instruction_aliases, register_aliases, memory_depth, opcode_offset, reg_length, immediate_length
+from MIF import read_mif
+from MemoryImage import load_binary
+from Util import AssemblerError
+
+## @brief The number of registers on the register file.
+register_count = 2**reg_length
+
+## @brief Mask of a 32 bit word.
+word_mask = 0xFFFFFFFF
+## @brief Sign bit of a 32 bit word.
+sign_bit = 0x80000000
+## @brief Mask of an instruction or data memory address.
+address_mask = memory_depth - 1
+
+## @brief Bit offsets of the register fields on an instruction word.
+a_offset = 19
+b_offset = 14
+c_offset = 9
+
+## @brief Registers that ignore writes: the hard wired zero and the switches input.
+read_only_registers = (register_aliases['zero'], register_aliases['switches'])
+
+## @brief Instructions that don't write to their first register argument.
+non_writing_instructions = ('noop', 'store', 'j', 'je', 'jne', 'jl', 'jg')
+
+## @brief Instructions followed by a delay slot on the hardware.
+control_instructions = ('j', 'je', 'jne', 'jl', 'jg', 'call')
+
+## @brief Decodes an instruction word into its fields.
+## @details Every field is extracted, whether or not the instruction uses it.
+## @param word The instruction word.
+## @return A tuple of (opcode, a, b, c, immediate).
+def decode(word):
+    register_mask = register_count - 1
+    return (
+        word >> opcode_offset & 0xFF,
+        word >> a_offset & register_mask,
+        word >> b_offset & register_mask,
+        word >> c_offset & register_mask,
+        word & ((1 << immediate_length) - 1)
+    )
+
+## @brief Maps opcodes to instruction classes.
+opcode_instructions = {i.opcode: i for i in instruction_aliases.values()}
+
+## @brief Converts an instruction word back to quanta source.
+## @details Unknown opcodes are shown as raw words.
+## @param word The instruction word.
+## @return The instruction as a string.
+def disassemble(word):
+    instruction = opcode_instructions.get(word >> opcode_offset & 0xFF)
+    if instruction is None:
+        return '.word 0x{:08X}'.format(word)
+
+    args = []
+    for offset, width in instruction.layout:
+        value = word >> offset & ((1 << width) - 1)
+        args.append('${}'.format(value) if width == reg_length else str(value))
+    return ' '.join([instruction.alias, ', '.join(args)]) if args else instruction.alias
+
+## @brief Builds the instruction handlers for a register file and data memory.
+## @details Every handler takes the decoded (a, b, c, immediate) and the address of the following instruction.
+## @details Handlers return the address of the next instruction to execute.
+## @param registers The register file list.
+## @param memory The data memory list.
+## @return A map of instruction aliases to handlers.
+def build_handlers(registers, memory):
+    def noop(a, b, c, immediate, next):
+        return next
+
+    def li(a, b, c, immediate, next):
+        registers[a] = immediate
+        return next
+
+    def move(a, b, c, immediate, next):
+        registers[a] = registers[b]
+        return next
+
+    def load(a, b, c, immediate, next):
+        registers[a] = memory[registers[b] & address_mask]
+        return next
+
+    def store(a, b, c, immediate, next):
+        memory[registers[b] & address_mask] = registers[a]
+        return next
+
+    def add(a, b, c, immediate, next):
+        registers[a] = (registers[a] + registers[b]) & word_mask
+        return next
+
+    def sub(a, b, c, immediate, next):
+        registers[a] = (registers[a] - registers[b]) & word_mask
+        return next
+
+    def and_(a, b, c, immediate, next):
+        registers[a] &= registers[b]
+        return next
+
+    def or_(a, b, c, immediate, next):
+        registers[a] |= registers[b]
+        return next
+
+    def xor(a, b, c, immediate, next):
+        registers[a] ^= registers[b]
+        return next
+
+    def xnor(a, b, c, immediate, next):
+        registers[a] = ~(registers[a] ^ registers[b]) & word_mask
+        return next
+
+    def not_(a, b, c, immediate, next):
+        registers[a] = ~registers[a] & word_mask
+        return next
+
+    # Shifts and rotations move a single bit.
+    def sl(a, b, c, immediate, next):
+        registers[a] = (registers[a] << 1) & word_mask
+        return next
+
+    def sr(a, b, c, immediate, next):
+        registers[a] >>= 1
+        return next
+
+    def asr(a, b, c, immediate, next):
+        value = registers[a]
+        registers[a] = (value >> 1) | (value & sign_bit)
+        return next
+
+    def rl(a, b, c, immediate, next):
+        value = registers[a]
+        registers[a] = ((value << 1) & word_mask) | (value >> 31)
+        return next
+
+    def j(a, b, c, immediate, next):
+        return registers[c] & address_mask
+
+    # Branches compare by subtracting b from a, as the ALU does.
+    def je(a, b, c, immediate, next):
+        return registers[c] & address_mask if registers[a] == registers[b] else next
+
+    def jne(a, b, c, immediate, next):
+        return registers[c] & address_mask if registers[a] != registers[b] else next
+
+    def jl(a, b, c, immediate, next):
+        return registers[c] & address_mask if (registers[a] - registers[b]) & sign_bit else next
+
+    def jg(a, b, c, immediate, next):
+        return next if (registers[a] - registers[b]) & sign_bit else registers[c] & address_mask
+
+    def call(a, b, c, immediate, next):
+        # The target is read before the return address is written, a and c may be the same register.
+        target = registers[c] & address_mask
+        registers[a] = next
+        return target
+
+    return {
+        'noop': noop, 'li': li, 'move': move, 'load': load, 'store': store,
+        'add': add, 'sub': sub, 'and': and_, 'or': or_, 'xor': xor, 'xnor': xnor,
+        'not': not_, 'sl': sl, 'sr': sr, 'asr': asr, 'rl': rl,
+        'j': j, 'je': je, 'jne': jne, 'jl': jl, 'jg': jg, 'call': call
+    }
+
+## @brief Runs a jump, branch or call followed by a delay slot.
+## @details Branch handlers are given None as the next address, so they return None when not taken.
+## @param handler The instruction handler.
+## @param link The address call links: the one past the delay slot. None for jumps and branches.
+## @param next The address of the following instruction.
+## @return next when not taken, otherwise the bitwise inverse of the target, so taken jumps are negative.
+def delayed_control(handler, a, b, c, immediate, link, next):
+    target = handler(a, b, c, immediate, link)
+    return next if target is None else ~target
+
+## @brief Simulates a quanta processor.
+## @details Instruction and data memories are separate, as on the hardware.
+class Simulator:
+    ## @param words The instruction words.
+    ## @param switches The value on the switches input.
+    ## @param delay_slots Whether to run the instruction after each taken jump, branch and call, as the hardware does.
+    def __init__(self, words, switches=0, delay_slots=False):
+        ## @brief Whether the instruction after each taken jump, branch and call runs as a delay slot.
+        self.delay_slots = delay_slots
+        ## @brief The register file.
+        self.registers = [0] * register_count
+        ## @brief The data memory.
+        self.memory = [0] * memory_depth
+
+        handlers = build_handlers(self.registers, self.memory)
+        ## @brief The dispatch table, maps each opcode to its handler.
+        ## @details Unknown opcodes execute as noop.
+        self.dispatch = [handlers['noop']] * 256
+        for alias, handler in handlers.items():
+            self.dispatch[instruction_aliases[alias].opcode] = handler
+        ## @brief Opcodes of the instructions that write to their first register argument.
+        self.writing_opcodes = {i.opcode for i in instruction_aliases.values() if i.alias not in non_writing_instructions}
+        ## @brief Opcodes of the instructions followed by a delay slot.
+        self.control_opcodes = {instruction_aliases[alias].opcode for alias in control_instructions}
+
+        self.load(words)
+        self.switches = switches
+
+    ## @brief Loads a program into the instruction memory and resets the processor.
+    ## @param words The instruction words, missing addresses are set to noop.
+    def load(self, words):
+        words = list(words)
+        if len(words) > memory_depth:
+            raise ValueError('The program has {} words, the instruction memory holds {}.'.format(len(words), memory_depth))
+        words += [0] * (memory_depth - len(words))
+
+        ## @brief The instruction memory words.
+        self.words = words
+        ## @brief The predecoded (opcode, a, b, c, immediate) of each instruction.
+        self.decoded = [decode(word) for word in words]
+        ## @brief The handler of each instruction, bound to its operands.
+        self.program = [self.bind(address, fields) for address, fields in enumerate(self.decoded)]
+
+        self.reset()
+
+    ## @brief Binds an instruction to its handler.
+    ## @details With delay slots, taken jumps return the bitwise inverse of their target, see delayed_control.
+    ## @param address The instruction address.
+    ## @param fields The decoded instruction.
+    ## @return A callable executing the instruction, returning the next address.
+    def bind(self, address, fields):
+        opcode, a, b, c, immediate = fields
+        handler = self.dispatch[opcode]
+
+        # Writes to read only registers are dropped when decoding, so handlers never check for them.
+        if a in read_only_registers and opcode in self.writing_opcodes:
+            if opcode == instruction_aliases['call'].opcode:
+                opcode = instruction_aliases['j'].opcode
+            handler = self.dispatch[opcode] if opcode in self.control_opcodes else self.dispatch[0]
+
+        next = (address + 1) & address_mask
+        if self.delay_slots and opcode in self.control_opcodes:
+            link = (address + 2) & address_mask if opcode == instruction_aliases['call'].opcode else None
+            return partial(delayed_control, handler, a, b, c, immediate, link, next)
+        return partial(handler, a, b, c, immediate, next)
+
+    ## @brief Clears the registers, the data memory and the program counter.
+    ## @details The switches keep their value.
+    def reset(self):
+        switches = self.registers[register_aliases['switches']]
+        self.registers[:] = [0] * register_count
+        self.registers[register_aliases['switches']] = switches
+        self.memory[:] = [0] * memory_depth
+
+        ## @brief The address of the next instruction.
+        self.pc = 0
+        ## @brief The target of the taken jump whose delay slot is at pc, or None.
+        self.delayed = None
+        ## @brief The number of cycles executed since the last reset.
+        self.cycles = 0
+
+    ## @brief Runs the program.
+    ## @param max_cycles The number of instructions to execute.
+    ## @return The number of cycles executed.
+    def run(self, max_cycles):
+        if self.delay_slots:
+            return self.run_delayed(max_cycles)
+
+        program = self.program
+        pc = self.pc
+        for _ in repeat(None, max_cycles):
+            pc = program[pc]()
+        self.pc = pc
+        self.cycles += max_cycles
+        return max_cycles
+
+    ## @brief Runs the program with delay slots.
+    ## @param max_cycles The number of instructions to execute.
+    ## @return The number of cycles executed.
+    def run_delayed(self, max_cycles):
+        program = self.program
+        pc = self.pc
+        delayed = self.delayed
+        for _ in repeat(None, max_cycles):
+            address = pc
+            pc = program[pc]()
+            if delayed is not None:
+                # The delay slot ran, a taken jump on it is followed instead.
+                pc, delayed = ~pc if pc < 0 else delayed, None
+            elif pc < 0:
+                pc, delayed = (address + 1) & address_mask, ~pc
+        self.pc = pc
+        self.delayed = delayed
+        self.cycles += max_cycles
+        return max_cycles
+
+    ## @brief Executes a single instruction.
+    def step(self):
+        return self.run(1)
+
+    ## @brief The value on the switches input.
+    @property
+    def switches(self):
+        return self.registers[register_aliases['switches']]
+
+    @switches.setter
+    def switches(self, value):
+        self.registers[register_aliases['switches']] = value & word_mask
+
+    ## @brief The value on the leds output.
+    @property
+    def leds(self):
+        return self.registers[register_aliases['leds']]
+
+    ## @brief The values on the hex display outputs.
+    @property
+    def hex(self):
+        return tuple(self.registers[register_aliases[name]] for name in ('hex0', 'hex1', 'hex2'))
+
+## @brief Reads the instruction words of a program.
+## @details MIF and raw binary images are loaded as they are, anything else is assembled.
+## @param path The path to the program.
+## @return The instruction words.
+def load_program(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.mif':
+        with open(path, 'r') as file:
+            return read_mif(file)
+    if extension == '.bin':
+        return list(load_binary(path))
+
+    with open(path, 'r') as file:
+        return assemble(file.read())
+
+## @brief Command line entry point.
+## @details Runs a program for a number of cycles and prints the processor state.
+def main():
+    parser = argparse.ArgumentParser(description='Runs a program one instruction per cycle, without delay slots by default. '
+                                                 'The hardware runs the instruction after each taken jump, branch and call: '
+                                                 'run with --delay-slots for the results of the FPGA, or --pipeline, or '
+                                                 'Pipeline.py, for its timing too.')
+    parser.add_argument('program', help='The program to run: quanta source, MIF or raw binary image.', type=str)
+    parser.add_argument('-n', '--cycles', help='The number of cycles to run.', type=int, default=1000)
+    parser.add_argument('--switches', help='The value on the switches input.', type=lambda value: int(value, 0), default=0)
+    parser.add_argument('--pipeline', help='Run on the pipeline timing model, with delay slots, as the hardware does.', action='store_true')
+    parser.add_argument('--delay-slots', help='Run the instruction after each taken jump, branch and call, as the hardware does.', action='store_true')
+    parser.add_argument('--compile', help='Compile basic blocks to Python functions, faster on long runs.', action='store_true')
+    parser.add_argument('--trace', help='The path to save a trace of the last instructions, read by TraceSimulator.py.', type=str)
+    parser.add_argument('--trace-size', help='The number of instructions kept on the trace.', type=int, default=65536)
+    args = parser.parse_args()
+    if (args.pipeline, args.compile, args.trace is not None).count(True) > 1:
+        parser.error('Only one of --pipeline, --compile and --trace can be used.')
+
+    try:
+        words = load_program(args.program)
+    except AssemblerError as error:
+        sys.stderr.write(str(error))
+        exit(-1)
+    except (OSError, ValueError) as error:
+        sys.stderr.write('Could not read the program.\n{}\n'.format(error))
+        exit(-1)
+
+    if args.pipeline:
+        from Pipeline import Pipeline
+        pipeline = Pipeline(words, args.switches, timeline=False)
+        pipeline.run(args.cycles)
+        # The state printed is the processor's, the pc is the next address fetched.
+        simulator = pipeline.simulator
+        simulator.pc = pipeline.pc
+        simulator.cycles = pipeline.cycles
+    elif args.compile:
+        from BlockSimulator import BlockSimulator
+        simulator = BlockSimulator(words, args.switches, args.delay_slots)
+    elif args.trace is not None:
+        from TraceSimulator import TraceSimulator
+        simulator = TraceSimulator(words, args.switches, args.delay_slots, capacity=args.trace_size)
+    else:
+        simulator = Simulator(words, args.switches, args.delay_slots)
+    if not args.pipeline:
+        simulator.run(args.cycles)
+
+    if args.trace is not None:
+        from TraceSimulator import save_trace
+        save_trace(args.trace, simulator.words, simulator.trace)
+
+    print('cycles: {}'.format(simulator.cycles))
+    print('pc:     {}'.format(simulator.pc))
+    print('leds:   0x{:08X}'.format(simulator.leds))
+    print('hex:    {}'.format(' '.join('0x{:08X}'.format(value) for value in simulator.hex)))
+    for register, value in enumerate(simulator.registers):
+        if value:
+            print('${:<5} 0x{:08X}'.format(register, value))
+
+if __name__ == '__main__':
+    main()
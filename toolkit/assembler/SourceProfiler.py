@@ -0,0 +1,188 @@
+## @file
+## @brief quanta hot spot profiler.
+## @details Runs a program and charges the cycles spent on each instruction address to the source line and label it came from,
+## @details with the source map the assembler builds alongside the words.
+## @details On the simulator each instruction takes one cycle. On the pipeline model, lost cycles are also charged:
+## @details load-use stalls to the instruction waiting for the load, flushes to the jump or taken branch causing them.
+## @details Each address belongs to the closest label at or before it.
+
+import argparse
+import bisect
+import json
+import os
+import sys
+from itertools import repeat
+
+from Assembler import assemble_program, memory_depth
+from MIF import read_mif
+from MemoryImage import load_binary
+from Simulator import Simulator
+from Util import AssemblerError
+
+## @brief Label of the addresses before the first label.
+entry_label = '(entry)'
+## @brief Label of the addresses past the program words, which have no source line.
+unmapped_label = '(no source)'
+
+## @brief Reads a source map saved by Assembler.py --source-map.
+## @param path The path to the source map.
+## @return A tuple of the source path, the source line of each word and the symbol table.
+def read_source_map(path):
+    with open(path, 'r') as file:
+        source_map = json.load(file)
+    source = source_map['source']
+    if not os.path.isabs(source):
+        source = os.path.join(os.path.dirname(path), source)
+    return source, source_map['lines'], source_map['symbols']
+
+## @brief Counts the instructions executed at each address on the simulator.
+## @param words The instruction words.
+## @param switches The value on the switches input.
+## @param cycles The number of cycles to run.
+## @return The number of instructions executed at each address.
+def count_instructions(words, switches, cycles):
+    simulator = Simulator(words, switches)
+    program = simulator.program
+    counts = [0] * memory_depth
+    pc = 0
+    for _ in repeat(None, cycles):
+        counts[pc] += 1
+        pc = program[pc]()
+    return counts
+
+## @brief The cycles a program spent on each source line and label.
+class SourceProfile:
+    ## @param source The program source.
+    ## @param source_map The source line of each word.
+    ## @param symbols The symbol table.
+    ## @param executed The number of instructions executed at each address.
+    ## @param stalls The lost cycles charged to each address, for each cause; empty when run on the simulator.
+    def __init__(self, source, source_map, symbols, executed, stalls=None):
+        ## @brief The source lines, without line breaks.
+        self.source = source.split('\n')
+        ## @brief The source line of each word.
+        self.source_map = source_map
+        ## @brief The symbol table.
+        self.symbols = symbols
+        stalls = stalls or {}
+        ## @brief The causes of lost cycles, in report order.
+        self.causes = tuple(stalls)
+        ## @brief The (executed instructions, lost cycles for each cause) of each source line.
+        self.lines = {}
+        ## @brief The same counts for each label.
+        self.labels = {}
+
+        def charge(counts, key, address):
+            instructions, lost = counts.get(key, (0, (0,) * len(self.causes)))
+            counts[key] = (instructions + executed[address], tuple(cycles + stalls[cause][address] for cycles, cause in zip(lost, self.causes)))
+
+        # The first label of each address, in source order.
+        starts = {}
+        for label, address in symbols.items():
+            starts.setdefault(address, label)
+        starts = sorted(starts.items())
+        start_addresses = [address for address, _ in starts]
+
+        for address in range(memory_depth):
+            if address >= len(source_map):
+                if executed[address] or any(stalls[cause][address] for cause in self.causes):
+                    charge(self.labels, unmapped_label, address)
+                continue
+            charge(self.lines, source_map[address], address)
+            index = bisect.bisect_right(start_addresses, address) - 1
+            charge(self.labels, starts[index][1] if index >= 0 else entry_label, address)
+
+        ## @brief The total cycles of the run.
+        self.cycles = sum(instructions + sum(lost) for instructions, lost in self.labels.values())
+
+    ## @brief Formats one row of counts.
+    def format_counts(self, instructions, lost):
+        cycles = instructions + sum(lost)
+        share = 100 * cycles / self.cycles if self.cycles else 0
+        return '{:>10} {:6.2f}% {:>10}'.format(cycles, share, instructions) + ''.join(' {:>12}'.format(value) for value in lost)
+
+    ## @brief Formats the count column titles.
+    def format_titles(self):
+        return '{:>10} {:>7} {:>10}'.format('cycles', '%', 'executed') + ''.join(' {:>12}'.format(cause) for cause in self.causes)
+
+    ## @brief Formats the flat profile: labels and lines, most cycles first.
+    ## @param limit The maximum number of lines to list.
+    ## @return A generator of lines.
+    def flat_lines(self, limit=None):
+        rank = lambda item: (-(item[1][0] + sum(item[1][1])), item[0])
+
+        yield '{}  label\n'.format(self.format_titles())
+        for label, counts in sorted(self.labels.items(), key=rank):
+            yield '{}  {}\n'.format(self.format_counts(*counts), label)
+
+        yield '\n{}  {:>5}  source\n'.format(self.format_titles(), 'line')
+        hot = [(lineno, counts) for lineno, counts in self.lines.items() if counts[0] or any(counts[1])]
+        for lineno, counts in sorted(hot, key=rank)[:limit]:
+            yield '{}  {:>5}  {}\n'.format(self.format_counts(*counts), lineno, self.source[lineno - 1].strip())
+
+    ## @brief Formats the annotated source listing.
+    ## @details Lines that assembled to no words have empty counts.
+    ## @return A generator of lines.
+    def listing_lines(self):
+        blank = ' ' * len(self.format_titles())
+        yield '{}  {:>5}  source\n'.format(self.format_titles(), 'line')
+        for lineno, text in enumerate(self.source, 1):
+            counts = self.lines.get(lineno)
+            yield '{}  {:>5}  {}\n'.format(self.format_counts(*counts) if counts is not None else blank, lineno, text)
+
+## @brief Command line entry point.
+## @details Runs a program and prints its flat profile and annotated source listing.
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('program', help='The program to profile: quanta source, or a MIF or raw binary image with its --source-map.', type=str)
+    parser.add_argument('--source-map', help='The source map saved by Assembler.py --source-map, for MIF and raw binary images.', type=str)
+    parser.add_argument('-n', '--cycles', help='The number of clock cycles to run.', type=int, default=1000)
+    parser.add_argument('--switches', help='The value on the switches input.', type=lambda value: int(value, 0), default=0)
+    parser.add_argument('--pipeline', help='Run on the pipeline timing model, charging stall cycles to source lines.', action='store_true')
+    parser.add_argument('-O', '--optimize', help='Optimize quanta source before running it.', action='store_true')
+    parser.add_argument('--schedule', help='Schedule quanta source before running it.', action='store_true')
+    parser.add_argument('--top', help='The number of source lines on the flat profile.', type=int, default=20)
+    parser.add_argument('--no-listing', help='Only print the flat profile.', action='store_true')
+    args = parser.parse_args()
+
+    extension = os.path.splitext(args.program)[1].lower()
+    try:
+        if extension in ('.mif', '.bin'):
+            if args.source_map is None:
+                parser.error('MIF and raw binary images need their --source-map.')
+            if extension == '.mif':
+                with open(args.program, 'r') as file:
+                    words = read_mif(file)
+            else:
+                words = list(load_binary(args.program))
+            source_path, source_map, symbols = read_source_map(args.source_map)
+            with open(source_path, 'r') as file:
+                source = file.read()
+        else:
+            with open(args.program, 'r') as file:
+                source = file.read()
+            program = assemble_program(source, args.optimize, args.schedule)
+            words, source_map, symbols = program.words, program.source_map, program.symbols
+    except AssemblerError as error:
+        sys.stderr.write(str(error))
+        exit(-1)
+    except (OSError, ValueError) as error:
+        sys.stderr.write('Could not read the program.\n{}\n'.format(error))
+        exit(-1)
+
+    if args.pipeline:
+        # Only imported when profiling the pipeline.
+        from Pipeline import Pipeline
+        pipeline = Pipeline(words, args.switches)
+        pipeline.run(args.cycles)
+        profile = SourceProfile(source, source_map, symbols, pipeline.retired, pipeline.address_stalls)
+    else:
+        profile = SourceProfile(source, source_map, symbols, count_instructions(words, args.switches, args.cycles))
+
+    sys.stdout.writelines(profile.flat_lines(args.top))
+    if not args.no_listing:
+        sys.stdout.write('\n')
+        sys.stdout.writelines(profile.listing_lines())
+
+if __name__ == '__main__':
+    main()
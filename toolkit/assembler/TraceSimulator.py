@@ -0,0 +1,434 @@
+## @file
+## @brief quanta execution trace recorder.
+## @details Runs programs as Simulator does, recording the retired instructions on a fixed size ring buffer of packed
+## @details records and the processor state on periodic checkpoints.
+## @details Runs longer than the ring buffer only trace their last instructions, the ones the buffer keeps; the rest
+## @details runs at full speed, stopping only for checkpoints. Any earlier cycle is rebuilt by replaying from the
+## @details closest checkpoint, so the simulator can step backwards: through the records while they reach, through
+## @details the checkpoints past them.
+## @details Traces are saved with the program words, for offline analysis: python TraceSimulator.py trace.qtr
+## @details With delay_slots, the instruction after each taken jump, branch and call runs as a delay slot, as on Simulator.
+
+import argparse
+import array
+import struct
+import sys
+
+from collections import namedtuple
+
+from Assembler import instruction_aliases, register_aliases, memory_depth
+from BlockSimulator import aliases, expressions, conditions, compile_factory
+from MemoryImage import word_typecode
+from Simulator import Simulator, disassemble, read_only_registers, non_writing_instructions, address_mask, word_mask, sign_bit
+
+## @brief A retired instruction.
+## @details register and address are no_register and no_address when the instruction doesn't write a register or
+## @details access the data memory. Stores hold the old and new values of the memory word, anything else of the register.
+TraceRecord = namedtuple('TraceRecord', ['cycle', 'pc', 'opcode', 'register', 'old', 'new', 'address'])
+
+## @brief Packed layout of a record on trace files: cycle, pc, opcode, register, old value, new value, address.
+record_struct = struct.Struct('<QBBBIIH')
+
+## @brief Register field of records not writing a register.
+no_register = 0xFF
+## @brief Address field of records not accessing the data memory.
+no_address = 0xFFFF
+
+## @brief Trace file header: magic, version, record size, record count, then the instruction memory words.
+header_struct = struct.Struct('<4sHHQ')
+trace_magic = b'QTRC'
+trace_version = 1
+
+## @brief A processor state: the cycle, the program counter, the registers and the data memory.
+## @details delayed is the target of the taken jump whose delay slot is at pc, or None.
+Checkpoint = namedtuple('Checkpoint', ['cycle', 'pc', 'registers', 'memory', 'pinned', 'delayed'])
+
+## @brief Opcode of the store instruction, recording the old and new values of the memory word.
+store_opcode = instruction_aliases['store'].opcode
+
+## @brief The maximum number of instructions on a traced block.
+max_block_length = 64
+
+## @brief Generates the source of a traced block.
+## @details A block executes the instructions from an address up to its first jump, branch or call, recording each one
+## @details on consecutive trace slots, in a single call: it's given the slot of its first instruction and returns the
+## @details next address. Instructions not writing a register nor storing only record their pc.
+## @details With delay slots, taken jumps return the bitwise inverse of their target, as the Simulator handlers do,
+## @details and call links the address past its delay slot.
+## @param decoded The decoded (opcode, a, b, c, immediate) of the instruction memory.
+## @param entry The address the block starts at.
+## @param max_length The maximum number of instructions on the block.
+## @param delay_slots Whether jumps are followed by a delay slot.
+## @return The source of a make(R, M, pcs, olds, news, addresses) function returning the block, and its length.
+def generate_traced_block(decoded, entry, max_length=max_block_length, delay_slots=False):
+    # Taken targets, inverted with delay slots.
+    taken = '~({})' if delay_slots else '{}'
+    body = []
+    address = entry
+    for length in range(1, max_length + 1):
+        opcode, a, b, c, immediate = decoded[address]
+        alias = aliases.get(opcode, 'noop')
+        next = (address + 1) & address_mask
+        slot = 'slot + {}'.format(length - 1) if length > 1 else 'slot'
+        # Writes to read only registers are dropped, as when binding handlers.
+        if a in read_only_registers and alias not in non_writing_instructions:
+            alias = 'j' if alias == 'call' else 'noop'
+
+        body.append('pcs[{}] = {}'.format(slot, address))
+        if alias in ('load', 'store'):
+            body.append('address = addresses[{}] = R[{}] & {}'.format(slot, b, address_mask))
+        if alias == 'store':
+            body += ['olds[{}] = M[address]'.format(slot), 'M[address] = news[{}] = R[{}]'.format(slot, a)]
+        elif alias in ('li', 'load', 'call') or alias in expressions:
+            if alias == 'call':
+                # The target is read before the return address is written, a and c may be the same register.
+                body.append('target = R[{}] & {}'.format(c, address_mask))
+            link = (address + 2) & address_mask if delay_slots else next
+            value = {'li': str(immediate), 'load': 'M[address]', 'call': str(link)}.get(alias)
+            if value is None:
+                value = expressions[alias].format(a='R[{}]'.format(a), b='R[{}]'.format(b), mask=word_mask, sign=sign_bit)
+            body += ['olds[{}] = R[{}]'.format(slot, a), 'R[{}] = news[{}] = {}'.format(a, slot, value)]
+
+        if alias == 'call':
+            body.append('return ' + taken.format('target'))
+            break
+        elif alias == 'j':
+            body.append('return ' + taken.format('R[{}] & {}'.format(c, address_mask)))
+            break
+        elif alias in conditions:
+            condition = conditions[alias].format(a='R[{}]'.format(a), b='R[{}]'.format(b), sign=sign_bit)
+            body.append('return {} if {} else {}'.format(taken.format('R[{}] & {}'.format(c, address_mask)), condition, next))
+            break
+        address = next
+    else:
+        body.append('return {}'.format(next))
+
+    lines = ['def make(R, M, pcs, olds, news, addresses):', '    def block(slot):']
+    lines += ['        ' + line for line in body]
+    lines.append('    return block')
+    return '\n'.join(lines) + '\n', length
+
+## @brief Fixed size ring buffer of trace records.
+## @details Records are kept on packed arrays, one per field that changes from run to run: pc, old value, new value
+## @details and address. Records are consecutive, so their cycle follows from their position, and the instruction
+## @details memory doesn't change while tracing, so the opcode and register follow from the pc.
+## @details The oldest records are overwritten once the buffer is full.
+class TraceBuffer:
+    ## @param capacity The number of records kept.
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError('The trace holds at least one record, got a capacity of {}.'.format(capacity))
+        ## @brief The number of records kept.
+        self.capacity = capacity
+        ## @brief The pc, old value, new value and address of each record slot.
+        self.pcs = array.array('B', bytes(capacity))
+        self.olds = array.array(word_typecode, bytes(4 * capacity))
+        self.news = array.array(word_typecode, bytes(4 * capacity))
+        self.addresses = array.array('H', bytes(2 * capacity))
+        ## @brief The (opcode, register written or no_register, whether it accesses the data memory) by address.
+        self.instructions = [(0, no_register, False)] * memory_depth
+        self.clear()
+
+    ## @brief Drops every record.
+    ## @param cycle The cycle of the next record.
+    def clear(self, cycle=0):
+        ## @brief The slot of the next record.
+        self.head = 0
+        ## @brief The number of records held.
+        self.count = 0
+        ## @brief The cycle of the next record.
+        self.cycle = cycle
+
+    def __len__(self):
+        return self.count
+
+    ## @brief Counts records written on the slots after the head, moving it.
+    def advance(self, count):
+        self.head = (self.head + count) % self.capacity
+        self.count = min(self.count + count, self.capacity)
+        self.cycle += count
+
+    ## @brief Removes and returns the newest record.
+    def pop(self):
+        record = self[-1]
+        self.head = (self.head - 1) % self.capacity
+        self.count -= 1
+        self.cycle -= 1
+        return record
+
+    ## @brief Returns a record.
+    ## @param index The record index, 0 being the oldest held and -1 the newest.
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError('trace index out of range')
+        slot = (self.head - self.count + index) % self.capacity
+        pc = self.pcs[slot]
+        opcode, register, accesses_memory = self.instructions[pc]
+        # Slots of instructions without effects hold stale values.
+        recorded = register != no_register or opcode == store_opcode
+        return TraceRecord(self.cycle - self.count + index, pc, opcode, register, self.olds[slot] if recorded else 0,
+                           self.news[slot] if recorded else 0, self.addresses[slot] if accesses_memory else no_address)
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self[index]
+
+    ## @brief Returns the records packed as on trace files, oldest first.
+    def to_bytes(self):
+        return b''.join(record_struct.pack(*record) for record in self)
+
+## @brief Saves a trace.
+## @param path The path to save the trace.
+## @param words The instruction memory words.
+## @param trace The TraceBuffer.
+def save_trace(path, words, trace):
+    with open(path, 'wb') as file:
+        file.write(header_struct.pack(trace_magic, trace_version, record_struct.size, len(trace)))
+        file.write(array.array(word_typecode, words).tobytes())
+        file.write(trace.to_bytes())
+
+## @brief Loads a saved trace.
+## @param path The path to the trace.
+## @return The instruction memory words and the list of TraceRecord, oldest first.
+def load_trace(path):
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    magic, version, size, count = header_struct.unpack_from(data)
+    if magic != trace_magic or version != trace_version or size != record_struct.size:
+        raise ValueError('{} is not a version {} quanta trace.'.format(path, trace_version))
+
+    words = array.array(word_typecode)
+    words.frombytes(data[header_struct.size:header_struct.size + memory_depth * words.itemsize])
+    offset = header_struct.size + memory_depth * words.itemsize
+    return list(words), [TraceRecord(*fields) for fields in record_struct.iter_unpack(data[offset:offset + count * size])]
+
+## @brief Simulates a quanta processor, tracing its execution.
+## @details Same interface and results as Simulator. The switches may only be changed through the switches property,
+## @details which checkpoints the new value so replays see it.
+class TraceSimulator(Simulator):
+    ## @param words The instruction words.
+    ## @param switches The value on the switches input.
+    ## @param delay_slots Whether to run the instruction after each taken jump, branch and call, as the hardware does.
+    ## @param capacity The number of records kept on the trace.
+    ## @param checkpoint_interval The cycles between checkpoints.
+    ## @param max_checkpoints The most checkpoints kept; past it, every other one is dropped and the interval doubles.
+    def __init__(self, words, switches=0, delay_slots=False, capacity=65536, checkpoint_interval=4096, max_checkpoints=1024):
+        ## @brief The trace of the last retired instructions.
+        self.trace = TraceBuffer(capacity)
+        self.initial_interval = checkpoint_interval
+        self.max_checkpoints = max_checkpoints
+        super().__init__(words, switches, delay_slots)
+
+    ## @brief Loads a program and precomputes what each instruction records.
+    def load(self, words):
+        super().load(words)
+        self.find_effects()
+        ## @brief The compiled (traced block, length) at each entry address, or None.
+        self.blocks = [None] * memory_depth
+        ## @brief The compiled traced single instruction at each address, or None, to fill the end of the trace buffer.
+        self.steps = [None] * memory_depth
+
+    ## @brief Finds the register each instruction writes and whether it accesses the data memory, for the trace.
+    def find_effects(self):
+        writing = {i.opcode for i in instruction_aliases.values() if i.alias not in non_writing_instructions}
+        memory_opcodes = {instruction_aliases['load'].opcode, instruction_aliases['store'].opcode}
+        self.trace.instructions = [(opcode, a if opcode in writing and a not in read_only_registers else no_register, opcode in memory_opcodes)
+                                   for opcode, a, b, c, immediate in self.decoded]
+
+    ## @brief Compiles a traced block.
+    ## @param entry The address the block starts at.
+    ## @param max_length The maximum number of instructions on the block.
+    ## @return The (function, length) of the block.
+    def compile_block(self, entry, max_length=max_block_length):
+        source, length = generate_traced_block(self.decoded, entry, max_length, self.delay_slots)
+        trace = self.trace
+        block = (compile_factory(source)(self.registers, self.memory, trace.pcs, trace.olds, trace.news, trace.addresses), length)
+        if max_length == 1:
+            self.steps[entry] = block
+        else:
+            self.blocks[entry] = block
+        return block
+
+    ## @brief Clears the processor, the trace and the checkpoints.
+    def reset(self):
+        super().reset()
+        self.trace.clear(self.cycles)
+        ## @brief The cycles between checkpoints.
+        self.checkpoint_interval = self.initial_interval
+        ## @brief The checkpoints, oldest first.
+        self.checkpoints = []
+        self.checkpoint(pinned=True)
+
+    @Simulator.switches.setter
+    def switches(self, value):
+        Simulator.switches.fset(self, value)
+        # Replays start after the last input change, and the trace, not holding the old value, stops at it.
+        if hasattr(self, 'checkpoints'):
+            self.trace.clear(self.cycles)
+            self.checkpoint(pinned=True)
+
+    ## @brief Saves the current state as a checkpoint.
+    ## @param pinned Whether the checkpoint is kept when thinning the checkpoints, as for input changes.
+    def checkpoint(self, pinned=False):
+        if self.checkpoints and self.checkpoints[-1].cycle == self.cycles:
+            pinned = self.checkpoints.pop().pinned or pinned
+        self.checkpoints.append(Checkpoint(self.cycles, self.pc, array.array(word_typecode, self.registers),
+                                           array.array(word_typecode, self.memory), pinned, self.delayed))
+
+        if len(self.checkpoints) > self.max_checkpoints:
+            self.checkpoint_interval *= 2
+            self.checkpoints = [c for c in self.checkpoints if c.pinned or c.cycle % self.checkpoint_interval == 0 or c is self.checkpoints[-1]]
+
+    ## @brief Runs the program, tracing the instructions the trace can hold.
+    ## @param max_cycles The number of instructions to execute.
+    ## @return The number of cycles executed.
+    def run(self, max_cycles):
+        untraced = max(0, max_cycles - self.trace.capacity)
+        self.run_checkpointed(untraced, super().run)
+        if untraced:
+            self.trace.clear(self.cycles)
+        self.run_checkpointed(max_cycles - untraced, self.run_traced)
+        return max_cycles
+
+    ## @brief Runs a number of cycles, stopping on each checkpoint.
+    ## @param cycles The number of cycles.
+    ## @param run The function running a number of cycles.
+    def run_checkpointed(self, cycles, run):
+        while cycles:
+            chunk = min(cycles, self.checkpoint_interval - self.cycles % self.checkpoint_interval)
+            run(chunk)
+            cycles -= chunk
+            if self.cycles % self.checkpoint_interval == 0:
+                self.checkpoint()
+
+    ## @brief Runs a number of cycles, recording each instruction.
+    ## @details Instructions run in traced blocks, recording themselves; blocks not fitting before the end of the
+    ## @details trace buffer or the run are run an instruction at a time, as are delay slots.
+    def run_traced(self, max_cycles):
+        blocks = self.blocks
+        steps = self.steps
+        trace = self.trace
+        pc = self.pc
+        delayed = self.delayed
+        remaining = max_cycles
+        while remaining:
+            # Up to the end of the buffer, then around from its start.
+            start = trace.head
+            end = min(trace.capacity, start + remaining)
+            slot = start
+            while slot < end:
+                if delayed is not None:
+                    # The delay slot runs alone, a taken jump on it is followed instead.
+                    step, _ = steps[pc] or self.compile_block(pc, 1)
+                    pc = step(slot)
+                    slot += 1
+                    pc, delayed = ~pc if pc < 0 else delayed, None
+                    continue
+
+                block, length = blocks[pc] or self.compile_block(pc)
+                if slot + length > end:
+                    block, length = steps[pc] or self.compile_block(pc, 1)
+                next = block(slot)
+                if next < 0:
+                    next, delayed = (pc + length) & address_mask, ~next
+                pc = next
+                slot += length
+            trace.advance(end - start)
+            remaining -= end - start
+        self.pc = pc
+        self.delayed = delayed
+        self.cycles += max_cycles
+        return max_cycles
+
+    ## @brief Rebuilds the state at a cycle, without changing the simulator.
+    ## @param cycle A cycle, from 0 up to the current one.
+    ## @return A Checkpoint of the state.
+    def state_at(self, cycle):
+        if not 0 <= cycle <= self.cycles:
+            raise ValueError('Cycle {} is not between 0 and the current cycle, {}.'.format(cycle, self.cycles))
+
+        checkpoint = next(c for c in reversed(self.checkpoints) if c.cycle <= cycle)
+        replay = Simulator(self.words, delay_slots=self.delay_slots)
+        replay.registers[:] = checkpoint.registers
+        replay.memory[:] = checkpoint.memory
+        replay.pc = checkpoint.pc
+        replay.delayed = checkpoint.delayed
+        replay.run(cycle - checkpoint.cycle)
+        return Checkpoint(cycle, replay.pc, array.array(word_typecode, replay.registers), array.array(word_typecode, replay.memory), False, replay.delayed)
+
+    ## @brief Steps backwards.
+    ## @details Undoes the traced instructions while the trace reaches, and replays from a checkpoint past it.
+    ## @details The trace and checkpoints after the new cycle are dropped.
+    ## @param count The number of cycles to go back.
+    def step_back(self, count=1):
+        self.seek(self.cycles - count)
+
+    ## @brief Moves to a cycle, running forwards or stepping backwards.
+    ## @param cycle The cycle, from 0.
+    def seek(self, cycle):
+        if cycle >= self.cycles:
+            self.run(cycle - self.cycles)
+            return
+        if cycle < 0:
+            raise ValueError('Cycle {} is before the start of the program.'.format(cycle))
+
+        self.checkpoints = [c for c in self.checkpoints if c.cycle <= cycle]
+        trace = self.trace
+        if trace.count and trace[0].cycle <= cycle:
+            # Undo the records, newest first.
+            while self.cycles > cycle:
+                record = trace.pop()
+                if record.register != no_register:
+                    self.registers[record.register] = record.old
+                elif record.opcode == store_opcode:
+                    self.memory[record.address] = record.old
+                self.pc = record.pc
+                self.cycles = record.cycle
+            if self.delay_slots:
+                # Records don't tell whether the instruction reached is a delay slot, the replay does.
+                self.delayed = self.state_at(cycle).delayed
+            return
+
+        state = self.state_at(cycle)
+        self.registers[:] = state.registers
+        self.memory[:] = state.memory
+        self.pc = state.pc
+        self.delayed = state.delayed
+        self.cycles = cycle
+        trace.clear(cycle)
+
+## @brief Command line entry point.
+## @details Prints a saved trace, one instruction per line.
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('trace', help='The trace, as saved by Simulator.py --trace.', type=str)
+    parser.add_argument('--last', help='Print only the last records.', type=int)
+    parser.add_argument('--register', help='Print only the records writing a register, by number or name, as hex0.', type=str)
+    args = parser.parse_args()
+
+    try:
+        words, records = load_trace(args.trace)
+    except (OSError, ValueError, struct.error) as error:
+        sys.stderr.write('Could not read the trace.\n{}\n'.format(error))
+        exit(-1)
+
+    if args.register is not None:
+        register = register_aliases[args.register] if args.register in register_aliases else int(args.register.lstrip('$'))
+        records = [record for record in records if record.register == register]
+    if args.last is not None:
+        records = records[-args.last:]
+    for record in records:
+        effect = ''
+        if record.register != no_register:
+            effect = '${} 0x{:08X} -> 0x{:08X}'.format(record.register, record.old, record.new)
+        elif record.address != no_address:
+            effect = 'M[{}] 0x{:08X} -> 0x{:08X}'.format(record.address, record.old, record.new)
+        if record.address != no_address and record.register != no_register:
+            effect += '  M[{}]'.format(record.address)
+        print('{:>10}  {:>3}  {:<24} {}'.format(record.cycle, record.pc, disassemble(words[record.pc]), effect).rstrip())
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,45 @@
 ## @file
 ## @brief Small utilities for the assembler.
 
+import bisect
+
+## @brief Raised when a program fails to assemble.
+## @details The message is already formatted for display, as written by format_error.
+## @details Every error found is also listed as a dictionary of {"type", "lineno", "column", "line"}.
+class AssemblerError(Exception):
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        ## @brief The structured errors, in the order they are listed on the message.
+        self.errors = errors or []
+
+## @brief Index of the line starts of a source.
+## @details Built once per source, so each line or column lookup is a binary search instead of a scan.
+class LineIndex:
+    def __init__(self, data):
+        ## @brief The indexed source.
+        self.data = data
+        ## @brief The position of the first character of each line.
+        self.starts = [0]
+
+        position = data.find('\n')
+        while position != -1:
+            self.starts.append(position + 1)
+            position = data.find('\n', position + 1)
+
+    ## @brief Returns the text of a line, without the line break.
+    ## @param lineno The line number, starting at 1.
+    def line(self, lineno):
+        start = self.starts[lineno - 1]
+        end = self.starts[lineno] - 1 if lineno < len(self.starts) else len(self.data)
+        return self.data[start:end]
+
+    ## @brief Finds the line and column of a position.
+    ## @param position The position on the source.
+    ## @return A tuple of the line number and column, both starting at 1.
+    def locate(self, position):
+        lineno = bisect.bisect_right(self.starts, position)
+        return lineno, position - self.starts[lineno - 1] + 1
+
 ## @brief Formats an error string.
 ## @details Adds padding to the error description.
 def format_error(title, description):
@@ -13,9 +52,35 @@ def format_column_marker(line, column, prefix=''):
     return '{}{}\n{}^'.format(prefix, line, padding)
 
 ## @brief Finds a token's line column based on a global position.
+## @details Uses the line index of the token's lexer.
 def find_column(token):
-    line_start = token.lexer.lexdata.rfind('\n', 0, token.lexpos) + 1
-    return (token.lexpos - line_start) + 1
+    return token.lexer.line_index.locate(token.lexpos)[1]
+
+## @brief Formats the errors of a log into a single error message.
+## @param line_index The line index of the source, used to show the line of each error.
+## @param title The message title, formatted with an 's' when there are many errors.
+## @param log The error log, a list of dicts with the lineno and column of each error.
+## @return The formatted error message.
+def format_error_log(line_index, title, log):
+    title = title.format('' if len(log) == 1 else 's')
+
+    # List to hold all error messages.
+    description = []
+    for error in log:
+        # Create error message.
+        error_pointer = 'line {}> '.format(error['lineno'])
+        message = format_column_marker(line_index.line(error['lineno']), error['column'], error_pointer)
+        description.append(message)
+
+    return format_error(title, '\n'.join(description))
+
+## @brief Lists the errors of a log as structured errors.
+## @param line_index The line index of the source.
+## @param type The error type, the message title without plurals.
+## @param log The error log, a list of dicts with the lineno and column of each error.
+## @return A list of {"type", "lineno", "column", "line"} dictionaries.
+def structure_error_log(line_index, type, log):
+    return [{'type': type, 'lineno': error['lineno'], 'column': error['column'], 'line': line_index.line(error['lineno'])} for error in log]
 
 ## @briefc Converts an int to a binary stream of fixed length with trailing zeroes to the left.
 def to_fixed_length_bin(num, length):
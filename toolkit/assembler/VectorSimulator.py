@@ -0,0 +1,445 @@
+## @file
+## @brief quanta vectorized simulator.
+## @details Runs many quanta processors at once, each one a lane, with the register files and data memories of every
+## @details lane held in NumPy arrays. Lanes run the same program with different inputs, as when grading a program
+## @details against many switch values, or different programs on the same input.
+## @details Lanes are grouped by the instruction they're at, and each group executes its instruction with vectorized
+## @details operations over its lanes. Lanes of different programs share a group while their programs have the same
+## @details word at the same address. Lanes diverging on a branch split into two groups, and lanes reaching the same
+## @details instruction merge back. The group at the lowest address runs first, so lanes skipping a loop wait at its
+## @details exit for the lanes still looping. Lanes reaching a halt loop, as the end: j end idiom, stop running and only
+## @details their program counter keeps moving.
+## @details Results and cycle counts are the same as running a Simulator on each lane, with the same delay_slots.
+## @details By default lanes follow the architectural model; with delay_slots, the instruction after each taken jump,
+## @details branch and call runs as a delay slot and call links the address past it, as on the hardware and Pipeline.
+
+import argparse
+import sys
+
+import numpy
+
+from Assembler import instruction_aliases, register_aliases, memory_depth
+from Simulator import control_instructions, decode, load_program, register_count, read_only_registers, non_writing_instructions, word_mask, sign_bit, address_mask
+from Util import AssemblerError
+
+## @brief Instruction aliases, by their kind number on the decoded programs. Unknown opcodes run as noop.
+kinds = ('noop', 'li', 'move', 'load', 'store', 'add', 'sub', 'and', 'or', 'xor', 'xnor', 'not', 'sl', 'sr', 'asr', 'rl',
+         'j', 'je', 'jne', 'jl', 'jg', 'call')
+
+## @brief Kind number of each opcode.
+opcode_kinds = [0] * 256
+for kind, alias in enumerate(kinds):
+    opcode_kinds[instruction_aliases[alias].opcode] = kind
+
+## @brief The number of instructions a halt loop may have.
+max_halt_length = 4
+
+## @brief Builds the vectorized instruction handlers for the register files and data memories of the lanes.
+## @details Every handler takes the lanes at the same instruction, as an array or as a slice of every lane, its decoded
+## @details (a, b, c, immediate) and the address of the following instruction.
+## @details Handlers return the address of the next instruction, as a number or as an array with one per lane.
+## @details With delay slots, taken jumps return the bitwise inverse of their target, as on Simulator.
+## @param registers The register files, register r of lane l at [r, l].
+## @param memory The data memories, address m of lane l at [m, l].
+## @param delay_slots Whether jumps are followed by a delay slot: call links the address past it.
+## @return A list of handlers, by kind number.
+def build_handlers(registers, memory, delay_slots=False):
+    # Lane numbers, so memories are indexed by lane also when lanes are given as a slice.
+    numbers = numpy.arange(registers.shape[1])
+
+    def noop(lane, a, b, c, immediate, next):
+        return next
+
+    def li(lane, a, b, c, immediate, next):
+        registers[a][lane] = immediate
+        return next
+
+    def move(lane, a, b, c, immediate, next):
+        registers[a][lane] = registers[b][lane]
+        return next
+
+    def load(lane, a, b, c, immediate, next):
+        registers[a][lane] = memory[registers[b][lane] & address_mask, numbers[lane]]
+        return next
+
+    def store(lane, a, b, c, immediate, next):
+        memory[registers[b][lane] & address_mask, numbers[lane]] = registers[a][lane]
+        return next
+
+    # Arithmetic wraps around on the 32 bit register arrays.
+    def operation(function):
+        def handler(lane, a, b, c, immediate, next):
+            registers[a][lane] = function(registers[a][lane], registers[b][lane])
+            return next
+        return handler
+
+    def unary(function):
+        def handler(lane, a, b, c, immediate, next):
+            registers[a][lane] = function(registers[a][lane])
+            return next
+        return handler
+
+    # Targets are signed before inverting, to tell taken jumps by their sign.
+    def taken(target):
+        return ~target.astype(numpy.int64) if delay_slots else target
+
+    def j(lane, a, b, c, immediate, next):
+        return taken(registers[c][lane] & address_mask)
+
+    # Branches compare by subtracting b from a, as the ALU does.
+    def branch(condition):
+        def handler(lane, a, b, c, immediate, next):
+            jumps = condition(registers[a][lane], registers[b][lane])
+            return numpy.where(jumps, taken(registers[c][lane] & address_mask), next)
+        return handler
+
+    def call(lane, a, b, c, immediate, next):
+        # The target is read before the return address is written, a and c may be the same register.
+        target = registers[c][lane] & address_mask
+        registers[a][lane] = (next + 1) & address_mask if delay_slots else next
+        return taken(target)
+
+    handlers = {
+        'noop': noop, 'li': li, 'move': move, 'load': load, 'store': store,
+        'add': operation(lambda a, b: a + b),
+        'sub': operation(lambda a, b: a - b),
+        'and': operation(lambda a, b: a & b),
+        'or': operation(lambda a, b: a | b),
+        'xor': operation(lambda a, b: a ^ b),
+        'xnor': operation(lambda a, b: ~(a ^ b)),
+        'not': unary(lambda a: ~a),
+        'sl': unary(lambda a: a << 1),
+        'sr': unary(lambda a: a >> 1),
+        'asr': unary(lambda a: (a >> 1) | (a & sign_bit)),
+        'rl': unary(lambda a: (a << 1) | (a >> 31)),
+        'j': j,
+        'je': branch(lambda a, b: a == b),
+        'jne': branch(lambda a, b: a != b),
+        'jl': branch(lambda a, b: (a - b) & sign_bit != 0),
+        'jg': branch(lambda a, b: (a - b) & sign_bit == 0),
+        'call': call
+    }
+    return [handlers[alias] for alias in kinds]
+
+## @brief Decodes an instruction word for the vectorized simulator.
+## @param word The instruction word.
+## @return A tuple of (kind, a, b, c, immediate).
+def decode_instruction(word):
+    opcode, a, b, c, immediate = decode(word)
+    alias = kinds[opcode_kinds[opcode]]
+    # Writes to read only registers are dropped when decoding, as the simulator does.
+    if a in read_only_registers and alias not in non_writing_instructions:
+        alias = 'j' if alias == 'call' else 'noop'
+    return kinds.index(alias), a, b, c, immediate
+
+## @brief Finds whether an address starts a halt loop.
+## @details A halt loop loads at most one register with li, and jumps back to its start through it or $zero, as
+## @details end: j end does. Once the register holds its value, running the loop changes nothing but the program counter.
+## @details With delay slots, the instruction after the jump runs on every loop and must be a noop.
+## @param words The instruction words of the program, one per address.
+## @param entry The address.
+## @param delay_slots Whether jumps are followed by a delay slot.
+## @return The (register, value, length) of the loop, halted once the register holds the value, or None.
+def halt_loop(words, entry, delay_slots=False):
+    constants = {0: 0}
+    loaded = 0
+    address = entry
+    for length in range(1, max_halt_length + 1):
+        kind, a, b, c, immediate = decode_instruction(words[address])
+        alias = kinds[kind]
+        if alias == 'li' and loaded in (0, a):
+            constants[a] = immediate
+            loaded = a
+        elif alias == 'j':
+            if c not in constants or constants[c] & address_mask != entry:
+                return None
+            if not delay_slots:
+                return loaded, constants[loaded], length
+            slot = decode_instruction(words[(address + 1) & address_mask])
+            return (loaded, constants[loaded], length + 1) if kinds[slot[0]] == 'noop' else None
+        elif alias != 'noop':
+            return None
+        address = (address + 1) & address_mask
+    return None
+
+## @brief Simulates many quanta processors.
+## @details Lanes are numbered from 0. registers[r, l] is register r of lane l, and memory[m, l] address m of lane l.
+class VectorSimulator:
+    ## @param programs The instruction words of each lane, or a single program for every lane.
+    ## @param switches The value on the switches input of each lane, or a single value for every lane.
+    ## @param delay_slots Whether to run the instruction after each taken jump, branch and call, as the hardware does.
+    ## @details The number of lanes is the number of programs or of switch values, the single one is shared.
+    def __init__(self, programs, switches=0, delay_slots=False):
+        programs = [programs] if programs and isinstance(programs[0], int) else list(programs)
+        switches = [switches] if isinstance(switches, int) else list(switches)
+        lanes = max(len(programs), len(switches))
+        if len(programs) not in (1, lanes) or len(switches) not in (1, lanes):
+            raise ValueError('Got {} programs and {} switch values, expected one or the same number of each.'.format(len(programs), len(switches)))
+
+        ## @brief The number of lanes.
+        self.lanes = lanes
+        ## @brief Whether the instruction after each taken jump, branch and call runs as a delay slot.
+        self.delay_slots = delay_slots
+        ## @brief The register files.
+        self.registers = numpy.zeros((register_count, lanes), dtype=numpy.uint32)
+        ## @brief The data memories.
+        self.memory = numpy.zeros((memory_depth, lanes), dtype=numpy.uint32)
+        ## @brief The handlers, by kind number.
+        self.handlers = build_handlers(self.registers, self.memory, delay_slots)
+        ## @brief Kind numbers of the instructions followed by a delay slot.
+        self.control_kinds = {kinds.index(alias) for alias in control_instructions}
+
+        self.load(programs if len(programs) == lanes else programs * lanes)
+        self.switches = switches if len(switches) == lanes else switches * lanes
+
+    ## @brief Loads the programs of each lane and resets the processors.
+    ## @param programs The instruction words of each lane, missing addresses are set to noop.
+    def load(self, programs):
+        if len(programs) != self.lanes:
+            raise ValueError('Got {} programs for {} lanes.'.format(len(programs), self.lanes))
+
+        # Lanes running the same program share its words.
+        indices = {}
+        lane_programs = [indices.setdefault(tuple(program), len(indices)) for program in programs]
+        words = []
+        for program in indices:
+            if len(program) > memory_depth:
+                raise ValueError('The program has {} words, the instruction memory holds {}.'.format(len(program), memory_depth))
+            words += list(program) + [0] * (memory_depth - len(program))
+
+        ## @brief The instruction words of every program, address m of program p at p * memory_depth + m.
+        self.words = numpy.array(words, dtype=numpy.int64)
+        ## @brief The index of the program of each lane on the words, the program times memory_depth.
+        self.bases = numpy.array(lane_programs, dtype=numpy.int64) * memory_depth
+        ## @brief The decoded (kind, a, b, c, immediate) of each instruction word.
+        self.decoded = {word: decode_instruction(word) for word in set(words)}
+
+        ## @brief The halt loop register, value and length starting at each program address, register -1 for none.
+        self.halt_register = numpy.full(len(words), -1, dtype=numpy.int64)
+        self.halt_value = numpy.zeros(len(words), dtype=numpy.int64)
+        self.halt_length = numpy.zeros(len(words), dtype=numpy.int64)
+        ## @brief The instruction keys starting a halt loop on some program.
+        self.halt_keys = set()
+        for base in range(0, len(words), memory_depth):
+            for entry in range(memory_depth):
+                halt = halt_loop(words[base:base + memory_depth], entry, self.delay_slots)
+                if halt is not None:
+                    self.halt_register[base + entry], self.halt_value[base + entry], self.halt_length[base + entry] = halt
+                    self.halt_keys.add(entry << 32 | words[base + entry])
+        self.reset()
+
+    ## @brief Clears the registers, the data memories and the program counters.
+    ## @details The switches keep their values.
+    def reset(self):
+        switches = self.registers[register_aliases['switches']].copy()
+        self.registers[:] = 0
+        self.registers[register_aliases['switches']] = switches
+        self.memory[:] = 0
+
+        ## @brief The number of cycles executed since the last reset, the same on every lane.
+        self.cycles = 0
+        ## @brief The address of the next instruction of each lane, for halted lanes the start of their halt loop.
+        self.lane_pc = numpy.zeros(self.lanes, dtype=numpy.int64)
+        ## @brief The length of the halt loop of each lane and the cycle it halted on, 0 for running lanes.
+        self.lane_halt_length = numpy.zeros(self.lanes, dtype=numpy.int64)
+        self.lane_halt_cycle = numpy.zeros(self.lanes, dtype=numpy.int64)
+        ## @brief The target of the taken jump whose delay slot each lane is at, -1 for none.
+        self.lane_delayed = numpy.full(self.lanes, -1, dtype=numpy.int64)
+
+    ## @brief The instruction keys of lanes at addresses.
+    ## @details Lanes at the same address of programs with the same word there share a key, and run together.
+    ## @details Keys order by address.
+    ## @param lanes The lanes.
+    ## @param addresses The address of each lane.
+    ## @return The address << 32 | word of each lane.
+    def instruction_keys(self, lanes, addresses):
+        addresses = numpy.asarray(addresses, dtype=numpy.int64)
+        return addresses << 32 | self.words[self.bases[lanes] + addresses]
+
+    ## @brief Groups the running lanes by instruction.
+    ## @return A map of instruction keys to [lanes, executed cycles of each lane, most executed cycles].
+    def group_lanes(self):
+        groups = {}
+        running = numpy.flatnonzero(self.lane_halt_length == 0)
+        self.split(groups, self.instruction_keys(running, self.lane_pc[running]), running, numpy.zeros(len(running), dtype=numpy.int64))
+        return groups
+
+    ## @brief Moves lanes to their next instructions.
+    ## @param groups The lane groups, as group_lanes.
+    ## @param keys The instruction key of each lane.
+    ## @param lanes The lanes.
+    ## @param executed The executed cycles of each lane.
+    def split(self, groups, keys, lanes, executed):
+        if not len(keys):
+            return
+        if keys.min() == keys.max():
+            self.arrive(groups, int(keys[0]), lanes, executed, int(executed.max()))
+            return
+
+        # Stable, so lanes stay in order on each group.
+        order = numpy.argsort(keys, kind='stable')
+        keys, lanes, executed = keys[order], lanes[order], executed[order]
+        starts = list(numpy.flatnonzero(numpy.diff(keys, prepend=-1)))
+        for start, end in zip(starts, starts[1:] + [len(keys)]):
+            self.arrive(groups, int(keys[start]), lanes[start:end], executed[start:end], int(executed[start:end].max()))
+
+    ## @brief Moves lanes to an instruction, merging them with the lanes already there.
+    ## @details Lanes arriving at a halt loop holding its register value halt, unless the loop is their delay slot.
+    ## @param groups The lane groups, as group_lanes.
+    ## @param key The instruction key.
+    ## @param lanes The lanes.
+    ## @param executed The executed cycles of each lane.
+    ## @param most The most executed cycles of the lanes.
+    def arrive(self, groups, key, lanes, executed, most):
+        if key in self.halt_keys:
+            address = key >> 32
+            index = self.bases[lanes] + address
+            register = self.halt_register[index]
+            halted = (register >= 0) & (self.lane_delayed[lanes] < 0) & (self.registers.reshape(-1)[numpy.maximum(register, 0) * self.lanes + lanes] == self.halt_value[index])
+            if halted.any():
+                self.lane_pc[lanes[halted]] = address
+                self.lane_halt_length[lanes[halted]] = self.halt_length[index[halted]]
+                self.lane_halt_cycle[lanes[halted]] = self.cycles + executed[halted]
+                lanes, executed = lanes[~halted], executed[~halted]
+                if not len(lanes):
+                    return
+
+        group = groups.get(key)
+        if group is not None:
+            lanes = numpy.concatenate((group[0], lanes))
+            executed = numpy.concatenate((group[1], executed))
+            most = max(group[2], most)
+            # Groups of every lane are kept in lane order, to access registers as whole rows.
+            if len(lanes) == self.lanes:
+                order = numpy.argsort(lanes)
+                lanes, executed = lanes[order], executed[order]
+        groups[key] = [lanes, executed, most]
+
+    ## @brief Runs every lane.
+    ## @param max_cycles The number of instructions to execute on each lane.
+    ## @return The number of cycles executed.
+    def run(self, max_cycles):
+        handlers = self.handlers
+        decoded = self.decoded
+        groups = self.group_lanes()
+        every = slice(None)
+        # With a single program, the next key of lanes all going to the same address is found without indexing by lane.
+        single = len(self.words) == memory_depth
+        while groups and max_cycles:
+            key = min(groups)
+            lanes, executed, most = groups.pop(key)
+            address = key >> 32
+            kind, a, b, c, immediate = decoded[key & word_mask]
+            targets = handlers[kind](every if len(lanes) == self.lanes else lanes, a, b, c, immediate, (address + 1) & address_mask)
+            if self.delay_slots:
+                targets = self.follow_delay_slots(lanes, kind, targets, address)
+            executed += 1
+            most += 1
+
+            # Lanes done with the cycles of this run stop at their next instruction.
+            if most == max_cycles:
+                done = executed == max_cycles
+                self.lane_pc[lanes[done]] = targets if numpy.ndim(targets) == 0 else targets[done]
+                if done.all():
+                    continue
+                lanes, executed = lanes[~done], executed[~done]
+                targets = targets if numpy.ndim(targets) == 0 else targets[~done]
+                most = int(executed.max())
+
+            if single and numpy.ndim(targets) == 0:
+                target = int(targets)
+                self.arrive(groups, target << 32 | int(self.words[target]), lanes, executed, most)
+            else:
+                self.split(groups, self.instruction_keys(lanes, targets), lanes, executed)
+
+        self.cycles += max_cycles
+        return max_cycles
+
+    ## @brief Moves lanes in and out of delay slots.
+    ## @details A taken jump runs the following instruction first. A taken jump on a delay slot is followed at once.
+    ## @param lanes The lanes, having just run their instruction.
+    ## @param kind The kind number of the instruction.
+    ## @param targets The addresses returned by its handler, inverted for taken jumps.
+    ## @param address The address of the instruction.
+    ## @return The address of the next instruction of each lane.
+    def follow_delay_slots(self, lanes, kind, targets, address):
+        delayed = self.lane_delayed[lanes]
+        slots = delayed >= 0
+        if kind not in self.control_kinds:
+            if not slots.any():
+                return targets
+            self.lane_delayed[lanes] = -1
+            return numpy.where(slots, delayed, targets)
+
+        targets = numpy.broadcast_to(targets, lanes.shape)
+        taken = targets < 0
+        self.lane_delayed[lanes] = numpy.where(taken & ~slots, ~targets, -1)
+        return numpy.where(taken, numpy.where(slots, ~targets, (address + 1) & address_mask), numpy.where(slots, delayed, targets))
+
+    ## @brief Executes a single instruction on every lane.
+    def step(self):
+        return self.run(1)
+
+    ## @brief The address of the next instruction of each lane.
+    @property
+    def pc(self):
+        # Halted lanes go around their halt loop.
+        return (self.lane_pc + (self.cycles - self.lane_halt_cycle) % numpy.maximum(self.lane_halt_length, 1) * (self.lane_halt_length > 0)) & address_mask
+
+    ## @brief Whether each lane reached a halt loop.
+    @property
+    def halted(self):
+        return self.lane_halt_length > 0
+
+    ## @brief The value on the switches input of each lane.
+    @property
+    def switches(self):
+        return self.registers[register_aliases['switches']]
+
+    @switches.setter
+    def switches(self, values):
+        self.registers[register_aliases['switches']] = numpy.asarray(values, dtype=numpy.int64) & word_mask
+
+    ## @brief The value on the leds output of each lane.
+    @property
+    def leds(self):
+        return self.registers[register_aliases['leds']]
+
+    ## @brief The values on the hex display outputs of each lane, as rows.
+    @property
+    def hex(self):
+        return self.registers[[register_aliases[name] for name in ('hex0', 'hex1', 'hex2')]]
+
+## @brief Command line entry point.
+## @details Runs programs on every given switch value for a number of cycles and prints the outputs of each lane.
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('programs', help='The programs to run: quanta source, MIF or raw binary images.', type=str, nargs='+')
+    parser.add_argument('-n', '--cycles', help='The number of cycles to run.', type=int, default=1000)
+    parser.add_argument('--switches', help='The values on the switches input, each program runs on each value.', type=lambda value: int(value, 0), nargs='+', default=[0])
+    parser.add_argument('--delay-slots', help='Run the instruction after each taken jump, branch and call, as the hardware does.', action='store_true')
+    args = parser.parse_args()
+
+    try:
+        programs = [load_program(path) for path in args.programs]
+    except AssemblerError as error:
+        sys.stderr.write(str(error))
+        exit(-1)
+    except (OSError, ValueError) as error:
+        sys.stderr.write('Could not read the program.\n{}\n'.format(error))
+        exit(-1)
+
+    # A lane for each program and switch value pair.
+    lanes = [(path, program, switches) for path, program in zip(args.programs, programs) for switches in args.switches]
+    simulator = VectorSimulator([program for _, program, _ in lanes], [switches for _, _, switches in lanes], args.delay_slots)
+    simulator.run(args.cycles)
+
+    print('cycles: {}'.format(simulator.cycles))
+    row = '{:<%d} {:>10}  {:<7} {:>4}  {:<10}  {}' % max(len('program'), *(len(path) for path in args.programs))
+    print(row.format('program', 'switches', 'halted', 'pc', 'leds', 'hex'))
+    for lane, (path, _, switches) in enumerate(lanes):
+        print(row.format(path, '0x{:08X}'.format(switches), 'yes' if simulator.halted[lane] else 'no', simulator.pc[lane],
+                         '0x{:08X}'.format(simulator.leds[lane]), ' '.join('0x{:08X}'.format(value) for value in simulator.hex[:, lane])))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+## @file
+## @brief Assembler benchmark suite.
+## @details Assembles synthetic programs of several sizes and reports the end to end and per phase throughput and peak memory.
+## @details Phases are timed with Profiler: lexing, parsing, assembling (encode and label resolution) and MIF formatting.
+## @details Results are saved as JSON, and can be compared with the results of another commit.
+## @details Usage: python assembler_suite.py [--sizes N ...] [-o results.json] [--compare baseline.json]
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+## @brief Path to the assembler modules.
+ASSEMBLER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../assembler/')
+sys.path.insert(1, ASSEMBLER_PATH)
+
+from Assembler import assemble_program, memory_depth
+from MIF import MIF
+from Parser import build_parser
+from Profiler import Profiler
+
+from program_generator import generate_program, default_mix
+
+## @brief Profiler phases reported as each stage.
+stages = {
+    'lexer': ('lex',),
+    'parser': ('parse',),
+    'assemble': ('encode', 'resolve'),
+    'mif': ('format',)
+}
+
+## @brief Formats a program, as the assembler does.
+## @details Programs larger than the instruction memory are formatted whole, the assembler would reject them.
+def format_mif(words):
+    return MIF(32, max(memory_depth, len(words)), 'BIN', 'BIN', words).as_file()
+
+## @brief Assembles and formats a program once.
+## @param profiler The profiler recording the phases.
+## @return The number of words and MIF bytes.
+def run_once(program, profiler):
+    words = assemble_program(program, profiler=profiler, depth=None).words
+    with profiler.phase('format') as phase:
+        mif = format_mif(words)
+        phase.counts['bytes'] = len(mif)
+    return len(words), len(mif)
+
+## @brief Benchmarks a program.
+## @param program The program source.
+## @param repeat The number of runs, the fastest one is reported.
+## @return A dictionary of the program sizes, the end to end and per stage results.
+def benchmark(program, repeat):
+    lines = program.count('\n')
+
+    # End to end, without profiling.
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        words = assemble_program(program, depth=None).words
+        mif = format_mif(words)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    # Per phase times, the fastest run of each phase.
+    seconds = {}
+    for _ in range(repeat):
+        profiler = Profiler(memory=False)
+        run_once(program, profiler)
+        for record in profiler.phases:
+            seconds[record['phase']] = min(seconds.get(record['phase'], record['seconds']), record['seconds'])
+
+    # Peak memory, on a separate run as tracing slows phases down.
+    profiler = Profiler()
+    run_once(program, profiler)
+    peak_memory = {}
+    tokens = 0
+    for record in profiler.phases:
+        if record['peak_memory'] is not None:
+            peak_memory[record['phase']] = max(peak_memory.get(record['phase'], 0), record['peak_memory'])
+        tokens = record.get('tokens', tokens)
+
+    sizes = {'lines': lines, 'tokens': tokens, 'words': len(words), 'bytes': len(mif)}
+    result = dict(sizes)
+    result['end_to_end'] = throughput(best, sizes)
+    result['end_to_end']['peak_memory'] = max(peak_memory.values())
+    result['stages'] = {}
+    for stage, phases in stages.items():
+        result['stages'][stage] = throughput(sum(seconds[phase] for phase in phases), sizes)
+        # Lexing is interleaved with parsing, its memory is counted on the parser.
+        result['stages'][stage]['peak_memory'] = max((peak_memory[phase] for phase in phases if phase in peak_memory), default=None)
+    return result
+
+## @brief Builds the throughput of a stage.
+## @param seconds The time taken.
+## @param sizes The lines, tokens, words and bytes processed.
+## @return A dictionary of the time and of each size per second.
+def throughput(seconds, sizes):
+    result = {'seconds': seconds}
+    for name, size in sizes.items():
+        result[name + '_per_second'] = size / seconds if seconds else None
+    return result
+
+## @brief The current commit, or None outside of a git repository.
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+## @brief Prints the results, compared to a baseline when given.
+def print_results(results, baseline=None):
+    baselines = {}
+    if baseline is not None:
+        baselines = {result['lines']: result for result in baseline['results']}
+        print('compared to {} ({})'.format(baseline.get('commit'), baseline.get('date')))
+
+    row = '{:>7}  {:<10} {:>10} {:>12} {:>12} {:>10} {:>12}  {}'
+    print(row.format('lines', 'stage', 'time (ms)', 'lines/s', 'words/s', 'MIF MB/s', 'peak (KiB)', 'change'))
+    for result in results:
+        entries = [('end to end', result['end_to_end'])] + list(result['stages'].items())
+        for name, entry in entries:
+            change = ''
+            old = baselines.get(result['lines'])
+            if old is not None:
+                old_entry = old['end_to_end'] if name == 'end to end' else old['stages'].get(name)
+                if old_entry is not None and entry['seconds']:
+                    change = '{:+.1f}% time'.format((entry['seconds'] / old_entry['seconds'] - 1) * 100)
+            peak = '-' if entry['peak_memory'] is None else '{:.1f}'.format(entry['peak_memory'] / 1024)
+            print(row.format(result['lines'], name, '{:.3f}'.format(entry['seconds'] * 1e3), '{:.0f}'.format(entry['lines_per_second']),
+                             '{:.0f}'.format(entry['words_per_second']), '{:.2f}'.format(entry['bytes_per_second'] / 1e6), peak, change))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', help='The number of lines of each program.', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('-r', '--repeat', help='The number of runs of each program, the fastest is reported.', type=int, default=5)
+    parser.add_argument('--seed', help='The random seed of the programs.', type=int, default=0)
+    parser.add_argument('-o', '--output', help='The path to save the results, as JSON.', type=str)
+    parser.add_argument('--compare', help='The path to results to compare with, as saved by --output.', type=str)
+    args = parser.parse_args()
+
+    # Table setup happens once per process, it's not part of the throughput.
+    build_parser()
+
+    results = []
+    for size in args.sizes:
+        results.append(benchmark(generate_program(size, default_mix, args.seed), args.repeat))
+
+    baseline = None
+    if args.compare is not None:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)
+    print_results(results, baseline)
+
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump({
+                'commit': current_commit(),
+                'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'seed': args.seed,
+                'repeat': args.repeat,
+                'results': results
+            }, file, indent=4)
+
+if __name__ == '__main__':
+    main()
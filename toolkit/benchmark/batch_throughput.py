@@ -0,0 +1,56 @@
+## @file
+## @brief Batch assembler throughput benchmark.
+## @details Assembles copies of a program with the batch assembler, for a growing number of workers.
+## @details Compares with spawning one assembler process per file.
+## @details Usage: python batch_throughput.py [-n FILES] [-s SPAWNED] [program.qtf]
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+## @brief Path to the assembler modules.
+ASSEMBLER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../assembler/')
+sys.path.insert(1, ASSEMBLER_PATH)
+
+from BatchAssembler import assemble_files
+
+## @brief Program used when none is given.
+DEFAULT_PROGRAM = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../doc/examples/CALL.qtf')
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('program', help='The program to copy.', type=str, nargs='?', default=DEFAULT_PROGRAM)
+    parser.add_argument('-n', help='The number of files to assemble.', type=int, default=2000)
+    parser.add_argument('-s', help='The number of files to assemble spawning one process each.', type=int, default=50)
+    args = parser.parse_args()
+
+    with open(args.program, 'r') as file:
+        program = file.read()
+
+    with tempfile.TemporaryDirectory() as directory:
+        jobs = []
+        for index in range(args.n):
+            path = os.path.join(directory, '{}.qtf'.format(index))
+            with open(path, 'w') as file:
+                file.write(program)
+            jobs.append((path, os.path.join(directory, '{}.mif'.format(index)), 'mif', 'BIN', 'BIN', 'little'))
+
+        start = time.perf_counter()
+        for path, output, *_ in jobs[:args.s]:
+            subprocess.run([sys.executable, os.path.join(ASSEMBLER_PATH, 'Assembler.py'), path, output], capture_output=True, check=True)
+        print('process per file: {:10.1f} files/s'.format(args.s / (time.perf_counter() - start)))
+
+        workers = 1
+        while workers <= (os.cpu_count() or 1):
+            start = time.perf_counter()
+            results = list(assemble_files(jobs, workers))
+            elapsed = time.perf_counter() - start
+            assert not any(result['error'] for result in results)
+            print('{:3} workers:      {:10.1f} files/s'.format(workers, len(jobs) / elapsed))
+            workers *= 2
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+## @file
+## @brief Scripted IO benchmark.
+## @details Runs programs along a stimulus timeline changing the switches every --period cycles, on the peripherals model,
+## @details skipping idle polling loops and running every cycle, and reports the wall time of each.
+## @details Usage: python io_stimulus.py [-n CYCLES] [--period CYCLES] [program.qtf ...]
+
+import argparse
+import os
+import sys
+import time
+
+## @brief Path to the assembler modules.
+ASSEMBLER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../assembler/')
+sys.path.insert(1, ASSEMBLER_PATH)
+
+from Assembler import assemble
+from Peripherals import PeripheralSimulator
+from Simulator import load_program
+
+## @brief Program run along the given ones: waits for the switches to change, then shows their bit count on the leds.
+POLLING_PROGRAM = '''
+li $1, 1
+wait:
+      je $switches, $5, wait
+      move $5, $switches
+      move $2, $5
+      li $4, 0
+bits:
+      move $3, $2
+      and $3, $1
+      add $4, $3
+      sr $2
+      jne $2, $zero, bits
+      move $leds, $4
+      j wait
+'''
+
+## @brief Programs used when none are given.
+DEFAULT_PROGRAMS = [os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../doc/examples/IO.qtf')]
+
+## @brief Times a run.
+## @return The seconds taken and the simulator.
+def timed_run(words, timeline, cycles, skip_idle):
+    simulator = PeripheralSimulator(words, timeline, skip_idle=skip_idle)
+    start = time.perf_counter()
+    simulator.run(cycles)
+    return time.perf_counter() - start, simulator
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('programs', help='The programs to run.', type=str, nargs='*', default=DEFAULT_PROGRAMS)
+    parser.add_argument('-n', help='The number of cycles to run each program for.', type=int, default=10000000)
+    parser.add_argument('--period', help='The number of cycles between switches changes.', type=int, default=1000000)
+    args = parser.parse_args()
+
+    timeline = [(cycle, index * 0x2A5) for index, cycle in enumerate(range(0, args.n, args.period))]
+    programs = [(os.path.basename(path), load_program(path)) for path in args.programs]
+    programs.append(('polling', assemble(POLLING_PROGRAM)))
+
+    print('{:12} {:>12} {:>12} {:>9} {:>8}'.format('program', 'skipping', 'every cycle', 'speedup', 'events'))
+    for name, words in programs:
+        skipping, fast = timed_run(words, timeline, args.n, True)
+        stepping, slow = timed_run(words, timeline, args.n, False)
+        if fast.events != slow.events or fast.registers != slow.registers:
+            sys.stderr.write('{}: results differ when skipping idle loops.\n'.format(name))
+            exit(-1)
+        print('{:12} {:>9.1f} ms {:>9.1f} ms {:>8.0f}x {:>8}'.format(name, skipping * 1e3, stepping * 1e3, stepping / skipping, len(fast.events)))
+
+if __name__ == '__main__':
+    main()
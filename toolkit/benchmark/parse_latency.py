@@ -0,0 +1,55 @@
+## @file
+## @brief Parser latency benchmark.
+## @details Measures the cold start parse (fresh interpreter, tables built on first use) and the warm per parse latency.
+## @details Usage: python parse_latency.py [-n PARSES] [program.qtf]
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+## @brief Path to the assembler modules.
+ASSEMBLER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../assembler/')
+sys.path.insert(1, ASSEMBLER_PATH)
+
+## @brief Program used when none is given.
+DEFAULT_PROGRAM = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../doc/examples/CALL.qtf')
+
+## @brief Script run on a fresh interpreter to time the first parse.
+COLD_SCRIPT = '''
+import sys, time
+start = time.perf_counter()
+sys.path.insert(1, sys.argv[1])
+from Parser import parse
+imported = time.perf_counter()
+parse(open(sys.argv[2]).read())
+parsed = time.perf_counter()
+print(imported - start, parsed - imported)
+'''
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('program', help='The program to parse.', type=str, nargs='?', default=DEFAULT_PROGRAM)
+    parser.add_argument('-n', help='The number of warm parses.', type=int, default=1000)
+    args = parser.parse_args()
+
+    output = subprocess.run([sys.executable, '-c', COLD_SCRIPT, ASSEMBLER_PATH, args.program], capture_output=True, text=True, check=True).stdout
+    import_time, first_parse = [float(value) for value in output.split()]
+
+    from Parser import parse
+    with open(args.program, 'r') as file:
+        data = file.read()
+
+    parse(data)
+    start = time.perf_counter()
+    for _ in range(args.n):
+        parse(data)
+    warm_parse = (time.perf_counter() - start) / args.n
+
+    print('import:            {:8.2f} ms'.format(import_time * 1000))
+    print('cold first parse:  {:8.2f} ms'.format(first_parse * 1000))
+    print('warm parse:        {:8.3f} ms'.format(warm_parse * 1000))
+
+if __name__ == '__main__':
+    main()
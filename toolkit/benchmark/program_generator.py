@@ -0,0 +1,132 @@
+## @file
+## @brief Synthetic program generator.
+## @details Generates valid quanta programs of any size, with a configurable mix of instructions, labels and comments.
+## @details Programs are deterministic for a given seed, so benchmark runs are comparable across commits.
+## @details Usage: python program_generator.py LINES [-o program.qtf] [--seed N] [--mix category=weight ...]
+
+import argparse
+import random
+import sys
+
+## @brief Default weight of each kind of line.
+default_mix = {
+    'immediate': 15,
+    'single': 10,
+    'double': 30,
+    'memory': 10,
+    'branch': 10,
+    'jump': 3,
+    'call': 2,
+    'noop': 2,
+    'label': 8,
+    'comment': 10
+}
+
+## @brief Instruction aliases of each kind of line.
+instructions = {
+    'single': ('not', 'sl', 'sr', 'asr', 'rl'),
+    'double': ('move', 'add', 'sub', 'and', 'or', 'xor', 'xnor'),
+    'memory': ('load', 'store'),
+    'branch': ('je', 'jne', 'jl', 'jg')
+}
+
+## @brief Register aliases used as named registers.
+named_registers = ('zero', 'leds', 'hex0', 'hex1', 'hex2', 'switches', 'ra')
+
+## @brief Parses a --mix option, as category=weight.
+def mix_entry(value):
+    category, _, weight = value.partition('=')
+    if category not in default_mix:
+        raise argparse.ArgumentTypeError('Unknown category {}, expected one of: {}.'.format(category, ', '.join(default_mix)))
+    return category, float(weight)
+
+## @brief Generates a program.
+## @param lines The number of lines.
+## @param mix The weight of each kind of line, as default_mix. Missing kinds are not generated.
+## @param seed The random seed.
+## @param named_ratio The ratio of register arguments given by name.
+## @param comment_ratio The ratio of instructions followed by a comment.
+## @return The program source.
+def generate_program(lines, mix=default_mix, seed=0, named_ratio=0.3, comment_ratio=0.1):
+    generator = random.Random(seed)
+    kinds = [kind for kind in mix if mix[kind] > 0]
+    weights = [mix[kind] for kind in kinds]
+
+    # Every label referenced is defined, as lines or at the end of the program.
+    label_count = max(1, int(lines * mix.get('label', 0) / sum(weights)))
+    defined = 0
+
+    def register():
+        if generator.random() < named_ratio:
+            return '$' + generator.choice(named_registers)
+        return '${}'.format(generator.randrange(1, 30))
+
+    def label():
+        return 'label_{}'.format(generator.randrange(label_count))
+
+    indent = ''
+    source = []
+    for kind in generator.choices(kinds, weights, k=lines):
+        if kind == 'label':
+            if defined == label_count:
+                kind = 'comment'
+            else:
+                source.append('label_{}:'.format(defined))
+                defined += 1
+                indent = '    '
+                continue
+
+        if kind == 'comment':
+            source.append(indent + '; generated comment {}'.format(generator.randrange(1 << 16)))
+            continue
+
+        if kind == 'noop':
+            line = 'noop'
+        elif kind == 'immediate':
+            line = 'li {}, {}'.format(register(), generator.randrange(1 << 16))
+        elif kind == 'single':
+            line = '{} {}'.format(generator.choice(instructions['single']), register())
+        elif kind in ('double', 'memory'):
+            line = '{} {}, {}'.format(generator.choice(instructions[kind]), register(), register())
+        elif kind == 'branch':
+            target = label() if generator.random() < 0.8 else register()
+            line = '{} {}, {}, {}'.format(generator.choice(instructions['branch']), register(), register(), target)
+        elif kind == 'jump':
+            line = 'j {}'.format(label() if generator.random() < 0.8 else register())
+        elif kind == 'call':
+            line = 'call $ra, {}'.format(label())
+
+        if generator.random() < comment_ratio:
+            line += ' ; generated'
+        source.append(indent + line)
+
+    # Labels not defined yet point to the end of the program.
+    for index in range(defined, label_count):
+        source.append('label_{}:'.format(index))
+    source.append('')
+    return '\n'.join(source)
+
+## @brief Command line entry point.
+## @details Generates a program and writes it to a file or the standard output.
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('lines', help='The number of lines to generate.', type=int)
+    parser.add_argument('-o', '--output', help='The path to save the program. Defaults to the standard output.', type=str)
+    parser.add_argument('--seed', help='The random seed.', type=int, default=0)
+    parser.add_argument('--mix', help='The weight of a kind of line, as category=weight. Kinds not given keep their default weight.', type=mix_entry, nargs='*', default=[])
+    parser.add_argument('--named-ratio', help='The ratio of registers given by name.', type=float, default=0.3)
+    parser.add_argument('--comment-ratio', help='The ratio of instructions followed by a comment.', type=float, default=0.1)
+    args = parser.parse_args()
+
+    mix = dict(default_mix)
+    mix.update(args.mix)
+    program = generate_program(args.lines, mix, args.seed, args.named_ratio, args.comment_ratio)
+
+    if args.output is None:
+        sys.stdout.write(program)
+    else:
+        with open(args.output, 'w') as file:
+            file.write(program)
+
+if __name__ == '__main__':
+    main()
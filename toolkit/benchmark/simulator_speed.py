@@ -0,0 +1,47 @@
+## @file
+## @brief Simulator throughput benchmark.
+## @details Runs each example program for a number of cycles and reports the simulated instructions per second.
+## @details With --compile, programs run on the basic block compiling BlockSimulator.
+## @details Usage: python simulator_speed.py [-n CYCLES] [--compile] [program.qtf ...]
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+## @brief Path to the assembler modules.
+ASSEMBLER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../assembler/')
+sys.path.insert(1, ASSEMBLER_PATH)
+
+from BlockSimulator import BlockSimulator
+from Simulator import Simulator, load_program
+
+## @brief Programs used when none are given.
+DEFAULT_PROGRAMS = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../doc/examples/*.qtf')))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('programs', help='The programs to run.', type=str, nargs='*', default=DEFAULT_PROGRAMS)
+    parser.add_argument('-n', help='The number of cycles to run each program for.', type=int, default=2000000)
+    parser.add_argument('--compile', help='Run on the basic block compiling simulator.', action='store_true')
+    args = parser.parse_args()
+    simulator_class = BlockSimulator if args.compile else Simulator
+
+    total_cycles = 0
+    total_time = 0
+    for path in args.programs:
+        simulator = simulator_class(load_program(path))
+
+        start = time.perf_counter()
+        simulator.run(args.n)
+        elapsed = time.perf_counter() - start
+
+        total_cycles += args.n
+        total_time += elapsed
+        print('{:12} {:8.2f} M instructions/s'.format(os.path.basename(path), args.n / elapsed / 1e6))
+
+    print('{:12} {:8.2f} M instructions/s'.format('total', total_cycles / total_time / 1e6))
+
+if __name__ == '__main__':
+    main()
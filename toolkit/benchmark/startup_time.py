@@ -0,0 +1,100 @@
+## @file
+## @brief Assembler startup time benchmark.
+## @details Measures the import time of the assembler with python -X importtime, listing the slowest modules,
+## @details and the wall time of assembling a program on a fresh interpreter, against an empty interpreter start.
+## @details Fails when the assembler startup, over the interpreter start, is above a limit, to keep it fast.
+## @details Usage: python startup_time.py [-n RUNS] [--limit MS] [-o results.json] [program.qtf]
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+## @brief Path to the assembler modules.
+ASSEMBLER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../assembler/')
+
+## @brief Program used when none is given.
+DEFAULT_PROGRAM = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../doc/examples/CALL.qtf')
+
+## @brief Runs a command on a fresh interpreter, with the assembler importable.
+## @return The completed process.
+def run_python(args):
+    environment = dict(os.environ)
+    environment['PYTHONPATH'] = os.pathsep.join(filter(None, (ASSEMBLER_PATH, environment.get('PYTHONPATH'))))
+    return subprocess.run([sys.executable] + args, capture_output=True, text=True, check=True, env=environment)
+
+## @brief Measures the import time of a module.
+## @param module The module name.
+## @return The total import time in seconds and a list of (self seconds, module), slowest first.
+def import_times(module):
+    stderr = run_python(['-X', 'importtime', '-c', 'import ' + module]).stderr
+
+    modules = []
+    total = None
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, cumulative, name = line[len('import time:'):].split('|')
+        modules.append((int(self_time) / 1e6, name.strip()))
+        if name.strip() == module:
+            total = int(cumulative) / 1e6
+
+    modules.sort(reverse=True)
+    return total, modules
+
+## @brief Measures the median wall time of a command on fresh interpreters.
+## @param args The interpreter arguments.
+## @param runs The number of runs.
+## @return The median seconds.
+def wall_time(args, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run_python(args)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('program', help='The program to assemble.', type=str, nargs='?', default=DEFAULT_PROGRAM)
+    parser.add_argument('-n', '--runs', help='The number of fresh interpreter runs, the median is reported.', type=int, default=10)
+    parser.add_argument('--top', help='The number of slowest modules to list.', type=int, default=10)
+    parser.add_argument('--limit', help='Fail when the assembler adds more milliseconds than this to the interpreter start.', type=float)
+    parser.add_argument('-o', '--output', help='The path to save the results, as JSON.', type=str)
+    args = parser.parse_args()
+
+    import_total, modules = import_times('Assembler')
+
+    interpreter = wall_time(['-c', 'pass'], args.runs)
+    with tempfile.TemporaryDirectory() as directory:
+        assembler = wall_time([os.path.join(ASSEMBLER_PATH, 'Assembler.py'), args.program, os.path.join(directory, 'program.mif')], args.runs)
+    startup = assembler - interpreter
+
+    print('interpreter start: {:8.2f} ms'.format(interpreter * 1e3))
+    print('assembler run:     {:8.2f} ms'.format(assembler * 1e3))
+    print('over interpreter:  {:8.2f} ms'.format(startup * 1e3))
+    print('import Assembler:  {:8.2f} ms'.format(import_total * 1e3))
+    print('slowest imports:')
+    for seconds, name in modules[:args.top]:
+        print('    {:8.2f} ms  {}'.format(seconds * 1e3, name))
+
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump({
+                'interpreter': interpreter,
+                'assembler': assembler,
+                'startup': startup,
+                'import': import_total,
+                'modules': [{'module': name, 'seconds': seconds} for seconds, name in modules[:args.top]]
+            }, file, indent=4)
+
+    if args.limit is not None and startup * 1e3 > args.limit:
+        sys.stderr.write('Assembler startup of {:.2f} ms is over the {:.2f} ms limit.\n'.format(startup * 1e3, args.limit))
+        exit(-1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+## @file
+## @brief Vectorized simulator throughput benchmark.
+## @details Runs a program on a number of lanes with random switch values, on the vectorized simulator and on one
+## @details Simulator per lane, and reports the aggregate simulated instructions per second of each.
+## @details Sequential runs are timed on at most --sample lanes and scaled to the number of lanes.
+## @details Usage: python vector_throughput.py [--lanes N ...] [-n CYCLES] [--variants] [program.qtf]
+
+import argparse
+import os
+import random
+import sys
+import time
+
+## @brief Path to the assembler modules.
+ASSEMBLER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../assembler/')
+sys.path.insert(1, ASSEMBLER_PATH)
+
+from Simulator import Simulator, load_program
+from VectorSimulator import VectorSimulator
+
+## @brief Program used when none is given: counts the set bits of the switches, so lanes diverge on the loop exit.
+DEFAULT_PROGRAM = '''
+li $1, 1
+li $7, 100
+again:
+      move $2, $switches
+      li $4, 0
+bits:
+      move $3, $2
+      and $3, $1
+      add $4, $3
+      sr $2
+      jne $2, $zero, bits
+      sub $7, $1
+      jne $7, $zero, again
+move $leds, $4
+end:
+      j end
+'''
+
+## @brief Builds program variants, as different submissions of the same exercise: each one stores a constant at
+## @brief a different data address before running the program.
+## @param words The program.
+## @param count The number of variants.
+## @param generator The random generator.
+def variants(words, count, generator):
+    from Assembler import assemble
+    programs = []
+    for _ in range(count):
+        prefix = assemble('li $9, {0}\nstore $9, $9\n'.format(generator.randrange(256)))
+        programs.append(prefix + relocate(words, len(prefix)))
+    return programs
+
+## @brief Moves a program to a later address, fixing the addresses loaded for label jumps.
+## @details Label jumps load their target to $a with li; every li to $a is shifted.
+def relocate(words, offset):
+    from Assembler import register_aliases
+    from Simulator import decode
+    li = 0x01
+    relocated = []
+    for word in words:
+        opcode, a, b, c, immediate = decode(word)
+        if opcode == li and a == register_aliases['a']:
+            word = (word & ~0xFFFF) | ((immediate + offset) & 0xFFFF)
+        relocated.append(word)
+    return relocated
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('program', help='The program to run.', type=str, nargs='?')
+    parser.add_argument('--lanes', help='The numbers of lanes.', type=int, nargs='+', default=[1, 16, 256, 1024, 4096])
+    parser.add_argument('-n', help='The number of cycles to run each lane for.', type=int, default=20000)
+    parser.add_argument('--sample', help='The most lanes run on sequential simulators.', type=int, default=32)
+    parser.add_argument('--variants', help='Run a different variant of the program on each lane.', action='store_true')
+    parser.add_argument('--seed', help='The random seed of the switch values and variants.', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.program is None:
+        from Assembler import assemble
+        words = assemble(DEFAULT_PROGRAM)
+    else:
+        words = load_program(args.program)
+
+    generator = random.Random(args.seed)
+    print('{:>7} {:>16} {:>16} {:>9}'.format('lanes', 'vector M/s', 'sequential M/s', 'speedup'))
+    for lanes in args.lanes:
+        switches = [generator.getrandbits(32) for _ in range(lanes)]
+        programs = variants(words, lanes, generator) if args.variants else [words] * lanes
+
+        simulator = VectorSimulator(programs, switches)
+        start = time.perf_counter()
+        simulator.run(args.n)
+        vector = lanes * args.n / (time.perf_counter() - start)
+
+        sample = min(lanes, args.sample)
+        start = time.perf_counter()
+        for lane in range(sample):
+            Simulator(programs[lane], switches[lane]).run(args.n)
+        sequential = sample * args.n / (time.perf_counter() - start)
+
+        print('{:>7} {:>16.2f} {:>16.2f} {:>8.1f}x'.format(lanes, vector / 1e6, sequential / 1e6, vector / sequential))
+
+if __name__ == '__main__':
+    main()
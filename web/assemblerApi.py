@@ -1,46 +1,204 @@
-# @brief Path to the assembler script.
-ASSEMBLER_PATH = '../toolkit/assembler/Assembler.py'
+# @brief Path to the assembler package.
+ASSEMBLER_PATH = '../toolkit/assembler/'
 
 from flask import Flask, request, Response, json
 from flask_cors import CORS, cross_origin
 
-from subprocess import Popen, PIPE
-
 import os
 import io
 import sys
+import threading
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), ASSEMBLER_PATH))
+from BatchAssembler import assemble_source, assemble_blockly
+from MIF import radix_formats
+from Parser import build_parser
+from Profiler import Profiler
+
+from resultCache import ResultCache, assembler_fingerprint
 
 app = Flask(__name__)
 CORS(app)
 
+## @brief Cache of assembled programs.
+## @details Sized by ASSEMBLER_CACHE_SIZE entries. Also stored on ASSEMBLER_CACHE_DIR, when set, up to the same size.
+cache = ResultCache(
+    assembler_fingerprint(os.path.join(os.path.dirname(os.path.abspath(__file__)), ASSEMBLER_PATH)),
+    int(os.environ.get('ASSEMBLER_CACHE_SIZE', 1024)),
+    os.environ.get('ASSEMBLER_CACHE_DIR')
+)
+
+## @brief The maximum number of programs on a batch request.
+BATCH_LIMIT = int(os.environ.get('ASSEMBLER_BATCH_LIMIT', 1000))
+
+## @brief Worker processes for batch requests, started on the first one.
+## @details Sized by ASSEMBLER_WORKERS, defaults to the number of cores.
+pool = None
+pool_lock = threading.Lock()
+
+## @brief Returns the worker pool, starting it if needed.
+def get_pool():
+    global pool
+    with pool_lock:
+        if pool is None:
+            workers = int(os.environ.get('ASSEMBLER_WORKERS', 0)) or os.cpu_count() or 1
+            # Workers are spawned, forking a threaded server could copy held locks.
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=build_parser)
+        return pool
+
+## @brief Default output options.
+default_options = {'address_radix': 'BIN', 'data_radix': 'BIN'}
+
+## @brief Response for unsupported radixes.
+radix_error = {'error': True, 'output': 'Unsupported radix, expected one of: {}.'.format(', '.join(radix_formats)), 'errors': [], 'assembly': ''}
+## @brief Response to requests without a program.
+program_error = {'error': True, 'output': 'Expected a program.', 'errors': [], 'assembly': ''}
+
+## @brief Reads the output options of a request.
+## @param body The request, or batch item, json.
+## @param defaults The options used when absent.
+## @return The options dictionary, or None when a radix is unsupported.
+def read_options(body, defaults):
+    options = {
+        'address_radix': body.get('address_radix', defaults['address_radix']),
+        'data_radix': body.get('data_radix', defaults['data_radix'])
+    }
+    if options['address_radix'] not in radix_formats or options['data_radix'] not in radix_formats:
+        return None
+    return options
+
+## @brief Reads the program of a request, or batch item.
+## @details Programs are given as quanta source on "program", or as a Blockly workspace XML on "blockly".
+## @param body The request, or batch item, json.
+## @param options The output options of the program.
+## @return A tuple of (source, assembling function, cache options), or None when there's no program.
+def read_program(body, options):
+    if isinstance(body.get('program'), str):
+        return body['program'], assemble_source, options
+    if isinstance(body.get('blockly'), str):
+        # Workspaces are cached apart from sources.
+        return body['blockly'], assemble_blockly, dict(options, source='blockly')
+    return None
+
 ## @brief Assembler API.
-## @details Receives a program in json format {"program": <code>}.
-## @details Response in json format {"error": <error_flag>, "output": <assembler_output>, "assembly": <assembler_result>}.
+## @details Receives a program in json format {"program": <code>}, or a Blockly workspace as {"blockly": <xml>}.
+## @details The MIF radixes may be given as "address_radix" and "data_radix", both default to BIN.
+## @details Response in json format {"error": <error_flag>, "output": <assembler_output>, "errors": <error_list>, "assembly": <assembler_result>}.
+## @details Each error on the list is a {"type", "lineno", "column", "line"} object.
+## @details Workspaces are converted on the server, and the response also holds the converted "program".
+## @details The program is assembled in process, no interpreter is spawned per request.
+## @details Results are cached, resubmitted programs are not assembled again.
+## @details With "profile": true, or ?profile=1, the program is assembled again even if cached,
+## @details and the response holds the "timings" of each phase, as recorded by Profiler.
+## @details Only times are recorded: tracemalloc traces the whole process, it would slow down every concurrent request.
 @app.route('/assembler', methods=['POST'])
 def assembler_api():
-    # Save the request program to file.
-    program = request.get_json()['program']
-    with open('.program.qtf', 'wb') as file:
-        file.write(program.encode('utf-8'))
+    body = request.get_json()
+    if not isinstance(body, dict):
+        return Response(json.dumps(program_error), status=400, mimetype='application/json')
+    options = read_options(body, default_options)
+    if options is None:
+        return Response(json.dumps(radix_error), status=400, mimetype='application/json')
+    source = read_program(body, options)
+    if source is None:
+        return Response(json.dumps(program_error), status=400, mimetype='application/json')
+    program, assemble_program, cache_options = source
 
-    # Start the assembler as a subprocess and redirect output.
-    assembler_process = Popen(['python', './{}'.format(ASSEMBLER_PATH), '.program.qtf', '.out.mif'], stdin=PIPE, stdout=PIPE, stderr=PIPE)
-    output, err = assembler_process.communicate()
-    assembler_process.wait()
-
-    error = assembler_process.returncode != 0
-
-    result = ''
-    # Read the result from file if the assembler was successful.
-    if not error:
-        with open('.out.mif', 'r') as file:
-            result = file.read()
+    key = cache.key(program, cache_options)
+    profiler = None
+    if body.get('profile') is True or request.args.get('profile') == '1':
+        profiler = Profiler(memory=False)
+        result = assemble_program((program, options['address_radix'], options['data_radix']), profiler)
+        cache.put(key, result)
+    else:
+        result = cache.get(key)
+        if result is None:
+            result = assemble_program((program, options['address_radix'], options['data_radix']))
+            cache.put(key, result)
 
     # Assemble response.
-    resp = Response(json.dumps({
-        "error": error,
-        "output": err.decode('utf-8') if error else output.decode('utf-8'),
-        "assembly": result
-        }), status=200, mimetype='application/json')
+    response = {
+        "error": result['error'],
+        "output": result['output'],
+        "errors": result['errors'],
+        "assembly": result['assembly']
+        }
+    if 'program' in result:
+        response['program'] = result['program']
+    if profiler is not None:
+        response['timings'] = profiler.as_dict()
+    resp = Response(json.dumps(response), status=200, mimetype='application/json')
     
     return resp
+
+## @brief Batch assembler API.
+## @details Receives programs in json format {"programs": [<code> | {"program": <code>, "address_radix", "data_radix"}]}.
+## @details Items may give a Blockly workspace as {"blockly": <xml>} instead, as on /assembler.
+## @details Radixes given next to "programs" apply to every program without its own.
+## @details Programs not found on the cache are assembled concurrently on the worker processes.
+## @details Responds with a json array of results, in request order, each as answered by /assembler.
+## @details With ?stream=1, or when accepting application/x-ndjson, results are streamed one per line as they are ready.
+## @details A program failing to assemble, or given invalid options, only fails its own result.
+@app.route('/assembler/batch', methods=['POST'])
+def assembler_batch_api():
+    body = request.get_json()
+    if not isinstance(body, dict) or not isinstance(body.get('programs'), list):
+        return Response(json.dumps({'error': True, 'output': 'Expected {"programs": [...]}.', 'errors': [], 'assembly': ''}), status=400, mimetype='application/json')
+    programs = body['programs']
+    defaults = read_options(body, default_options)
+    if defaults is None:
+        return Response(json.dumps(radix_error), status=400, mimetype='application/json')
+    if len(programs) > BATCH_LIMIT:
+        return Response(json.dumps({'error': True, 'output': 'Batches are limited to {} programs.'.format(BATCH_LIMIT), 'errors': [], 'assembly': ''}), status=400, mimetype='application/json')
+
+    # Each item is a cached result, a pending future, or an error response.
+    items = []
+    for item in programs:
+        if isinstance(item, str):
+            item = {'program': item}
+        if not isinstance(item, dict) or (not isinstance(item.get('program'), str) and not isinstance(item.get('blockly'), str)):
+            items.append((None, program_error))
+            continue
+
+        options = read_options(item, defaults)
+        if options is None:
+            items.append((None, radix_error))
+            continue
+        program, assemble_program, cache_options = read_program(item, options)
+
+        key = cache.key(program, cache_options)
+        result = cache.get(key)
+        if result is None:
+            result = get_pool().submit(assemble_program, (program, options['address_radix'], options['data_radix']))
+        items.append((key, result))
+
+    # Waits for each result in order, caching the new ones.
+    def results():
+        for key, result in items:
+            if not isinstance(result, dict):
+                try:
+                    result = result.result()
+                    cache.put(key, result)
+                except Exception as e:
+                    # A lost worker fails only the programs it held, which are not cached.
+                    result = {'error': True, 'output': 'Assembler failed.\n{}'.format(e), 'errors': [], 'assembly': ''}
+            yield result
+
+    stream = request.args.get('stream') == '1' or request.accept_mimetypes.best == 'application/x-ndjson'
+    if stream:
+        return Response((json.dumps(result) + '\n' for result in results()), status=200, mimetype='application/x-ndjson')
+
+    return Response(json.dumps(list(results())), status=200, mimetype='application/json')
+
+## @brief Assembler cache counters.
+## @details Response in json format {"hits", "misses", "evictions", "entries", "disk_evictions", "disk_entries", "max_entries", "directory"}.
+@app.route('/assembler/cache', methods=['GET'])
+def assembler_cache_api():
+    return Response(json.dumps(cache.stats()), status=200, mimetype='application/json')
+
+if __name__ == '__main__':
+    # Requests share no state, so they can be served concurrently.
+    app.run(threaded=True)
@@ -0,0 +1,80 @@
+## @file
+## @brief Throughput benchmark for the assembler API.
+## @details Compares the in process endpoint with the former one subprocess per request approach.
+## @details Cached results are measured by resubmitting the same program; uncached ones get a unique comment per request.
+## @details Usage: python benchmark.py [-n REQUESTS] [program.qtf]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from subprocess import Popen, PIPE
+
+from assemblerApi import app, ASSEMBLER_PATH
+
+## @brief Path to the assembler script, used by the subprocess baseline.
+ASSEMBLER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), ASSEMBLER_PATH, 'Assembler.py')
+
+## @brief Program used when none is given.
+DEFAULT_PROGRAM = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../doc/examples/CALL.qtf')
+
+## @brief Assembles a program the way the API used to, spawning an interpreter per request.
+## @param program The program source.
+## @return The MIF file as a string.
+def assemble_subprocess(program, directory):
+    program_path = os.path.join(directory, 'program.qtf')
+    mif_path = os.path.join(directory, 'out.mif')
+    with open(program_path, 'w') as file:
+        file.write(program)
+
+    process = Popen([sys.executable, ASSEMBLER_SCRIPT, program_path, mif_path], stdout=PIPE, stderr=PIPE)
+    process.communicate()
+
+    with open(mif_path, 'r') as file:
+        return file.read()
+
+## @brief Runs a request function repeatedly.
+## @return The measured requests per second.
+def measure(request, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        request()
+    return count / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('program', help='The program to assemble on every request.', type=str, nargs='?', default=DEFAULT_PROGRAM)
+    parser.add_argument('-n', help='The number of requests per approach.', type=int, default=50)
+    args = parser.parse_args()
+
+    with open(args.program, 'r') as file:
+        program = file.read()
+
+    client = app.test_client()
+    submissions = iter(range(sys.maxsize))
+    def in_process():
+        response = client.post('/assembler', json={'program': program + '\n; {}\n'.format(next(submissions))})
+        assert not response.get_json()['error']
+
+    def cached():
+        response = client.post('/assembler', json={'program': program})
+        assert not response.get_json()['error']
+
+    with tempfile.TemporaryDirectory() as directory:
+        subprocess_rate = measure(lambda: assemble_subprocess(program, directory), args.n)
+
+    # Warm up once so the parser tables are in place, as they would be on a running server.
+    in_process()
+    in_process_rate = measure(in_process, args.n)
+    cached()
+    cached_rate = measure(cached, args.n)
+
+    print('subprocess per request: {:10.1f} requests/s'.format(subprocess_rate))
+    print('in process:             {:10.1f} requests/s'.format(in_process_rate))
+    print('in process, cached:     {:10.1f} requests/s'.format(cached_rate))
+    print('speedup:                {:10.1f}x'.format(in_process_rate / subprocess_rate))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+## @file
+## @brief Content addressed cache of assembler results.
+## @details Results are keyed by a hash of the program, the assembler sources and the output options.
+## @details Recently used results are kept in memory, up to a number of entries.
+## @details Results can also be kept on a local directory, so they survive restarts.
+## @details The directory holds as many results as memory, the least recently used files are deleted past the cap.
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from collections import OrderedDict
+
+## @brief Hashes the source files of the assembler.
+## @details Any change to the assembler changes the fingerprint, so stale results are never served.
+## @param directory The assembler directory.
+## @return The hex digest of the sources.
+def assembler_fingerprint(directory):
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.py'):
+            with open(os.path.join(directory, name), 'rb') as file:
+                digest.update(name.encode('utf-8'))
+                digest.update(file.read())
+    return digest.hexdigest()
+
+## @brief Least recently used cache of assembler results.
+## @details Safe to share between request threads.
+class ResultCache:
+    def __init__(self, version, max_entries=1024, directory=None):
+        ## @brief The assembler version, part of every key.
+        self.version = version
+        ## @brief The maximum number of results kept in memory, and on disk.
+        self.max_entries = max_entries
+        ## @brief The directory results are stored on, or None to keep them in memory only.
+        self.directory = directory
+
+        ## @brief The results kept in memory, from least to most recently used.
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+        ## @brief The number of lookups served from the cache.
+        self.hits = 0
+        ## @brief The number of lookups not found on the cache.
+        self.misses = 0
+        ## @brief The number of results dropped from memory to respect the size cap.
+        self.evictions = 0
+        ## @brief The number of results deleted from disk to respect the size cap.
+        self.disk_evictions = 0
+
+        ## @brief The keys of the results on disk, from least to most recently used.
+        self.disk_keys = OrderedDict()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            # Results stored before a restart, by their last use.
+            stored = []
+            for name in os.listdir(directory):
+                if name.endswith('.json'):
+                    try:
+                        stored.append((os.path.getmtime(os.path.join(directory, name)), name[:-len('.json')]))
+                    except OSError:
+                        pass
+            for _, key in sorted(stored):
+                self.disk_keys[key] = None
+            with self.lock:
+                self.prune()
+
+    ## @brief Builds the key of a program.
+    ## @param program The program source.
+    ## @param options The output options, as a dictionary.
+    ## @return The key as a hex digest.
+    def key(self, program, options):
+        digest = hashlib.sha256()
+        digest.update(self.version.encode('utf-8'))
+        digest.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+        digest.update(program.encode('utf-8'))
+        return digest.hexdigest()
+
+    ## @brief Looks a result up, in memory then on disk.
+    ## @param key The result key.
+    ## @return The result, or None when not cached.
+    def get(self, key):
+        with self.lock:
+            result = self.entries.get(key)
+            if result is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return result
+
+        result = self.load(key)
+        with self.lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.insert(key, result)
+        return result
+
+    ## @brief Stores a result.
+    ## @param key The result key.
+    ## @param result The result, must be serializable to JSON.
+    def put(self, key, result):
+        with self.lock:
+            self.insert(key, result)
+        self.store(key, result)
+
+    ## @brief Inserts a result in memory, evicting the least recently used ones past the cap.
+    ## @details Must be called holding the lock.
+    def insert(self, key, result):
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    ## @brief The path of a result on disk.
+    def path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    ## @brief Reads a result from disk.
+    ## @details Read results are marked as recently used, their modification time too, so the order survives restarts.
+    ## @return The result, or None when not stored or unreadable.
+    def load(self, key):
+        if self.directory is None:
+            return None
+        try:
+            with open(self.path(key), 'r') as file:
+                result = json.load(file)
+            os.utime(self.path(key))
+        except (OSError, ValueError):
+            return None
+        with self.lock:
+            if key in self.disk_keys:
+                self.disk_keys.move_to_end(key)
+        return result
+
+    ## @brief Writes a result to disk.
+    ## @details Written to a temporary file then renamed, so readers never see partial files.
+    ## @details The disk is best effort, as on load: results that can't be written, as on a full disk or a read only
+    ## @details directory, are only kept in memory.
+    def store(self, key, result):
+        if self.directory is None:
+            return
+        temporary_path = None
+        try:
+            descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(descriptor, 'w') as file:
+                json.dump(result, file)
+            os.replace(temporary_path, self.path(key))
+        except OSError:
+            if temporary_path is not None:
+                try:
+                    os.remove(temporary_path)
+                except OSError:
+                    pass
+            return
+        with self.lock:
+            self.disk_keys[key] = None
+            self.disk_keys.move_to_end(key)
+            self.prune()
+
+    ## @brief Deletes the least recently used results on disk past the cap.
+    ## @details Must be called holding the lock.
+    def prune(self):
+        while len(self.disk_keys) > self.max_entries:
+            key, _ = self.disk_keys.popitem(last=False)
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                # Already deleted, as by another process sharing the directory.
+                pass
+            self.disk_evictions += 1
+
+    ## @brief The cache counters.
+    ## @return A dictionary of the counters and sizes.
+    def stats(self):
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'disk_evictions': self.disk_evictions,
+                'disk_entries': len(self.disk_keys),
+                'max_entries': self.max_entries,
+                'directory': self.directory
+            }
@@ -0,0 +1,77 @@
+## @file
+## @brief Concurrency stress test for the assembler API.
+## @details Serves the API on a threaded server and fires many distinct programs at it at once.
+## @details Every response is checked against the result of assembling its own program serially.
+## @details Usage: python stress.py [-n REQUESTS] [-w WORKERS]
+
+import argparse
+import sys
+import threading
+import urllib.request
+
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import make_server, WSGIRequestHandler
+from flask import json
+
+from assemblerApi import app
+from Assembler import assemble_mif
+from Util import AssemblerError
+
+## @brief Request handler that does not log every request.
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+## @brief Builds a program unique to the given index.
+## @details Every tenth program jumps to a missing label so the error path is exercised too.
+def make_program(index):
+    program  = 'li $1, {}\n'.format(index)
+    program += 'li $2, {}\n'.format((index * 7919) % 2**16)
+    program += 'start_{}:\n'.format(index)
+    program += '    add $1, $2\n'
+    program += '    jne $1, $zero, {}\n'.format('missing_{}'.format(index) if index % 10 == 0 else 'start_{}'.format(index))
+    return program
+
+## @brief Computes the response expected for a program.
+def expected_response(program):
+    try:
+        return {'error': False, 'output': 'Assembler successful.', 'errors': [], 'assembly': assemble_mif(program)}
+    except AssemblerError as error:
+        return {'error': True, 'output': str(error), 'errors': error.errors, 'assembly': ''}
+
+## @brief Posts a program to the API.
+def post(url, program):
+    request = urllib.request.Request(url, data=json.dumps({'program': program}).encode('utf-8'), headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', help='The number of distinct programs to send.', type=int, default=500)
+    parser.add_argument('-w', help='The number of concurrent clients.', type=int, default=64)
+    args = parser.parse_args()
+
+    programs = [make_program(i) for i in range(args.n)]
+    expected = [expected_response(program) for program in programs]
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietRequestHandler)
+    url = 'http://127.0.0.1:{}/assembler'.format(server.server_port)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.w) as pool:
+            responses = list(pool.map(lambda program: post(url, program), programs))
+    finally:
+        server.shutdown()
+
+    mismatches = [i for i, (response, reference) in enumerate(zip(responses, expected)) if response != reference]
+    print('{} requests, {} concurrent clients, {} mismatched responses.'.format(args.n, args.w, len(mismatches)))
+    for index in mismatches[:10]:
+        print('Program {} got an answer that does not match its input.'.format(index))
+
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == '__main__':
+    main()